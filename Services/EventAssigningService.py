@@ -1,15 +1,18 @@
 from llm.LlmClient import LlmClient
 from models.Post import Post
-from typing import List
+from typing import List, Optional
 from database import db
 from llm.find_topic_for_post import find_topic_for_post
 from models.Event import Event
+from Services.EventEnrichmentQueue import EventEnrichmentQueue
 from llm.SemanticSimilarityService import SemanticSimilarityService
 
 
 class EventAssigningService:
-    def __init__(self, llm_client:LlmClient):
+    def __init__(self, llm_client:LlmClient, enrichment_queue: Optional[EventEnrichmentQueue] = None):
         self.llm_client = llm_client
+        # With a queue, matched events are re-enriched in the background instead of before returning
+        self.enrichment_queue = enrichment_queue
         self.db = db
         self.llm_client = LlmClient()
         self.semantic_similarity_service = SemanticSimilarityService(llm_client)
@@ -30,19 +33,25 @@ class EventAssigningService:
         # Use list of tuples instead of dict (Events aren't hashable)
         similarity_per_event = []
 
-        for event in events_to_match:
-            # Use case_description for matching (broad subject without posting details)
-            event_text = event.case_description if event.case_description else event.small_summary
-            if not event_text:
-                continue
+        # Use case_description for matching (broad subject without posting details).
+        # Candidates whose description embedding is missing or stale are (re)indexed first.
+        self.db.index_events([event for event in events_to_match
+                              if event.matching_text() and not event.has_fresh_description_embedding()])
+        window_event_ids = {event.event_id for event in events_to_match}
+
+        if window_event_ids:
+            matches = self.db.search_events_by_embedding(
+                post_embedding,
+                min_score=self._minimum_event_similarity_threshold,
+                topic=post.topic.name,
+                event_ids=window_event_ids
+            )
+            for event, similarity in matches:
+                print(f"  Similarity: {similarity:.3f} with event '{event.name}'")
                 
-            event_embedding = self.semantic_similarity_service.embed(event_text)
-            similarity = self.semantic_similarity_service.cosine_similarity(post_embedding, event_embedding)
-            print(f"  Similarity: {similarity:.3f} with event '{event.name}'")
-            
-            if similarity > self._minimum_event_similarity_threshold:
-                similarity_per_event.append((event, similarity))
-                print(f"    ✓ Above threshold ({self._minimum_event_similarity_threshold})")
+                if similarity > self._minimum_event_similarity_threshold:
+                    similarity_per_event.append((event, similarity))
+                    print(f"    ✓ Above threshold ({self._minimum_event_similarity_threshold})")
                 
         # Sort by similarity (highest first)
         sorted_events = sorted(similarity_per_event, key=lambda x: x[1], reverse=True)
@@ -50,15 +59,20 @@ class EventAssigningService:
         # Add to best matching event
         if sorted_events:
             event, similarity = sorted_events[0]  # Best match
-            event.add_post(post, db.events)
+            if self.enrichment_queue is not None:
+                self.enrichment_queue.mark_dirty(event, post)
+            else:
+                event.add_post(post, db.events, db.keyword_index)
+                db.update_event_date(event)
+                db.record_event_change(event)
+                db.index_events([event])
             print(f"✓ Post added to event '{event.name}' (similarity: {similarity:.3f})")
             return
         
-        new_event = Event.create_with_enrichment(posts=[post], other_events=db.events)
+        new_event = Event.create_with_enrichment(posts=[post], other_events=db.events, keyword_index=db.keyword_index)
         
         print(f"✨ Event '{new_event.name}' created for post '{post.link}'")
-        db.add_event(new_event)
-        topic_instance.events.append(new_event)
+        db.add_event(new_event, topic=topic_instance)
             
         
         
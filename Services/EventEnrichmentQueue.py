@@ -0,0 +1,139 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from database import db
+from models.Event import Event
+from models.Post import Post
+
+
+@dataclass
+class _DirtyEvent:
+    event: Event
+    posts: List[Post] = field(default_factory=list)
+    # The event's posts when it was taken for regeneration, new_posts included
+    snapshot: List[Post] = field(default_factory=list)
+    first_marked: float = 0.0
+    last_marked: float = 0.0
+
+
+class EventEnrichmentQueue:
+    """
+    Debounced background re-enrichment of events.
+
+    mark_dirty attaches a post to an event and returns immediately. A dirty event is regenerated
+    once no new post arrived for `window` seconds (or at most `max_delay` seconds after it first
+    became dirty), so a burst of posts landing in the same event costs a single refresh_enrichment.
+    """
+
+    def __init__(self, window: float = 2.0, max_delay: float = 10.0, workers: int = 2):
+        self.window = window
+        self.max_delay = max_delay
+        self.regenerations = 0
+        self.coalesced_posts = 0
+
+        self._condition = threading.Condition()
+        self._dirty: Dict[int, _DirtyEvent] = {}
+        self._in_progress = set()
+        self._flushing = 0
+        self._closed = False
+        self._threads = [threading.Thread(target=self._work, name=f"event-enrichment-{i}", daemon=True)
+                         for i in range(max(1, workers))]
+        for thread in self._threads:
+            thread.start()
+
+    def mark_dirty(self, event: Event, post: Post):
+        """Attach the post now and schedule the event's enrichment to be regenerated"""
+        now = time.monotonic()
+        with self._condition:
+            # Attached under the condition, so a worker's snapshot holds exactly the queued posts
+            event.attach_post(post)
+            entry = self._dirty.get(event.event_id)
+            if entry is None:
+                entry = self._dirty[event.event_id] = _DirtyEvent(event, first_marked=now)
+            entry.posts.append(post)
+            entry.last_marked = now
+            self._condition.notify_all()
+        db.update_event_date(event)
+        db.record_event_change(event)
+
+    def pending(self) -> int:
+        """Number of events waiting for, or in the middle of, regeneration"""
+        with self._condition:
+            return len(self._dirty.keys() | self._in_progress)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Regenerate every dirty event now and wait for it; False if the timeout expired first"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            self._flushing += 1
+            self._condition.notify_all()
+            try:
+                while self._dirty or self._in_progress:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._condition.wait(remaining)
+                return True
+            finally:
+                self._flushing -= 1
+
+    def close(self):
+        """Flush the queue and stop the workers"""
+        self.flush()
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+
+    def _due_in(self, entry: _DirtyEvent, now: float) -> float:
+        if self._flushing:
+            return 0.0
+        return min(entry.last_marked + self.window, entry.first_marked + self.max_delay) - now
+
+    def _next_due(self) -> Optional[_DirtyEvent]:
+        """Pop the next event whose window has elapsed, or wait until one might have"""
+        with self._condition:
+            while not self._closed:
+                now = time.monotonic()
+                wait = None
+                for event_id, entry in self._dirty.items():
+                    if event_id in self._in_progress:
+                        continue
+                    due_in = self._due_in(entry, now)
+                    if due_in <= 0:
+                        del self._dirty[event_id]
+                        self._in_progress.add(event_id)
+                        entry.snapshot = list(entry.event.posts)
+                        return entry
+                    wait = due_in if wait is None else min(wait, due_in)
+                self._condition.wait(wait)
+            return None
+
+    def _work(self):
+        while True:
+            entry = self._next_due()
+            if entry is None:
+                return
+            try:
+                entry.event.refresh_enrichment(entry.posts, db.events, db.keyword_index, posts=entry.snapshot)
+                db.record_event_change(entry.event)
+                db.index_events([entry.event])
+            except Exception as e:
+                print(f"Error regenerating event {entry.event.event_id}: {e}")
+            finally:
+                with self._condition:
+                    self._in_progress.discard(entry.event.event_id)
+                    self.regenerations += 1
+                    self.coalesced_posts += len(entry.posts)
+                    self._condition.notify_all()
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                "pending": len(self._dirty.keys() | self._in_progress),
+                "regenerations": self.regenerations,
+                "coalesced_posts": self.coalesced_posts
+            }
@@ -2,6 +2,7 @@ from llm.LlmClient import LlmClient
 from models.Post import Post
 from models.Event import Event
 from models.Topic import Topic
+from models.Keyword import Keyword
 from database import db
 import csv
 import json
@@ -10,6 +11,9 @@ from datetime import datetime
 from llm.AzerionPromptTemplate import AzerionPromptTemplate
 from llm.PromptTemplates.Prompts import build_sentiment_prompt
 from Services.EventAssigningService import EventAssigningService
+from database.json_stream import JsonStreamReader
+from database.snapshot import SnapshotReader
+from database.write_ahead_log import WriteAheadLog, unpack_embedding
 
 
 # # CONFIGURATION: Control how many posts to process
@@ -66,6 +70,10 @@ class EventProcessingService:
                     likes = 0
             total_engagement = likes + comment_count    
 
+            # Known post: only the engagement changed, no need to enrich it again
+            if db.update_post_engagement(link, post_date, total_engagement):
+                return True
+
             post = Post.create_with_enrichment(
                 link=link,
                 content=content,
@@ -154,9 +162,71 @@ class EventProcessingService:
     #     print("COMPLETED PROCESSING ALL FILES")
     #     print("=" * 70)
 
+    # Items loaded between two progress lines of load_database_from_json
+    _load_progress_every = 1000
+
+    @staticmethod
+    def _resolve(keys, lookup) -> list:
+        """Look up every key, dropping the ones that do not exist"""
+        return [item for item in map(lookup, keys) if item is not None]
+
+    def _load_post(self, post_dict: dict):
+        db.load_post(Post.from_dict(post_dict))
+
+    def _load_event(self, event_dict: dict, pending_posts: list, pending_similar: list):
+        db.load_event(self._build_event(event_dict, pending_posts, pending_similar))
+
+    def _build_event(self, event_dict: dict, pending_posts: list, pending_similar: list) -> Event:
+        # The decoders drop posts and similar_events, they are linked here from their links/IDs
+        post_links = event_dict.get('posts', [])
+        similar_ids = event_dict.get('similar_events', [])
+        # Keywords are built directly so a snapshot's memory-mapped embedding rows are not copied into lists
+        keyword_dicts = event_dict.get('keywords')
+        event = Event.from_dict({**event_dict, 'keywords': None})
+        if keyword_dicts is not None:
+            event.keywords = [Keyword(kw['keyword'], kw['emb']) for kw in keyword_dicts]
+        
+        event.posts = self._resolve(post_links, db.get_post_by_id)
+        if len(event.posts) < len(post_links):
+            pending_posts.append((event, post_links))
+        event.similar_events = self._resolve(similar_ids, db.get_event_by_id)
+        if len(event.similar_events) < len(similar_ids):
+            pending_similar.append((event, similar_ids))
+        return event
+
+    def _load_topic(self, topic_dict: dict, pending_topics: list):
+        event_ids = topic_dict.get('events', [])
+        events = self._resolve(event_ids, db.get_event_by_id)
+        print(f"  Topic '{topic_dict.get('name')}': {len(events)} of {len(event_ids)} events loaded")
+        
+        # Create topic (decoder will set events to [])
+        topic = Topic.from_dict(topic_dict)
+        topic.events = events
+        
+        # Update existing topic or add new one
+        existing_topic = db.get_topic_by_id(topic.topic_id)
+        if existing_topic:
+            db.set_topic_events(existing_topic, topic.events)
+            existing_topic.actionables = topic.actionables
+            topic = existing_topic
+        else:
+            db.add_topic(topic)
+        
+        if len(events) < len(event_ids):
+            pending_topics.append((topic, event_ids))
+
+    def _resolve_pending(self, pending_posts: list, pending_similar: list, pending_topics: list):
+        for event, post_links in pending_posts:
+            event.posts = self._resolve(post_links, db.get_post_by_id)
+        for event, similar_ids in pending_similar:
+            event.similar_events = self._resolve(similar_ids, db.get_event_by_id)
+        for topic, event_ids in pending_topics:
+            db.set_topic_events(topic, self._resolve(event_ids, db.get_event_by_id))
+
     def load_database_from_json(self, json_file: str):
         """
         Load database from a JSON file (generated by main_generate.py)
+        The file is parsed incrementally, so memory stays bounded by the database rather than the file.
         Reconstructs relationships from IDs/links.
         
         Args:
@@ -171,73 +241,77 @@ class EventProcessingService:
         if not os.path.exists(json_file):
             raise FileNotFoundError(f"JSON file not found: {json_file}")
         
+        with open(json_file, 'r', encoding='utf-8') as f:
+            reader = JsonStreamReader(f)
+            return self._load_database(json_file, reader.items(),
+                                       lambda: reader.chars_read / max(os.path.getsize(json_file), 1))
+
+    def load_database_from_snapshot(self, snapshot_file: str):
+        """
+        Load database from a binary snapshot (see database/snapshot.py)
+        Keyword embeddings stay in the memory-mapped matrix next to the snapshot.
+        
+        Args:
+            snapshot_file: Path to the snapshot record file
+            
+        Returns: Dictionary with counts of loaded items
+        """
+        print("\n" + "=" * 70)
+        print(f"LOADING DATABASE FROM SNAPSHOT: {snapshot_file}")
+        print("=" * 70)
+        
+        if not os.path.exists(snapshot_file):
+            raise FileNotFoundError(f"Snapshot file not found: {snapshot_file}")
+        
+        with SnapshotReader(snapshot_file) as reader:
+            return self._load_database(snapshot_file, reader.items(),
+                                       lambda: reader.bytes_read / max(reader.size, 1))
+
+    def _load_database(self, path: str, items, progress):
+        """Build the database from (key, value) items; progress() is the fraction of the file read"""
         try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            # Reuse the persisted event vector index when there is one
+            index_file = db.vector_index_path(path)
+            if os.path.exists(index_file):
+                print(f"\nLoading vector index: {index_file}")
+                db.load_vector_index(index_file)
             
-            # Load posts first (they have no dependencies)
-            print("\nLoading posts...")
-            posts_data = data.get('posts', [])
-            posts_by_link = {}
-            for post_dict in posts_data:
-                post = Post.from_dict(post_dict)
-                db.add_post(post)
-                posts_by_link[post.link] = post
+            # Stream the file: posts, events and topics are built one at a time and linked as they
+            # arrive. References to something not loaded yet (e.g. a similar event further down)
+            # are kept as IDs and resolved at the end.
+            metadata = {}
+            loaded = {"posts": 0, "events": 0, "topics": 0}
+            pending_posts = []     # (event, post links)
+            pending_similar = []   # (event, similar event IDs)
+            pending_topics = []    # (topic, event IDs)
             
-            # Load events and reconstruct post relationships
-            print("Loading events...")
-            events_data = data.get('events', [])
-            events_by_id = {}
-            for event_dict in events_data:
-                # Reconstruct posts from links (save them before from_dict wipes them)
-                post_links = event_dict.get('posts', [])
-                reconstructed_posts = [posts_by_link[link] for link in post_links if link in posts_by_link]
-                
-                # Clear similar_events for now (will reconstruct after all events loaded)
-                event_dict['similar_events'] = []
-                
-                # Create event (decoder will set posts to [])
-                event = Event.from_dict(event_dict)
-                # Now manually assign the reconstructed posts
-                event.posts = reconstructed_posts
+            print("\nLoading posts, events and topics...")
+            for key, value in items:
+                if key == 'posts':
+                    self._load_post(value)
+                elif key == 'events':
+                    self._load_event(value, pending_posts, pending_similar)
+                elif key == 'topics':
+                    self._load_topic(value, pending_topics)
+                elif key == 'metadata':
+                    metadata = value
+                    continue
+                else:
+                    continue
                 
-                db.add_event(event)
-                if event.event_id:
-                    events_by_id[event.event_id] = event
+                loaded[key] += 1
+                if loaded[key] % self._load_progress_every == 0:
+                    print(f"  {loaded['posts']} posts, {loaded['events']} events, {loaded['topics']} topics "
+                          f"({min(progress(), 1):.0%} read)")
             
-            # Reconstruct similar_events relationships
-            print("Reconstructing similar_events relationships...")
-            for i, event_dict in enumerate(events_data):
-                similar_ids = event_dict.get('similar_events', [])
-                event = db.get_all_events()[i]
-                event.similar_events = [events_by_id[eid] for eid in similar_ids if eid in events_by_id]
+            # Resolve the references that pointed forward in the file
+            print("Reconstructing forward references...")
+            self._resolve_pending(pending_posts, pending_similar, pending_topics)
             
-            # Load topics and reconstruct event relationships
-            print("Loading topics...")
-            topics_data = data.get('topics', [])
-            for topic_dict in topics_data:
-                # Reconstruct events from IDs (save them before from_dict wipes them)
-                event_ids = topic_dict.get('events', [])
-                print(f"  Topic '{topic_dict.get('name')}' has event IDs: {event_ids}")
-                reconstructed_events = [events_by_id[eid] for eid in event_ids if eid in events_by_id]
-                print(f"  Reconstructed to {len(reconstructed_events)} event objects")
-                
-                # Create topic (decoder will set events to [])
-                topic = Topic.from_dict(topic_dict)
-                # Now manually assign the reconstructed events
-                topic.events = reconstructed_events
-                
-                # Update existing topic or add new one
-                existing_topic = db.get_topic_by_id(topic.topic_id)
-                if existing_topic:
-                    existing_topic.events = topic.events
-                    print(f"  Updated existing topic, now has {len(existing_topic.events)} events")
-                    existing_topic.actionables = topic.actionables
-                else:
-                    db.add_topic(topic)
-                    print(f"  Added new topic with {len(topic.events)} events")
+            # Index all events in one pass (only changed descriptions are re-embedded)
+            print("Indexing event embeddings...")
+            db.index_events(db.get_all_events())
             
-            metadata = data.get('metadata', {})
             
             # Get loaded objects from database (not raw dicts)
             loaded_posts = db.get_all_posts()
@@ -279,6 +353,101 @@ class EventProcessingService:
             }
             
         except Exception as e:
-            print(f"\n❌ ERROR loading database from JSON: {e}")
+            print(f"\n❌ ERROR loading database from {path}: {e}")
             print("=" * 70 + "\n")
-            raise
\ No newline at end of file
+            raise
+
+    def replay_write_ahead_log(self, wal: WriteAheadLog, metadata: dict) -> int:
+        """
+        Apply the mutations logged after the loaded database was saved (metadata is what the load
+        returned). A log that belongs to another database is left alone; WriteAheadLog.start
+        discards it. Must run before the log is attached to the database.
+        
+        Returns: Number of records replayed
+        """
+        if not wal.applies_to(metadata):
+            return 0
+        
+        print("\nReplaying write-ahead log...")
+        pending_posts, pending_similar, pending_topics = [], [], []
+        replayed = 0
+        for record in wal.records(metadata.get("wal_sequence", 0)):
+            op = record["op"]
+            if op == "post":
+                self._load_post(record["post"])
+            elif op == "engagement":
+                date = datetime.fromisoformat(record["date"]) if record["date"] else None
+                db.update_post_engagement(record["link"], date, record["total_engagement"])
+            elif op == "event":
+                self._replay_event(record, pending_posts, pending_similar)
+            elif op == "attach":
+                self._replay_attach(record)
+            elif op == "event_change":
+                self._replay_event_change(record, pending_similar)
+            elif op == "delete_event":
+                db.delete_event(record["event_id"])
+            elif op == "topic":
+                self._load_topic(record["topic"], pending_topics)
+            else:
+                print(f"⚠️  Skipping unknown write-ahead log record '{op}'")
+                continue
+            replayed += 1
+        
+        self._resolve_pending(pending_posts, pending_similar, pending_topics)
+        db.index_events(db.get_all_events())
+        print(f"✓ Replayed {replayed} write-ahead log records")
+        return replayed
+
+    def _replay_event(self, record: dict, pending_posts: list, pending_similar: list):
+        event_dict = record["event"]
+        if event_dict.get("keywords") is not None:
+            event_dict = {**event_dict, "keywords": [
+                {"keyword": kw["keyword"], "emb": unpack_embedding(kw["emb"]) if isinstance(kw["emb"], str) else kw["emb"]}
+                for kw in event_dict["keywords"]
+            ]}
+        event = self._build_event(event_dict, pending_posts, pending_similar)
+        
+        if db.get_event_by_id(event.event_id) is not None:
+            db.update_event(event.event_id, event, index=False)
+        else:
+            db.load_event(event)
+        topic = db.get_topic_by_id(record["topic_id"]) if record.get("topic_id") is not None else None
+        if topic is not None:
+            db.add_event_to_topic(event, topic)
+
+    def _replay_attach(self, record: dict):
+        event = db.get_event_by_id(record["event_id"])
+        if event is None:
+            print(f"⚠️  Write-ahead log attaches posts to unknown event {record['event_id']}")
+            return
+        for post in self._resolve(record["links"], db.get_post_by_id):
+            event.attach_post(post)
+        db.update_event_date(event)
+
+    def _replay_event_change(self, record: dict, pending_similar: list):
+        event = db.get_event_by_id(record["event_id"])
+        if event is None:
+            print(f"⚠️  Write-ahead log changes unknown event {record['event_id']}")
+            return
+        changes = record["changes"]
+        for name in ("name", "small_summary", "big_summary", "case_description"):
+            if name in changes:
+                setattr(event, name, changes[name])
+        if "date" in changes:
+            event.date = datetime.fromisoformat(changes["date"]) if changes["date"] else None
+        if "posts" in changes:
+            event.posts = self._resolve(changes["posts"], db.get_post_by_id)
+        if "similar_events" in changes:
+            event.similar_events = self._resolve(changes["similar_events"], db.get_event_by_id)
+            if len(event.similar_events) < len(changes["similar_events"]):
+                pending_similar.append((event, changes["similar_events"]))
+        if "keywords" in changes:
+            event.keywords = None if changes["keywords"] is None else [
+                Keyword(kw["keyword"], unpack_embedding(kw["emb"]) if isinstance(kw["emb"], str) else kw["emb"])
+                for kw in changes["keywords"]
+            ]
+        topic = db.get_topic_by_id(changes["topic_id"]) if changes.get("topic_id") is not None else None
+        if topic is not None:
+            db.add_event_to_topic(event, topic)
+        else:
+            db.update_event_date(event)
@@ -0,0 +1,198 @@
+import csv
+import os
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional, Tuple
+
+from database import db
+from models.Post import Post
+from Services.EventAssigningService import EventAssigningService
+
+
+@dataclass
+class IngestionItem:
+    seq: int
+    source_file: str
+    row_number: int
+    fields: dict
+    # Links already in the database or claimed by an earlier row are not enriched by the workers;
+    # the writer decides whether the post is known once the earlier rows were written
+    known: bool = False
+    post: Optional[Post] = None
+    error: Optional[Exception] = None
+
+
+class IngestionPipeline:
+    """
+    Three-stage CSV ingestion: one reader, a pool of enrichment workers and a single writer.
+
+    The reader parses rows and hands them to the workers, which run Post.create_with_enrichment
+    in parallel. The writer (the thread calling run) applies results strictly in row order, so
+    EventAssigningService and every database mutation see exactly the sequence a sequential run
+    would. At most max_pending rows are between the reader and the writer at any time, which
+    bounds memory and keeps the reader from running ahead of slow enrichment.
+
+    After every written row, cursor holds the position to resume from: the file, the last
+    written row number in it and how many of that file's rows count towards its limit.
+    """
+    _done = object()
+
+    def __init__(self, event_assigning_service: EventAssigningService,
+                 parse_row: Callable[[list], Optional[dict]],
+                 workers: int = 4, max_pending: int = 32):
+        self.event_assigning_service = event_assigning_service
+        self.parse_row = parse_row
+        self.workers = max(1, workers)
+        self.max_pending = max(self.workers, max_pending)
+
+        self.on_written: Optional[Callable[[IngestionItem], None]] = None
+        self.cursor: Optional[dict] = None
+
+        self._rows = queue.Queue(maxsize=self.max_pending)
+        self._results = queue.Queue()
+        self._pending = threading.BoundedSemaphore(self.max_pending)
+        self._stop = threading.Event()
+
+    def run(self, sources: Iterable[Tuple[str, Optional[int]]], resume_from: Optional[dict] = None) -> dict:
+        """
+        Ingest (csv path, row limit) sources in order; a limit of None reads the whole file.
+        With resume_from (a saved cursor), every row up to and including the cursor is skipped.
+        Returns per-file counts of the rows that were written.
+        """
+        sources = list(sources)
+        if resume_from is not None and resume_from["source_file"] not in [path for path, _ in sources]:
+            raise ValueError(f"Cannot resume: '{resume_from['source_file']}' is not one of the files to process")
+
+        counts = {}
+        self.cursor = resume_from
+        reader = threading.Thread(target=self._read, args=(sources, resume_from), name="ingest-reader", daemon=True)
+        workers = [threading.Thread(target=self._enrich, name=f"ingest-worker-{i}", daemon=True)
+                   for i in range(self.workers)]
+        reader.start()
+        for worker in workers:
+            worker.start()
+
+        try:
+            self._write(counts)
+        finally:
+            self._stop.set()
+        return counts
+
+    def _read(self, sources, resume_from):
+        seq = 0
+        claimed = set()
+        skip_rows = 0
+        taken = 0
+        try:
+            for source_file, limit in sources:
+                if resume_from is not None:
+                    if source_file != resume_from["source_file"]:
+                        continue
+                    skip_rows, taken = resume_from["row_number"], resume_from["rows_taken"]
+                    resume_from = None
+
+                if not os.path.exists(source_file):
+                    print(f"Warning: File '{source_file}' not found, skipping...")
+                    continue
+
+                with open(source_file, 'r', encoding='utf-8') as file:
+                    reader = csv.reader(file)
+                    next(reader, None)  # Skip header
+
+                    accepted, taken = taken, 0
+                    for row_number, row in enumerate(reader, start=1):
+                        if limit is not None and accepted >= limit:
+                            break
+                        if row_number <= skip_rows:
+                            continue
+                        fields = self.parse_row(row)
+                        if fields is None:
+                            continue
+                        if not self._acquire_slot():
+                            return
+
+                        known = fields["link"] in claimed or db.get_post_by_id(fields["link"]) is not None
+                        claimed.add(fields["link"])
+                        self._rows.put(IngestionItem(seq, source_file, row_number, fields, known=known))
+                        seq += 1
+                        accepted += 1
+                    skip_rows = 0
+        finally:
+            for _ in range(self.workers):
+                self._rows.put(self._done)
+
+    def _acquire_slot(self) -> bool:
+        """Wait for room in the pipeline; False once the writer has stopped"""
+        while not self._stop.is_set():
+            if self._pending.acquire(timeout=0.5):
+                return True
+        return False
+
+    def _enrich(self):
+        while True:
+            item = self._rows.get()
+            if item is self._done:
+                self._results.put(self._done)
+                return
+            if not item.known and not self._stop.is_set():
+                try:
+                    item.post = Post.create_with_enrichment(**item.fields)
+                except Exception as e:
+                    item.error = e
+            self._results.put(item)
+
+    def _write(self, counts: dict):
+        buffered = {}
+        next_seq = 0
+        finished_workers = 0
+
+        while finished_workers < self.workers:
+            item = self._results.get()
+            if item is self._done:
+                finished_workers += 1
+                continue
+            buffered[item.seq] = item
+
+            while next_seq in buffered:
+                item = buffered.pop(next_seq)
+                next_seq += 1
+                try:
+                    if self._apply(item):
+                        counts[item.source_file] = counts.get(item.source_file, 0) + 1
+                    self._advance_cursor(item)
+                    if self.on_written is not None:
+                        self.on_written(item)
+                finally:
+                    self._pending.release()
+
+    def _advance_cursor(self, item: IngestionItem):
+        same_file = self.cursor is not None and self.cursor["source_file"] == item.source_file
+        self.cursor = {
+            "source_file": item.source_file,
+            "row_number": item.row_number,
+            "rows_taken": (self.cursor["rows_taken"] if same_file else 0) + 1
+        }
+
+    def _apply(self, item: IngestionItem) -> bool:
+        fields = item.fields
+        if item.known:
+            if db.update_post_engagement(fields["link"], fields["date"], fields["total_engagement"]):
+                return True
+            # The row that claimed the link was not written (its enrichment failed), so this row
+            # is a new post after all and is enriched here, as a sequential run would
+            try:
+                item.post = Post.create_with_enrichment(**fields)
+            except Exception as e:
+                item.error = e
+        if item.error is not None:
+            print(f"Error processing row {item.row_number} of {item.source_file}: {item.error}")
+            return False
+
+        try:
+            if db.add_post(item.post):
+                self.event_assigning_service.assign_posts_to_events(item.post)
+            return True
+        except Exception as e:
+            print(f"Error processing row {item.row_number} of {item.source_file}: {e}")
+            return False
@@ -6,9 +6,13 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from api.routes import topics, events, search, posts, forum, auth, reports, database
+from llm.AsyncLlmClient import AsyncLlmClient
 from llm.LlmClient import LlmClient
 from Services.EventProcessingService import EventProcessingService
 from database import db
+from database.write_ahead_log import WriteAheadLog
+from main_generate import save_database_to_json, DATABASE_FILE, SNAPSHOT_FILE, WAL_DIRECTORY, \
+    WAL_FLUSH_INTERVAL, WAL_COMPACT_AFTER_BYTES
 
 
 app = FastAPI(
@@ -20,11 +24,16 @@ app = FastAPI(
 
 @app.on_event("startup")
 async def startup_event():
-    """Load database from pre-generated JSON file on startup"""
+    """Load database from the pre-generated snapshot (or JSON file) on startup"""
     
-    json_file = "db_generated.json"
+    json_file = DATABASE_FILE
+    snapshot_file = SNAPSHOT_FILE
     
-    if not os.path.exists(json_file):
+    # The snapshot is preferred unless the JSON was written after it
+    use_snapshot = os.path.exists(snapshot_file) and (
+        not os.path.exists(json_file) or os.path.getmtime(snapshot_file) >= os.path.getmtime(json_file))
+    
+    if not use_snapshot and not os.path.exists(json_file):
         print("\n" + "=" * 70)
         print("WARNING: No database file found!")
         print("=" * 70)
@@ -32,17 +41,22 @@ async def startup_event():
         print("to generate the database JSON file first.\n")
         print("Starting with empty database...")
         print("=" * 70 + "\n")
+        open_write_ahead_log(EventProcessingService(LlmClient()), {})
         return
     
     print("\n" + "=" * 70)
-    print("STARTUP: Loading database from JSON...")
-    print(f"File: {json_file}")
+    print(f"STARTUP: Loading database from {'snapshot' if use_snapshot else 'JSON'}...")
+    print(f"File: {snapshot_file if use_snapshot else json_file}")
     print("=" * 70)
     
     try:
         llm_client = LlmClient()
         service = EventProcessingService(llm_client)
-        service.load_database_from_json(json_file)
+        if use_snapshot:
+            loaded = service.load_database_from_snapshot(snapshot_file)
+        else:
+            loaded = service.load_database_from_json(json_file)
+        open_write_ahead_log(service, loaded["metadata"])
         
         print(f"\n✓ Successfully loaded database!")
         print(f"  Total Topics: {len(db.get_all_topics())}")
@@ -55,6 +69,24 @@ async def startup_event():
         print("=" * 70 + "\n")
         raise
 
+
+def open_write_ahead_log(service: EventProcessingService, metadata: dict):
+    """Replay what was logged since the loaded database was saved, then log every further mutation"""
+    wal = WriteAheadLog(WAL_DIRECTORY, flush_interval=WAL_FLUSH_INTERVAL, compact_after_bytes=WAL_COMPACT_AFTER_BYTES)
+    service.replay_write_ahead_log(wal, metadata)
+    wal.start(metadata)
+    # Compaction saves the JSON incrementally, only rewriting what changed since the last save
+    wal.compact = lambda: save_database_to_json(DATABASE_FILE)
+    db.attach_wal(wal)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close the shared async HTTP client used for LLM calls and flush the write-ahead log"""
+    await AsyncLlmClient.aclose()
+    if db.wal is not None:
+        db.wal.close()
+
 # Configure CORS to allow Next.js frontend
 app.add_middleware(
     CORSMiddleware,
@@ -2,13 +2,14 @@
 Database management API endpoints
 """
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from datetime import datetime
 
 # Import the save function from main_generate
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-from main_generate import save_database_to_json
+from main_generate import save_database_snapshot, save_database_to_json, DATABASE_FILE
 
 router = APIRouter()
 
@@ -16,7 +17,7 @@ router = APIRouter()
 @router.post("/database/save")
 async def save_database():
     """
-    Save the current in-memory database to a JSON file
+    Save the current in-memory database to a binary snapshot
     
     Returns:
         dict: Success message with filename and metadata
@@ -24,10 +25,10 @@ async def save_database():
     try:
         # Generate filename with timestamp
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"db_saved_{timestamp}.json"
+        filename = f"db_saved_{timestamp}.snapshot"
         
-        # Call the save function from main_generate
-        saved_file = save_database_to_json(filename)
+        # Call the save function from main_generate, off the event loop (it takes a while on a large database)
+        saved_file = await run_in_threadpool(save_database_snapshot, filename)
         
         return {
             "success": True,
@@ -46,19 +47,20 @@ async def save_database():
 @router.post("/database/save/overwrite")
 async def save_database_overwrite():
     """
-    Save the current in-memory database to the default db_generated.json file
-    (overwrites the existing file)
+    Save the current in-memory database to the default JSON loaded on startup
+    (overwrites the existing file). Only the parts that changed since the previous save are
+    serialized again, and the write-ahead log is compacted.
     
     Returns:
         dict: Success message with filename and metadata
     """
     try:
         # Save to default filename (will overwrite)
-        saved_file = save_database_to_json("db_generated.json")
+        saved_file = await run_in_threadpool(save_database_to_json, DATABASE_FILE)
         
         return {
             "success": True,
-            "message": "Database saved successfully (overwritten db_generated.json)",
+            "message": f"Database saved successfully (overwritten {DATABASE_FILE})",
             "filename": saved_file,
             "timestamp": datetime.now().isoformat()
         }
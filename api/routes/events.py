@@ -25,7 +25,7 @@ async def list_events():
                 "big_summary": event.big_summary,
                 "date": event.date.isoformat() if event.date else None,
                 "post_count": len(event.posts) if event.posts else 0,
-                "topic": event.get_event_topic() if event.posts else None
+                "topic": db.get_event_topic_name(event) if event.posts else None
             }
             for event in events
         ]
@@ -43,7 +43,7 @@ async def get_event(event_id: int):
         raise HTTPException(status_code=404, detail="Event not found")
     
     # Get topic info
-    topic_name = event.get_event_topic() if event.posts else None
+    topic_name = db.get_event_topic_name(event) if event.posts else None
     topic_info = None
     if topic_name:
         topic = db.get_topic_by_name(topic_name)
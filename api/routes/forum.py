@@ -8,7 +8,7 @@ from datetime import datetime
 
 from database import db
 from llm.AzerionPromptTemplate import AzerionPromptTemplate
-from llm.LlmClient import LlmClient
+from llm.AsyncLlmClient import AsyncLlmClient
 from llm.PromptTemplates.BelastingdienstData import _belastingdienst_data
 from llm.PromptTemplates.Prompts import _forum_response_prompt
 
@@ -30,8 +30,8 @@ class ForumPostResponse(BaseModel):
     user_name: str = "admin"
 
 
-def generate_response(post: ForumPostResponse, topic_id: int) -> str:
-    llm_client = LlmClient()
+async def generate_response(post: ForumPostResponse, topic_id: int) -> str:
+    llm_client = AsyncLlmClient()
 
     prev_conv = ""
     for p in forum_storage[topic_id]:
@@ -58,7 +58,7 @@ def generate_response(post: ForumPostResponse, topic_id: int) -> str:
         query=last_query,
     )
 
-    return llm_client.generate_response(AzerionPromptTemplate(prompt_text))
+    return await llm_client.generate_response(AzerionPromptTemplate(prompt_text))
 
 
 @router.get("/topics/{topic_id}/forum")
@@ -91,7 +91,7 @@ async def create_forum_post(topic_id: int, post: ForumPostCreate):
 
     # If addressed to the AI, generate a reply
     if post.content.startswith("Hey, PolderrAI"):
-        ai_content = generate_response(user_post, topic_id)
+        ai_content = await generate_response(user_post, topic_id)
 
         ai_post = ForumPostResponse(
             id=post_id + 1,
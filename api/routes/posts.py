@@ -9,11 +9,12 @@ from fastapi import APIRouter, HTTPException
 from Services.EventAssigningService import EventAssigningService
 from database import db
 from fastapi import HTTPException, UploadFile, File as FastAPIFile, FastAPI
+from fastapi.concurrency import run_in_threadpool
 
 from llm.LlmClient import LlmClient
 from models.Post import Post
 from models.File import File
-from llm.find_topic_for_post import find_topic_for_post
+from llm.find_topic_for_post import find_topic_for_post_async
 
 router = APIRouter()
 
@@ -137,11 +138,12 @@ async def get_posts_by_topic(topic_name: str):
 
 @router.post("/upload-file-as-post")
 async def upload_file_as_post(upload: UploadFile = FastAPIFile(...)):
-    content: bytes = upload.file.read()
+    content: bytes = await upload.read()
     filename: str = upload.filename
 
+    # Text extraction may transcribe audio or call a vision model, keep it off the event loop
     file = File(content=content, path=filename)
-    txt = file.read()
+    txt = await run_in_threadpool(file.read)
 
     unique_id = str(uuid.uuid4())
 
@@ -154,7 +156,7 @@ async def upload_file_as_post(upload: UploadFile = FastAPIFile(...)):
 
     # Assign topic to the post
     topics = db.get_all_topics()
-    topic_result = find_topic_for_post(post, topics)
+    topic_result = await find_topic_for_post_async(post, topics)
     
     # find_topic_for_post might return a Topic object or a string
     if hasattr(topic_result, 'name'):
@@ -173,16 +175,17 @@ async def upload_file_as_post(upload: UploadFile = FastAPIFile(...)):
     # Temporarily assign Topic object for event assignment
     post.topic = topic_obj
     
+    # Add the post before assigning it, so the write-ahead log records it before the event it joins
+    db.add_post(post)
+    
     # Assign post to events within the topic
     llm_client = LlmClient()
     event_assigning_service = EventAssigningService(llm_client)
-    event_assigning_service.assign_posts_to_events(post)
+    await run_in_threadpool(event_assigning_service.assign_posts_to_events, post)
     
     # Convert topic back to string for storage (as per Post model)
     post.topic = topic_name
     
-    db.add_post(post)
-    
     print("=" * 70)
     print(f"✅ POST ADDED TO DATABASE")
     print(f"UUID: {unique_id}")
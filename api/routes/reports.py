@@ -3,6 +3,7 @@ Reports API endpoints - Generate and export reports as PDF
 """
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import FileResponse
+from fastapi.concurrency import run_in_threadpool
 from datetime import datetime
 import os
 from reportlab.lib.pagesizes import letter, A4
@@ -196,7 +197,7 @@ async def export_topic_report_pdf(topic_id: int):
         raise HTTPException(status_code=404, detail="Topic not found")
     
     # Generate report text using existing method
-    report_content = db.get_raport_for_topic(topic_id)
+    report_content = await db.get_raport_for_topic_async(topic_id)
     if not report_content:
         raise HTTPException(status_code=500, detail="Failed to generate report")
     
@@ -205,7 +206,7 @@ async def export_topic_report_pdf(topic_id: int):
     title = f"Report: {topic.name}"
     
     try:
-        filepath = generate_pdf(report_content, title, filename)
+        filepath = await run_in_threadpool(generate_pdf, report_content, title, filename)
         return FileResponse(
             filepath,
             media_type='application/pdf',
@@ -226,7 +227,7 @@ async def export_event_report_pdf(event_id: int):
         raise HTTPException(status_code=404, detail="Event not found")
     
     # Generate report text using existing method
-    report_content = db.get_raport_for_event(event_id)
+    report_content = await db.get_raport_for_event_async(event_id)
     if not report_content:
         raise HTTPException(status_code=500, detail="Failed to generate report")
     
@@ -235,7 +236,7 @@ async def export_event_report_pdf(event_id: int):
     title = f"Event Report: {event.name}"
     
     try:
-        filepath = generate_pdf(report_content, title, filename)
+        filepath = await run_in_threadpool(generate_pdf, report_content, title, filename)
         return FileResponse(
             filepath,
             media_type='application/pdf',
@@ -251,7 +252,7 @@ async def export_weekly_report_pdf():
     """
     
     # Generate report text
-    report_content = db.get_raport_for_last_week()
+    report_content = await db.get_raport_for_last_week_async()
     if not report_content:
         raise HTTPException(status_code=500, detail="Failed to generate report")
     
@@ -260,7 +261,7 @@ async def export_weekly_report_pdf():
     title = "Weekly Report"
     
     try:
-        filepath = generate_pdf(report_content, title, filename)
+        filepath = await run_in_threadpool(generate_pdf, report_content, title, filename)
         return FileResponse(
             filepath,
             media_type='application/pdf',
@@ -276,7 +277,7 @@ async def export_monthly_report_pdf():
     """
     
     # Generate report text
-    report_content = db.get_raport_for_last_month()
+    report_content = await db.get_raport_for_last_month_async()
     if not report_content:
         raise HTTPException(status_code=500, detail="Failed to generate report")
     
@@ -285,7 +286,7 @@ async def export_monthly_report_pdf():
     title = "Monthly Report"
     
     try:
-        filepath = generate_pdf(report_content, title, filename)
+        filepath = await run_in_threadpool(generate_pdf, report_content, title, filename)
         return FileResponse(
             filepath,
             media_type='application/pdf',
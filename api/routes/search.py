@@ -5,6 +5,7 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import List, Optional, Tuple
 from database import db
+from llm.AsyncLlmClient import AsyncLlmClient
 from llm.LlmClient import LlmClient
 from llm.AzerionPromptTemplate import AzerionPromptTemplate
 from llm.PromptTemplates.Prompts import search_query_to_topic_name_prompt
@@ -13,6 +14,9 @@ from models.Topic import Topic
 
 router = APIRouter()
 
+# The largest keyword-overlap boost
+MAX_KEYWORD_BOOST = 0.15
+
 
 class SearchRequest(BaseModel):
     query: str
@@ -65,8 +69,8 @@ async def search_by_similarity(request: SearchRequest) -> TopicResponse:
         raise HTTPException(status_code=400, detail="Search query cannot be empty")
     
     # Initialize services
-    llm_client = LlmClient()
-    similarity_service = SemanticSimilarityService(llm_client)
+    llm_client = AsyncLlmClient()
+    similarity_service = SemanticSimilarityService(LlmClient(), llm_client)
     
     # Step 1: Query expansion for short queries
     query_word_count = len(search_query.split())
@@ -90,7 +94,7 @@ Original:
 \"\"\"{search_query}\"\"\"
 
 Rewritten for embeddings:"""
-        expanded_query = llm_client.generate_response(AzerionPromptTemplate(prompt=expansion_prompt))
+        expanded_query = await llm_client.generate_response(AzerionPromptTemplate(prompt=expansion_prompt))
         search_query = expanded_query.strip()
         print(f"✓ Expanded to: '{search_query}'")
     
@@ -111,20 +115,26 @@ Rewritten for embeddings:"""
     # Step 4: Calculate hybrid similarity scores for each event
     events_with_scores: List[Tuple[any, float]] = []
     
-    for event in all_events:
-        # Skip events without description
-        event_text = event.case_description or event.small_summary
-        if not event_text or event_text.strip() == "":
-            continue
-        
+    # Embed the query once; event descriptions are already in the database's vector index
+    query_embedding = await similarity_service.embed_async(search_query)
+    
+    # The keyword boost adds at most 0.15, so anything below threshold - 0.15 can never qualify.
+    # Every event above that is a candidate, as when each event was scored in turn.
+    candidates = db.search_events_by_embedding(
+        query_embedding,
+        top_k=None,
+        min_score=similarity_threshold - MAX_KEYWORD_BOOST
+    )
+    query_words = set(search_query.lower().split())
+    
+    for event, semantic_score in candidates:
         # Semantic similarity using case_description (optimized for matching)
-        semantic_score = similarity_service.similarity(search_query, event_text)
+        event_text = event.matching_text()
         
         # Keyword overlap boost (simple word matching)
-        query_words = set(search_query.lower().split())
         event_words = set(event_text.lower().split())
         common_words = query_words.intersection(event_words)
-        keyword_boost = min(len(common_words) * 0.05, 0.15)  # Max 15% boost
+        keyword_boost = min(len(common_words) * 0.05, MAX_KEYWORD_BOOST)  # Max 15% boost
         
         # Hybrid score: 85% semantic + 15% keyword boost
         final_score = min(semantic_score + keyword_boost, 1.0)
@@ -144,7 +154,7 @@ Rewritten for embeddings:"""
     
     # Step 6: Generate topic name from ORIGINAL query (not expanded)
     prompt = search_query_to_topic_name_prompt.format(search_query=original_query)
-    topic_name = llm_client.generate_response(AzerionPromptTemplate(prompt=prompt))
+    topic_name = await llm_client.generate_response(AzerionPromptTemplate(prompt=prompt))
     topic_name = topic_name.strip()
     
     print(f"📌 Generated topic name: '{topic_name}'")
@@ -155,7 +165,7 @@ Rewritten for embeddings:"""
 Topic: {topic_name}
 
 Emoji:"""
-    topic_emoji = llm_client.generate_response(AzerionPromptTemplate(prompt=emoji_prompt))
+    topic_emoji = await llm_client.generate_response(AzerionPromptTemplate(prompt=emoji_prompt))
     topic_emoji = topic_emoji.strip()
     
     # Fallback to default if response is not an emoji
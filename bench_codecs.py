@@ -0,0 +1,103 @@
+"""
+Benchmark the generated model codecs against dataclasses_json
+
+Builds a synthetic database (posts with actionables and engagement deltas, events with keyword
+embeddings, topics), checks that both codecs produce byte-identical JSON and decode to the same
+objects, then times to_dict and from_dict with each.
+
+Usage: python bench_codecs.py [--posts N] [--repeat R]
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from main_generate import DateTimeEncoder
+from models.Actionable import Actionable
+from models.Event import Event
+from models.Keyword import Keyword
+from models.Post import Post
+from models.Topic import Topic
+
+
+def build_database(num_posts: int, embedding_dim: int = 768):
+    rng = random.Random(0)
+    start = datetime(2024, 1, 1)
+    posts = [
+        Post(
+            link=f"https://example.com/post/{i}",
+            content=f"Post {i} about road works near the station " * 3,
+            date=start + timedelta(hours=i),
+            source="facebook",
+            satisfaction_rating=rng.randint(0, 100),
+            actionables=[Actionable(f"{i}-{j}", f"https://example.com/post/{i}", "Wanneer is de weg weer open?",
+                                    "True", "De weg is volgende week weer open.") for j in range(i % 3)],
+            subject_description="Road works near the station block traffic.",
+            topic="Verkeer",
+            delta_interactions=[(start + timedelta(hours=i, minutes=m), m) for m in range(3)],
+            total_engagement=rng.randint(0, 500)
+        )
+        for i in range(num_posts)
+    ]
+    events = []
+    for i in range(0, num_posts, 5):
+        events.append(Event(
+            event_id=len(events) + 1,
+            name=f"Event {i}",
+            small_summary="Road works near the station.",
+            big_summary="Road works near the station cause delays for commuters. " * 4,
+            case_description="Residents ask when the road reopens.",
+            posts=posts[i:i + 5],
+            similar_events=events[-2:],
+            keywords=[Keyword(f"keyword {k}", [rng.uniform(-1, 1) for _ in range(embedding_dim)]) for k in range(5)],
+            date=posts[min(i + 4, num_posts - 1)].date
+        ))
+    topics = [Topic(topic_id=t, name=f"Topic {t}", events=events[t::10]) for t in range(10)]
+    return posts, events, topics
+
+
+def encode(data) -> str:
+    return json.dumps(data, indent=2, ensure_ascii=False, cls=DateTimeEncoder)
+
+
+def best_of(repeat: int, function) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the generated model codecs against dataclasses_json")
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    posts, events, topics = build_database(args.posts)
+    groups = [(Post, posts), (Event, events), (Topic, topics)]
+
+    print(f"{len(posts)} posts, {len(events)} events, {len(topics)} topics\n")
+    print(f"{'':<16}{'dataclasses_json':>18}{'generated':>12}{'speedup':>10}")
+    for cls, objects in groups:
+        reflective = [obj.reflective_to_dict() for obj in objects]
+        generated = [obj.to_dict() for obj in objects]
+        assert encode(reflective) == encode(generated), f"{cls.__name__}.to_dict output differs"
+
+        dicts = json.loads(encode(generated))
+        assert encode([cls.reflective_from_dict(d).to_dict() for d in dicts]) == \
+            encode([cls.from_dict(d).to_dict() for d in dicts]), f"{cls.__name__}.from_dict result differs"
+
+        slow = best_of(args.repeat, lambda: [obj.reflective_to_dict() for obj in objects])
+        fast = best_of(args.repeat, lambda: [obj.to_dict() for obj in objects])
+        print(f"{cls.__name__ + '.to_dict':<16}{slow * 1000:>16.1f}ms{fast * 1000:>10.1f}ms{slow / fast:>9.1f}x")
+
+        slow = best_of(args.repeat, lambda: [cls.reflective_from_dict(d) for d in dicts])
+        fast = best_of(args.repeat, lambda: [cls.from_dict(d) for d in dicts])
+        print(f"{cls.__name__ + '.from_dict':<16}{slow * 1000:>16.1f}ms{fast * 1000:>10.1f}ms{slow / fast:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,20 @@
+import asyncio
+import bisect
+import os
+import threading
+import uuid
 from ntpath import exists
-from typing import List, Optional
+from typing import List, Optional, Set, Tuple
 
+from llm.AsyncLlmClient import AsyncLlmClient
 from llm.LlmClient import LlmClient
+from llm.MapReduceSummarizer import MapReduceSummarizer
 from llm.AzerionPromptTemplate import AzerionPromptTemplate
+from database.keyword_index import KeywordIndex
+from database.vector_index import VectorIndex, create_vector_index, load_vector_index, text_fingerprint
+from database.write_ahead_log import WriteAheadLog, pack_embedding
 from llm.PromptTemplates.Prompts import get_report_for_event_prompt, get_report_for_last_month_prompt, get_report_for_last_week_prompt, get_report_for_topic_prompt
+from llm.SemanticSimilarityService import SemanticSimilarityService
 from models.Event import Event
 from models.Post import Post
 from models.Keyword import Keyword
@@ -11,6 +22,11 @@ from datetime import datetime, timedelta
 from models.Topic import Topic
 from typing import Dict
 
+# Vector index used for event descriptions and keywords: "ivf" (approximate) or "exact"
+VECTOR_INDEX_KIND = "ivf"
+# How far back from a post's date events are considered for assigning the post
+EVENT_MATCH_WINDOW_HOURS = 72
+
 class InMemoryDB:
     """In-memory database using lists for posts and events"""
     
@@ -18,6 +34,39 @@ class InMemoryDB:
         self.posts: Dict[str, Post] = {}
         self.events: List[Event] = []
         self.topics: List[Topic] = []
+        # Description embeddings keyed by event_id, keyword embeddings keyed by (event_id, position).
+        # Both are tagged with the event's topic name.
+        self.event_index: VectorIndex = create_vector_index(VECTOR_INDEX_KIND)
+        self.keyword_index: VectorIndex = create_vector_index(VECTOR_INDEX_KIND)
+        self._indexed_keyword_counts: Dict[int, int] = {}
+        # Keyword text (postings and trigrams) for keyword search, refreshed together with the embeddings
+        self.keyword_text_index = KeywordIndex()
+        self._embedding_service = None
+        # Secondary indexes, kept in sync by every method that adds, replaces or removes an entity.
+        # _event_topics maps an event_id to the topic the event was filed under.
+        self._events_by_id: Dict[int, Event] = {}
+        self._topics_by_id: Dict[int, Topic] = {}
+        self._topics_by_name: Dict[str, Topic] = {}
+        self._event_topics: Dict[int, Topic] = {}
+        # Position of each event in self.events. Entries at or after _positions_valid_below may
+        # be stale (a delete shifted them) and are renumbered the next time one is looked up.
+        self._event_positions: Dict[int, int] = {}
+        self._positions_valid_below = 0
+        self._next_event_id = 1
+        # Per topic name, (date, event_id) of its events sorted by date, and where each event is filed
+        self._topic_timelines: Dict[str, List[Tuple[datetime, int]]] = {}
+        self._timeline_entries: Dict[int, Tuple[str, datetime]] = {}
+        # Mutations are appended to the write-ahead log, once one is attached, under _mutation_lock,
+        # so the log order is the order they were applied in and export() sees no half-logged change
+        self.wal: Optional[WriteAheadLog] = None
+        self._mutation_lock = threading.RLock()
+        # What the log last recorded of each event, so an in-place change is logged as a delta
+        self._logged_events: Dict[int, dict] = {}
+        # Keys of the posts, events and topics changed since each save target last took them
+        # (take_changes), so a save only reserializes what changed; a target's segments are only
+        # valid for the instance_id that wrote them
+        self.instance_id = uuid.uuid4().hex
+        self._changes: Dict[str, Dict[str, Set]] = {}
         
         self.topics = [
             Topic(topic_id=1,  name="Traffic and Safety",        events=[], icon="🚦"),
@@ -36,6 +85,8 @@ class InMemoryDB:
             Topic(topic_id=14, name="Digital Services",          events=[], icon="💻"),
             Topic(topic_id=15, name="Other",                     events=[], icon="📋"),
         ]
+        for topic in self.topics:
+            self._register_topic(topic)
 
         
         
@@ -65,18 +116,50 @@ class InMemoryDB:
     
     def get_topic_by_id(self, topic_id: int) -> Optional[Topic]:
         """Get a specific topic by ID"""
-        
-        for topic in self.topics:
-            if topic.topic_id == int(topic_id):
-                return topic
-        return None
+        return self._topics_by_id.get(int(topic_id))
     
     def get_all_events_by_topic(self, topic: str) -> List[Event]:
         """Get all events for a specific topic"""
-        for topic in self.topics:
-            if topic.name == topic:
-                return topic.events
-        return None
+        topic_instance = self._topics_by_name.get(topic)
+        return topic_instance.events if topic_instance else None
+    
+    def get_topic_for_event(self, event_id: int) -> Optional[Topic]:
+        """The topic an event was filed under"""
+        return self._event_topics.get(event_id)
+    
+    def get_event_topic_name(self, event: Event) -> Optional[str]:
+        """The name of the topic an event is filed under, or of its first post's topic when it is not filed"""
+        filed_topic = self._event_topics.get(event.event_id)
+        if filed_topic is not None and self._events_by_id.get(event.event_id) is event:
+            return event.get_event_topic(filed_topic)
+        return event.get_event_topic()
+    
+    def add_event_to_topic(self, event: Event, topic: Topic):
+        """File an event under a topic, moving it out of the topic it was filed under before"""
+        with self._mutation_lock:
+            previous = self._event_topics.get(event.event_id)
+            if previous is not None and previous is not topic:
+                previous.events = [e for e in previous.events if e is not event]
+                self._mark_changed("topics", previous.topic_id)
+            if not any(e is event for e in topic.events):
+                topic.events.append(event)
+                self._mark_changed("topics", topic.topic_id)
+            self._event_topics[event.event_id] = topic
+            self.update_event_date(event)
+    
+    def set_topic_events(self, topic: Topic, events: List[Event]):
+        """Replace a topic's events, filing every one of them under this topic"""
+        with self._mutation_lock:
+            for event_id, owner in list(self._event_topics.items()):
+                if owner is topic:
+                    del self._event_topics[event_id]
+            dropped = [event for event in topic.events if not any(event is e for e in events)]
+            topic.events = []
+            self._mark_changed("topics", topic.topic_id)
+            for event in events:
+                self.add_event_to_topic(event, topic)
+            for event in dropped:
+                self.update_event_date(event)
     
     # Event CRUD operations
     def get_all_events(self) -> List[Event]:
@@ -85,56 +168,226 @@ class InMemoryDB:
     
     def get_event_by_id(self, event_id: int) -> Optional[Event]:
         """Get a specific event by ID"""
-        for event in self.events:
-            if event.event_id == event_id:
-                return event
-        return None
+        return self._events_by_id.get(event_id)
     
-    def add_event(self, event: Event) -> Event:
-        self.events.append(event)
-        event.event_id = len(self.events)
+    def search_events_by_embedding(self, query_embedding, top_k: Optional[int] = None, min_score: float = None,
+                                   topic: str = None, event_ids=None) -> List[Tuple[Event, float]]:
+        """
+        Find the events whose description embedding is closest to a query embedding.
+        Returns (event, cosine similarity) pairs, best first; top_k=None returns every event above
+        min_score, considering only event_ids when given.
+        """
+        if top_k is None:
+            matches = self.event_index.radius(query_embedding, min_score if min_score is not None else -1.0,
+                                              tag=topic, keys=event_ids)
+        else:
+            matches = self.event_index.search(query_embedding, top_k, tag=topic, min_score=min_score)
+        
+        results = []
+        for event_id, score in matches:
+            event = self.get_event_by_id(event_id)
+            if event:
+                results.append((event, score))
+        return results
+    
+    def _get_embedding_service(self) -> SemanticSimilarityService:
+        if self._embedding_service is None:
+            self._embedding_service = SemanticSimilarityService(LlmClient())
+        return self._embedding_service
+    
+    def index_events(self, events: List[Event]):
+        """
+        (Re)index the description and keyword embeddings of events.
+        Description embeddings are restored from the index when the text is unchanged,
+        otherwise the stale ones are embedded in one batched call.
+        """
+        stale = []
+        for event in events:
+            text = event.matching_text()
+            if event.event_id is None or not text or event.has_fresh_description_embedding():
+                continue
+            if self.event_index.fingerprint(event.event_id) == text_fingerprint(text):
+                event.set_description_embedding(self.event_index.get(event.event_id))
+            else:
+                stale.append(event)
+        
+        try:
+            Event.refresh_description_embeddings(stale, self._get_embedding_service())
+        except Exception as e:
+            print(f"⚠️  Could not embed {len(stale)} event descriptions: {e}")
+        
+        # Under the mutation lock, so an event re-indexed from two threads (or deleted meanwhile)
+        # never ends up with a mix of both keyword sets
+        with self._mutation_lock:
+            for event in events:
+                if event.event_id is not None and self._events_by_id.get(event.event_id) is event:
+                    self._index_event_entries(event)
+    
+    def _index_event_entries(self, event: Event):
+        topic = self.get_event_topic_name(event)
+        
+        if event.has_fresh_description_embedding():
+            self.event_index.add(event.event_id, event.description_embedding, tag=topic,
+                                 fingerprint=text_fingerprint(event.matching_text()))
+        else:
+            self.event_index.remove(event.event_id)
+        
+        self._unindex_keywords(event.event_id)
+        keywords = event.keywords or []
+        for position, keyword in enumerate(keywords):
+            if keyword.emb is not None and len(keyword.emb):
+                try:
+                    self.keyword_index.add((event.event_id, position), keyword.emb, tag=topic)
+                except ValueError as e:
+                    print(f"⚠️  Skipping keyword '{keyword.keyword}' of event {event.event_id}: {e}")
+        self._indexed_keyword_counts[event.event_id] = len(keywords)
+        self.keyword_text_index.update_event(event.event_id, event.keywords)
+    
+    def _unindex_keywords(self, event_id: int):
+        for position in range(self._indexed_keyword_counts.pop(event_id, 0)):
+            self.keyword_index.remove((event_id, position))
+    
+    def _unindex_event(self, event_id: int):
+        self.event_index.remove(event_id)
+        self._unindex_keywords(event_id)
+        self.keyword_text_index.remove_event(event_id)
+    
+    @staticmethod
+    def vector_index_path(json_file: str) -> str:
+        """Where the event vector index is persisted next to a database JSON file"""
+        return os.path.splitext(json_file)[0] + ".events.npz"
+    
+    def save_vector_index(self, path: str):
+        self.event_index.save(path)
+    
+    def load_vector_index(self, path: str):
+        """
+        Load a persisted event index. Its vectors are reused by index_events for events whose
+        description is unchanged; keyword vectors are rebuilt from Keyword.emb.
+        """
+        self.event_index = load_vector_index(path)
+    
+    def add_event(self, event: Event, index: bool = True, topic: Topic = None) -> Event:
+        """Add an event with the next free ID, optionally filing it under a topic"""
+        with self._mutation_lock:
+            event.event_id = self._next_event_id
+            self._next_event_id += 1
+            self._append_event(event)
+            if topic is not None:
+                self.add_event_to_topic(event, topic)
+            else:
+                self.update_event_date(event)
+            self._log_event(event)
+        if index:
+            self.index_events([event])
+        return event
+    
+    def load_event(self, event: Event) -> Event:
+        """Insert a persisted event keeping its ID; it is indexed later by index_events"""
+        if event.event_id is None or event.event_id in self._events_by_id:
+            return self.add_event(event, index=False)
+        self._append_event(event)
+        self._next_event_id = max(self._next_event_id, event.event_id + 1)
+        self.update_event_date(event)
         return event
     
-    def update_event(self, event_id: int, updated_event: Event) -> Optional[Event]:
+    def update_event(self, event_id: int, updated_event: Event, index: bool = True) -> Optional[Event]:
         """Update an existing event"""
-        for i, event in enumerate(self.events):
-            if event.event_id == event_id:
-                self.events[i] = updated_event
-                return updated_event
-        return None
+        with self._mutation_lock:
+            event = self._events_by_id.get(event_id)
+            if event is None:
+                return None
+            
+            self.events[self._position_of(event)] = updated_event
+            updated_event.event_id = event_id
+            self._events_by_id[event_id] = updated_event
+            topic = self._event_topics.get(event_id)
+            if topic is not None:
+                topic.events = [updated_event if e is event else e for e in topic.events]
+            self.update_event_date(updated_event)
+            self._log_event(updated_event)
+            self._unindex_event(event_id)
+        if index:
+            self.index_events([updated_event])
+        return updated_event
+    
+    def record_event_change(self, event: Event):
+        """Log an event that was changed in place (posts attached, enrichment regenerated)"""
+        with self._mutation_lock:
+            if self._events_by_id.get(event.event_id) is event:
+                self._log_event_change(event)
     
     def delete_event(self, event_id: int) -> bool:
         """Delete an event by ID"""
-        for i, event in enumerate(self.events):
-            if event.event_id == event_id:
-                self.events.pop(i)
-                return True
-        return False
+        with self._mutation_lock:
+            event = self._events_by_id.pop(event_id, None)
+            if event is None:
+                return False
+            
+            position = self._position_of(event)
+            self.events.pop(position)
+            del self._event_positions[event_id]
+            self._positions_valid_below = min(self._positions_valid_below, position)
+            topic = self._event_topics.pop(event_id, None)
+            if topic is not None:
+                topic.events = [e for e in topic.events if e is not event]
+                self._mark_changed("topics", topic.topic_id)
+            self._unfile_event_date(event_id)
+            self._mark_changed("events", event_id)
+            self._logged_events.pop(event_id, None)
+            self._log({"op": "delete_event", "event_id": event_id})
+            self._unindex_event(event_id)
+        return True
     
-    def get_events_by_topic_from_last_24_hours(self, date: datetime, topic: str) -> List[Event]:
-        """Get all events for a specific topic from the last 72 hours"""
-        events = []
-        cutoff_date = date - timedelta(hours=72)
-        
-        print(f"\n🔍 Searching for events with topic='{topic}', after {cutoff_date}")
+    def _append_event(self, event: Event):
+        if self._positions_valid_below == len(self.events):
+            self._event_positions[event.event_id] = len(self.events)
+            self._positions_valid_below += 1
+        self.events.append(event)
+        self._events_by_id[event.event_id] = event
+    
+    def _position_of(self, event: Event) -> int:
+        position = self._event_positions.get(event.event_id)
+        if position is None or position >= self._positions_valid_below:
+            for i in range(self._positions_valid_below, len(self.events)):
+                self._event_positions[self.events[i].event_id] = i
+            self._positions_valid_below = len(self.events)
+            position = self._event_positions[event.event_id]
+        return position
+    
+    def update_event_date(self, event: Event):
+        """(Re)file an event in its topic's timeline; call whenever its date or topic changed"""
+        self._unfile_event_date(event.event_id)
+        topic = self._event_topics.get(event.event_id)
+        topic_name = topic.name if topic is not None else self.get_event_topic_name(event)
+        if event.event_id is None or topic_name is None or event.date is None:
+            return
+        bisect.insort(self._topic_timelines.setdefault(topic_name, []), (event.date, event.event_id))
+        self._timeline_entries[event.event_id] = (topic_name, event.date)
+    
+    def _unfile_event_date(self, event_id: int):
+        entry = self._timeline_entries.pop(event_id, None)
+        if entry is None:
+            return
+        topic_name, date = entry
+        timeline = self._topic_timelines[topic_name]
+        position = bisect.bisect_left(timeline, (date, event_id))
+        if position < len(timeline) and timeline[position] == (date, event_id):
+            timeline.pop(position)
+    
+    def get_events_by_topic_from_last_24_hours(self, date: datetime, topic: str, window_hours: float = None) -> List[Event]:
+        """
+        Get all events for a specific topic dated after `date` minus the match window
+        (EVENT_MATCH_WINDOW_HOURS unless window_hours is given), oldest first
+        """
+        if window_hours is None:
+            window_hours = EVENT_MATCH_WINDOW_HOURS
+        cutoff_date = date - timedelta(hours=window_hours)
         
-        for event in self.events:
-            event_topic_name = event.get_event_topic()
-            
-            print(f"  Event '{event.name}': topic='{event_topic_name}', date={event.date}")
-            
-            # Check if topic matches and event is within 72 hours
-            if event_topic_name == topic and event.date and event.date > cutoff_date:
-                print(f"    ✓ Match found!")
-                events.append(event)
-            else:
-                if event_topic_name != topic:
-                    print(f"    ✗ Topic mismatch")
-                elif not event.date or event.date <= cutoff_date:
-                    print(f"    ✗ Too old (cutoff: {cutoff_date})")
-                    
-        print(f"📊 Found {len(events)} matching events\n")
-        return events
+        timeline = self._topic_timelines.get(topic, [])
+        # Entries are (date, event_id); every id sorts below infinity, so this skips dates <= cutoff
+        start = bisect.bisect_right(timeline, (cutoff_date, float('inf')))
+        return [self._events_by_id[event_id] for _, event_id in timeline[start:]]
     
     # Post CRUD operations
     def get_all_posts(self) -> List[Post]:
@@ -152,35 +405,60 @@ class InMemoryDB:
             return event.posts
         return []
     
+    def update_post_engagement(self, link: str, date: datetime, total_engagement: int) -> bool:
+        """
+        Record a new engagement total for an already known post.
+        Returns False if the link is not in the database.
+        """
+        with self._mutation_lock:
+            existing_post = self.posts.get(link)
+            if not existing_post:
+                return False
+            
+            last_total_engagement = existing_post.total_engagement
+            print(f"Last total engagement: {last_total_engagement}")
+            print(f"New total engagement: {total_engagement}")
+            existing_post.total_engagement = total_engagement
+            existing_post.delta_interactions.append((date, total_engagement - last_total_engagement))
+            self._mark_changed("posts", link)
+            self._log({"op": "engagement", "link": link, "date": date.isoformat() if date else None,
+                       "total_engagement": total_engagement})
+            return True
+    
     def add_post(self, post: Post) -> bool:
         """Add a new post"""
         url = post.link
-        existing_post = self.posts.get(url)
-        if existing_post:
-            last_total_engagement = existing_post.total_engagement
-            print(f"Last total engagement: {last_total_engagement}")
-            print(f"New total engagement: {post.total_engagement}")
-            existing_post.total_engagement = post.total_engagement
-            existing_post.delta_interactions.append((post.date, post.total_engagement - last_total_engagement))
-            return False
-        
-        post.delta_interactions.append((post.date, post.total_engagement))
-        self.posts[url] = post
-        return True
+        with self._mutation_lock:
+            if self.update_post_engagement(url, post.date, post.total_engagement):
+                return False
+            
+            post.delta_interactions.append((post.date, post.total_engagement))
+            self.posts[url] = post
+            self._mark_changed("posts", url)
+            self._log({"op": "post", "post": post.to_dict()})
+            return True
+    
+    def load_post(self, post: Post):
+        """Insert a persisted post as is, its engagement history already contains its own first delta"""
+        self.posts[post.link] = post
     
     def update_post(self, link: str, updated_post: Post) -> Optional[Post]:
         """Update an existing post"""
-        if link in self.posts:
-            self.posts[link] = updated_post
-            return updated_post
-        return None
+        with self._mutation_lock:
+            if link in self.posts:
+                self.posts[link] = updated_post
+                self._mark_changed("posts", link)
+                return updated_post
+            return None
     
     def delete_post(self, link: str) -> bool:
         """Delete a post by ID"""
-        if link in self.posts:
-            del self.posts[link]
-            return True
-        return False
+        with self._mutation_lock:
+            if link in self.posts:
+                del self.posts[link]
+                self._mark_changed("posts", link)
+                return True
+            return False
     
     # Helper methods
     def get_total_engagement_for_event(self, event_id: int) -> int:
@@ -217,50 +495,232 @@ class InMemoryDB:
             "latest_post_date": max([p.date for p in posts]) if posts else None
         }
 
-    def get_raport_for_event(self, event_id: int) -> Optional[str]:
+    def _raport_prompt_for_event(self, event_id: int) -> Optional[AzerionPromptTemplate]:
         event = self.get_event_by_id(event_id)
         if not event:
             return None
+        event_posts = self._report_posts(event.posts or [])
+        return AzerionPromptTemplate(prompt=get_report_for_event_prompt.format(event_posts=event_posts))
+    
+    @staticmethod
+    def _report_posts(posts: List[Post]) -> str:
+        """
+        Posts as a report prompt shows them: formatted in full when they fit in one prompt,
+        otherwise one line per post (date, source, sentiment, engagement, content) condensed
+        with map-reduce
+        """
+        summarizer = MapReduceSummarizer(LlmClient())
+        formatted = str(posts)
+        if summarizer.estimate_tokens(formatted) <= summarizer.token_budget:
+            return formatted
+        return summarizer.condense([
+            f"[{post.date.isoformat() if post.date else 'unknown date'}] {post.source} "
+            f"(sentiment {post.satisfaction_rating}, engagement {post.total_engagement}): {post.content}"
+            for post in posts
+        ], separator='\n')
+
+    def get_raport_for_event(self, event_id: int) -> Optional[str]:
+        prompt = self._raport_prompt_for_event(event_id)
+        if not prompt:
+            return None
         llm_client = LlmClient()
-        return llm_client.generate_response(AzerionPromptTemplate(prompt=get_report_for_event_prompt.format(event_posts=event.posts)))
+        return llm_client.generate_response(prompt)
+
+    async def get_raport_for_event_async(self, event_id: int) -> Optional[str]:
+        # Condensing the posts makes blocking LLM calls, keep them off the event loop
+        prompt = await asyncio.to_thread(self._raport_prompt_for_event, event_id)
+        if not prompt:
+            return None
+        llm_client = AsyncLlmClient()
+        return await llm_client.generate_response(prompt)
 
     def get_topic_by_name(self, topic_name: str) -> Optional[Topic]:
-        for topic in self.topics:
-            if topic.name == topic_name:
-                return topic
-        return None
+        return self._topics_by_name.get(topic_name)
     
     def add_topic(self, topic: Topic) -> Topic:
         # Generate new topic ID
-        if not topic.topic_id:
-            topic.topic_id = len(self.topics) + 1
-        self.topics.append(topic)
+        with self._mutation_lock:
+            if not topic.topic_id:
+                topic.topic_id = max(self._topics_by_id, default=0) + 1
+            self.topics.append(topic)
+            self._register_topic(topic)
+            self._mark_changed("topics", topic.topic_id)
+            self._log({"op": "topic", "topic": topic.to_dict()})
         return topic
     
+    def _register_topic(self, topic: Topic):
+        self._topics_by_id[int(topic.topic_id)] = topic
+        # The first topic with a name keeps it, as the linear lookup used to
+        self._topics_by_name.setdefault(topic.name, topic)
+        # Events listed by a topic that are not filed anywhere yet belong to it; events already
+        # filed elsewhere (e.g. those grouped into a topic created from a search) stay where they are
+        for event in topic.events or []:
+            if event.event_id is not None and event.event_id not in self._event_topics:
+                self._event_topics[event.event_id] = topic
+    
+    # Durability
+    def attach_wal(self, wal: Optional[WriteAheadLog]):
+        """Log every further mutation to wal (None stops logging)"""
+        with self._mutation_lock:
+            self.wal = wal
+            # The log extends the database as loaded, so changes are diffed against that
+            self._logged_events = {event.event_id: self._logged_state(event) for event in self.events} \
+                if wal is not None else {}
+    
+    def _log(self, record: dict):
+        if self.wal is not None:
+            self.wal.append(record)
+    
+    @property
+    def mutation_lock(self) -> threading.RLock:
+        """Held by every mutation; hold it to read several things in one consistent state"""
+        return self._mutation_lock
+    
+    def take_changes(self, target: str) -> Optional[Dict[str, Set]]:
+        """
+        Keys of the posts, events and topics ("posts" | "events" | "topics") changed since the
+        last call for target, which starts over. None on the first call: everything counts as
+        changed, and changes are tracked for target from then on.
+        """
+        with self._mutation_lock:
+            changes = self._changes.get(target)
+            self._changes[target] = {"posts": set(), "events": set(), "topics": set()}
+            return changes
+    
+    def restore_changes(self, target: str, changes: Optional[Dict[str, Set]]):
+        """Give back what take_changes returned, when the save that took it failed"""
+        with self._mutation_lock:
+            if changes is None:
+                self._changes.pop(target, None)
+            elif target in self._changes:
+                for kind, keys in changes.items():
+                    self._changes[target][kind] |= keys
+    
+    def untrack_changes(self, target: str):
+        with self._mutation_lock:
+            self._changes.pop(target, None)
+    
+    def _mark_changed(self, kind: str, key):
+        for changes in self._changes.values():
+            changes[kind].add(key)
+    
+    @staticmethod
+    def _packed_keywords(event: Event) -> Optional[list]:
+        """Keywords with their embeddings as packed float32, the bulk of an event record otherwise"""
+        if event.keywords is None:
+            return None
+        return [{"keyword": kw.keyword, "emb": pack_embedding(kw.emb) if kw.emb is not None and len(kw.emb) else []}
+                for kw in event.keywords]
+    
+    def _logged_state(self, event: Event) -> dict:
+        """What a record of the event captures, to diff the next change against"""
+        topic = self._event_topics.get(event.event_id)
+        return {
+            "event": event,
+            "links": [post.link for post in event.posts or []],
+            "keywords": event.keywords,
+            "topic_id": topic.topic_id if topic is not None else None,
+            "fields": {
+                "name": event.name,
+                "small_summary": event.small_summary,
+                "big_summary": event.big_summary,
+                "case_description": event.case_description,
+                "date": event.date.isoformat() if event.date else None,
+                "similar_events": [e.event_id for e in event.similar_events or [] if e and e.event_id]
+            }
+        }
+    
+    def _log_event(self, event: Event):
+        """Log a new or replaced event in full"""
+        self._mark_changed("events", event.event_id)
+        if self.wal is None:
+            return
+        record = event.to_dict()
+        if event.keywords is not None:
+            record["keywords"] = self._packed_keywords(event)
+        state = self._logged_events[event.event_id] = self._logged_state(event)
+        self._log({"op": "event", "event": record, "topic_id": state["topic_id"]})
+    
+    def _log_event_change(self, event: Event):
+        """
+        Log what changed in an event since it was last logged: an "attach" record for posts
+        appended to it, and an "event_change" record with only the fields that changed (the
+        keywords and their embeddings only when they were replaced)
+        """
+        self._mark_changed("events", event.event_id)
+        if self.wal is None:
+            return
+        previous = self._logged_events.get(event.event_id)
+        if previous is None or previous["event"] is not event:
+            self._log_event(event)
+            return
+        
+        state = self._logged_state(event)
+        changes = {}
+        attached = state["links"][len(previous["links"]):]
+        if state["links"][:len(previous["links"])] != previous["links"]:
+            changes["posts"] = state["links"]
+            attached = []
+        elif attached:
+            self._log({"op": "attach", "event_id": event.event_id, "links": attached})
+            # Replaying the attach recomputes the date from the posts, it is only logged if it differs
+            if event.date == Event._find_most_recent_post_date(event.posts):
+                previous["fields"]["date"] = state["fields"]["date"]
+        for name, value in state["fields"].items():
+            if value != previous["fields"][name]:
+                changes[name] = value
+        if event.keywords is not previous["keywords"]:
+            changes["keywords"] = self._packed_keywords(event)
+        if state["topic_id"] != previous["topic_id"]:
+            changes["topic_id"] = state["topic_id"]
+        if changes:
+            self._log({"op": "event_change", "event_id": event.event_id, "changes": changes})
+        self._logged_events[event.event_id] = state
+    
+    def export(self, checkpoint_wal: bool = False) -> dict:
+        """
+        Posts, events and topics as dicts, taken consistently under the mutation lock.
+        With checkpoint_wal, the write-ahead log continues in a new segment and the result also
+        holds the "wal" position the export includes, for the snapshot's metadata.
+        """
+        with self._mutation_lock:
+            return {
+                "posts": [post.to_dict() for post in self.posts.values()],
+                "events": [event.to_dict() for event in self.events],
+                "topics": [topic.to_dict() for topic in self.topics],
+                "wal": self.wal.checkpoint() if checkpoint_wal and self.wal is not None else None
+            }
+    
     def search_keywords_by_query(self, query_words: List[str]) -> List[Keyword]:
         """
         Search for keywords that contain any of the query words (substring matching).
         Returns a list of matching keywords from all events.
         """
+        matched = set()
+        for query_word in query_words:
+            matched |= self.keyword_text_index.containing(query_word)
+        return self._first_occurrences(matched)
+    
+    def search_keywords_fuzzy(self, query_words: List[str], min_similarity: float = 0.3) -> List[Keyword]:
+        """Like search_keywords_by_query, but tolerant to typos (trigram similarity instead of substrings)"""
+        matched = set()
+        for query_word in query_words:
+            matched |= {keyword for keyword, _ in self.keyword_text_index.similar(query_word, min_similarity)}
+        return self._first_occurrences(matched)
+    
+    def _first_occurrences(self, normalized_keywords) -> List[Keyword]:
+        """One Keyword per distinct keyword text, in event order, as a scan over all events would find them"""
+        occurrences = sorted(
+            (occurrence for normalized in normalized_keywords
+             for occurrence in self.keyword_text_index.occurrences(normalized)),
+            key=lambda occurrence: occurrence[:2]
+        )
         matching_keywords = []
         seen_keywords = set()  # Track unique keywords
-        
-        # Iterate through all events and their keywords
-        for event in self.events:
-            if not event.keywords:
-                continue
-            
-            for keyword in event.keywords:
-                # Check if any query word is a substring of this keyword (case-insensitive)
-                keyword_lower = keyword.keyword.lower()
-                for query_word in query_words:
-                    if query_word.lower() in keyword_lower:
-                        # Add only if we haven't seen this exact keyword yet
-                        if keyword.keyword not in seen_keywords:
-                            matching_keywords.append(keyword)
-                            seen_keywords.add(keyword.keyword)
-                        break  # Move to next keyword once we found a match
-        
+        for _, _, keyword in occurrences:
+            if keyword.keyword not in seen_keywords:
+                matching_keywords.append(keyword)
+                seen_keywords.add(keyword.keyword)
         return matching_keywords
     
     def get_events_by_keywords(self, keywords: List[Keyword]) -> List[Event]:
@@ -268,49 +728,57 @@ class InMemoryDB:
         Get all events that contain any of the specified keywords.
         Returns each event only once (deduplicated).
         """
-        matching_events = []
-        seen_event_ids = set()
-        
-        # Convert keywords to a set of keyword strings for faster lookup
-        keyword_strings = {kw.keyword for kw in keywords}
-        
-        # Iterate through all events
-        for event in self.events:
-            if not event.keywords or event.event_id in seen_event_ids:
-                continue
-            
-            # Check if this event has any of the target keywords
-            for event_keyword in event.keywords:
-                if event_keyword.keyword in keyword_strings:
-                    matching_events.append(event)
-                    if event.event_id:
-                        seen_event_ids.add(event.event_id)
-                    break  # Move to next event once we found a match
-        
-        return matching_events
+        event_ids = set()
+        for keyword in keywords:
+            event_ids.update(self.keyword_text_index.event_ids(keyword.keyword))
+        # Event ids grow with insertion, so this is the order of self.events
+        return [self._events_by_id[event_id] for event_id in sorted(event_ids) if event_id in self._events_by_id]
 
-    def get_raport_for_topic(self, topic_id: int) -> Optional[str]:
+    def _raport_prompt_for_topic(self, topic_id: int) -> Optional[AzerionPromptTemplate]:
         topic = self.get_topic_by_id(topic_id)
         if not topic:
             return None
         
-        # Collect all posts from all events in this topic
+        # Collect all posts from all events in this topic, condensed to fit one prompt
         all_posts = []
         for event in topic.events:
             if event.posts:
                 all_posts.extend(event.posts)
+        topic_posts = self._report_posts(all_posts)
         
+        return AzerionPromptTemplate(prompt=get_report_for_topic_prompt.format(topic_posts=topic_posts))
+
+    def get_raport_for_topic(self, topic_id: int) -> Optional[str]:
+        prompt = self._raport_prompt_for_topic(topic_id)
+        if not prompt:
+            return None
         llm_client = LlmClient()
-        return llm_client.generate_response(AzerionPromptTemplate(prompt=get_report_for_topic_prompt.format(topic_posts=all_posts)))
+        return llm_client.generate_response(prompt)
+
+    async def get_raport_for_topic_async(self, topic_id: int) -> Optional[str]:
+        # Condensing the posts makes blocking LLM calls, keep them off the event loop
+        prompt = await asyncio.to_thread(self._raport_prompt_for_topic, topic_id)
+        if not prompt:
+            return None
+        llm_client = AsyncLlmClient()
+        return await llm_client.generate_response(prompt)
 
     def get_raport_for_last_week(self, ) -> Optional[str]:
         llm_client = LlmClient()
         return llm_client.generate_response(AzerionPromptTemplate(prompt=get_report_for_last_week_prompt.format(last_week_posts=self.posts)))
 
+    async def get_raport_for_last_week_async(self) -> Optional[str]:
+        llm_client = AsyncLlmClient()
+        return await llm_client.generate_response(AzerionPromptTemplate(prompt=get_report_for_last_week_prompt.format(last_week_posts=self.posts)))
+
     def get_raport_for_last_month(self, ) -> Optional[str]:
         llm_client = LlmClient()
         return llm_client.generate_response(AzerionPromptTemplate(prompt=get_report_for_last_month_prompt.format(last_month_posts=self.posts)))
 
+    async def get_raport_for_last_month_async(self) -> Optional[str]:
+        llm_client = AsyncLlmClient()
+        return await llm_client.generate_response(AzerionPromptTemplate(prompt=get_report_for_last_month_prompt.format(last_month_posts=self.posts)))
+
 # Singleton instance
 db = InMemoryDB()
 
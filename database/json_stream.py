@@ -0,0 +1,97 @@
+"""
+Incremental reader for the top-level object of a large JSON file.
+
+Only a fixed-size window of the file is held in memory: values are decoded one at a time with
+json.JSONDecoder.raw_decode, and the window only grows when a single value does not fit in it.
+"""
+import json
+from typing import Any, Iterator, TextIO, Tuple
+
+_WHITESPACE = ' \t\n\r'
+# What may follow a complete value in valid JSON
+_VALUE_END = _WHITESPACE + ',:]}'
+
+
+class JsonStreamReader:
+    def __init__(self, file: TextIO, buffer_size: int = 1 << 20):
+        self.file = file
+        self.buffer_size = buffer_size
+        self.chars_read = 0
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        """Read another block, dropping what was already consumed; False at end of file"""
+        if self._eof:
+            return False
+        if self._pos:
+            self._buffer = self._buffer[self._pos:]
+            self._pos = 0
+        block = self.file.read(self.buffer_size)
+        if not block:
+            self._eof = True
+            return False
+        self.chars_read += len(block)
+        self._buffer += block
+        return True
+
+    def _peek(self) -> str:
+        """Next non-whitespace character, without consuming it ('' at end of file)"""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, char: str):
+        found = self._peek()
+        if found != char:
+            raise ValueError(f"Expected '{char}' at offset {self.chars_read - len(self._buffer) + self._pos}, found '{found}'")
+        self._pos += 1
+
+    def _value(self) -> Any:
+        """Decode one complete JSON value, reading more of the file until it is complete"""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                # A number cut by the end of the window ("-2." of "-2.5") decodes as a shorter one,
+                # so the value only counts once the character after it is visible
+                if self._eof or (end < len(self._buffer) and self._buffer[end] in _VALUE_END):
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._fill()
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        """
+        Yield (key, value) for each member of the top-level object. Array members are not
+        materialized: they yield one (key, element) pair per element instead.
+        """
+        self._expect('{')
+        if self._peek() == '}':
+            return
+        while True:
+            key = self._value()
+            self._expect(':')
+            if self._peek() == '[':
+                self._pos += 1
+                if self._peek() != ']':
+                    while True:
+                        yield key, self._value()
+                        if self._peek() != ',':
+                            break
+                        self._pos += 1
+                self._expect(']')
+            else:
+                yield key, self._value()
+            if self._peek() != ',':
+                break
+            self._pos += 1
+        self._expect('}')
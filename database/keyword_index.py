@@ -0,0 +1,113 @@
+"""
+Text index over event keywords kept by InMemoryDB.
+
+Keywords are normalized (lower case, single spaces). A postings map goes from each normalized
+keyword to the events and positions it occurs at, and a trigram map from every trigram to the
+normalized keywords containing it, which narrows substring and fuzzy lookups to a few candidates.
+"""
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from models.Keyword import Keyword
+
+
+def normalize_keyword(text: str) -> str:
+    return ' '.join(text.lower().split())
+
+
+def trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class KeywordIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        # The keyword list each event was indexed with
+        self._event_keywords: Dict[int, List[Keyword]] = {}
+        # normalized keyword -> event_id -> positions in that event's keyword list
+        self._postings: Dict[str, Dict[int, List[int]]] = {}
+        self._trigrams: Dict[str, Set[str]] = {}
+
+    def __len__(self):
+        return len(self._postings)
+
+    def update_event(self, event_id: int, keywords: Optional[List[Keyword]]):
+        """Replace the keywords indexed for an event; a no-op when the list itself is unchanged"""
+        keywords = keywords or []
+        with self._lock:
+            if self._event_keywords.get(event_id) is keywords:
+                return
+            self.remove_event(event_id)
+            if not keywords:
+                return
+            self._event_keywords[event_id] = keywords
+            for position, keyword in enumerate(keywords):
+                normalized = normalize_keyword(keyword.keyword)
+                if not normalized:
+                    continue
+                postings = self._postings.get(normalized)
+                if postings is None:
+                    postings = self._postings[normalized] = {}
+                    for trigram in trigrams(normalized):
+                        self._trigrams.setdefault(trigram, set()).add(normalized)
+                postings.setdefault(event_id, []).append(position)
+
+    def remove_event(self, event_id: int):
+        with self._lock:
+            keywords = self._event_keywords.pop(event_id, None)
+            for keyword in keywords or []:
+                normalized = normalize_keyword(keyword.keyword)
+                postings = self._postings.get(normalized)
+                if postings is None or postings.pop(event_id, None) is None or postings:
+                    continue
+                del self._postings[normalized]
+                for trigram in trigrams(normalized):
+                    containing = self._trigrams.get(trigram)
+                    if containing is not None:
+                        containing.discard(normalized)
+                        if not containing:
+                            del self._trigrams[trigram]
+
+    def event_ids(self, keyword: str) -> List[int]:
+        """Events having this keyword (compared normalized)"""
+        with self._lock:
+            return list(self._postings.get(normalize_keyword(keyword), ()))
+
+    def occurrences(self, normalized: str) -> List[Tuple[int, int, Keyword]]:
+        """(event_id, position, Keyword) of every occurrence of a normalized keyword"""
+        with self._lock:
+            return [(event_id, position, self._event_keywords[event_id][position])
+                    for event_id, positions in self._postings.get(normalized, {}).items()
+                    for position in positions]
+
+    def containing(self, word: str) -> Set[str]:
+        """Normalized keywords that contain word as a substring"""
+        word = normalize_keyword(word)
+        if not word:
+            return set()
+        with self._lock:
+            word_trigrams = trigrams(word)
+            if not word_trigrams:
+                # Shorter than a trigram: only the vocabulary scan can answer
+                return {keyword for keyword in self._postings if word in keyword}
+            candidate_sets = sorted((self._trigrams.get(trigram, set()) for trigram in word_trigrams), key=len)
+            candidates = set(candidate_sets[0]).intersection(*candidate_sets[1:])
+            return {keyword for keyword in candidates if word in keyword}
+
+    def similar(self, word: str, min_similarity: float = 0.3, limit: int = 10) -> List[Tuple[str, float]]:
+        """Normalized keywords ranked by trigram (Jaccard) similarity to word, for typo-tolerant lookups"""
+        word_trigrams = trigrams(normalize_keyword(word))
+        if not word_trigrams:
+            return []
+        with self._lock:
+            shared: Dict[str, int] = {}
+            for trigram in word_trigrams:
+                for keyword in self._trigrams.get(trigram, ()):
+                    shared[keyword] = shared.get(keyword, 0) + 1
+            scored = []
+            for keyword, count in shared.items():
+                score = count / (len(word_trigrams) + len(trigrams(keyword)) - count)
+                if score >= min_similarity:
+                    scored.append((keyword, score))
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        return scored[:limit]
@@ -0,0 +1,219 @@
+"""
+Incremental save of the database JSON file.
+
+The posts, events and topics are split into segments of up to segment_size consecutive entities.
+Each segment is kept in a directory next to the JSON file as the exact text it contributes to
+it, with a manifest listing the segments and the keys (post link, event_id, topic_id) in each.
+A save asks the database which entities changed since the previous save to the same file and
+serializes only the segments holding one of them (or whose membership changed); the JSON file is
+then concatenated from the segment texts, which costs a copy rather than a serialization.
+
+The result is the same file json.dump(..., indent=2) writes. It is written to a temporary name,
+fsynced and swapped in; segment files are never modified, a save writes new ones and the
+manifest naming them is replaced after the JSON file, so a crash at any point leaves both the
+JSON file and the previous manifest intact. Segments only count as current for the database
+instance that wrote them (and keeps tracking its changes), so the first save after a restart
+rewrites everything.
+"""
+import json
+import os
+import shutil
+import threading
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Type
+
+VERSION = 1
+KINDS = ("posts", "events", "topics")
+_MANIFEST = "manifest.json"
+
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def _indent(text: str, prefix: str) -> str:
+    """Indent all but the first line of text, as nesting it one level deeper in json.dump would"""
+    return text.replace("\n", "\n" + prefix)
+
+
+def _write_durably(path: str, data: bytes):
+    with open(path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class SegmentedJsonStore:
+    def __init__(self, path: str, segment_size: int = 256, encoder: Type[json.JSONEncoder] = json.JSONEncoder):
+        self.path = path
+        self.segment_size = segment_size
+        self.encoder = encoder
+        self.directory = os.path.splitext(path)[0] + ".segments"
+        # The name the database tracks changes for this file under
+        self.target = os.path.abspath(path)
+        with _locks_guard:
+            self._lock = _locks.setdefault(self.target, threading.Lock())
+
+    # Manifest
+
+    def _read_manifest(self) -> Optional[dict]:
+        """The manifest of the last save, or None when it is missing, unreadable or refers to missing segments"""
+        try:
+            with open(os.path.join(self.directory, _MANIFEST), encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get("version") != VERSION or manifest.get("segment_size") != self.segment_size:
+            return None
+        for kind in KINDS:
+            for segment in manifest["kinds"].get(kind, []):
+                if not os.path.exists(os.path.join(self.directory, segment["file"])):
+                    return None
+        return manifest
+
+    def _plan(self, previous: Optional[List[dict]], keys: list, changed: set) -> List[dict]:
+        """
+        Segments holding keys in order, as {"keys", "file"}: the file of a segment that can be
+        reused, None for one to (re)write. Segments are reused while the entities kept their
+        order and new ones were only appended, as the database adds them.
+        """
+        size = self.segment_size
+        if previous:
+            present = set(keys)
+            kept = [[key for key in segment["keys"] if key in present] for segment in previous]
+            survivors = [key for segment_keys in kept for key in segment_keys]
+            if keys[:len(survivors)] == survivors:
+                segments = []
+                for segment, segment_keys in zip(previous, kept):
+                    if not segment_keys:
+                        continue
+                    unchanged = len(segment_keys) == len(segment["keys"]) and changed.isdisjoint(segment_keys)
+                    segments.append({"keys": segment_keys, "file": segment["file"] if unchanged else None})
+                new_keys = keys[len(survivors):]
+                if new_keys and segments and len(segments[-1]["keys"]) < size:
+                    room = size - len(segments[-1]["keys"])
+                    segments[-1] = {"keys": segments[-1]["keys"] + new_keys[:room], "file": None}
+                    new_keys = new_keys[room:]
+                return segments + [{"keys": new_keys[i:i + size], "file": None} for i in range(0, len(new_keys), size)]
+        return [{"keys": keys[i:i + size], "file": None} for i in range(0, len(keys), size)]
+
+    # Saving
+
+    def save(self, db, extra_metadata: dict = None, checkpoint_wal: bool = False) -> dict:
+        """
+        Save db to the JSON file, rewriting only the segments that changed. With checkpoint_wal,
+        the write-ahead log is checkpointed together with the state saved and the metadata holds
+        the position it includes (see InMemoryDB.export). Returns the metadata written plus
+        "segments" and "rewritten" counts.
+        """
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            manifest = self._read_manifest()
+
+            # The plan and the dicts of the segments to rewrite are taken in one go under the
+            # mutation lock, so the changes taken are exactly those the saved state includes
+            with db.mutation_lock:
+                changes = db.take_changes(self.target)
+                try:
+                    current = changes is not None and manifest is not None and manifest["instance"] == db.instance_id
+                    entities = {
+                        "posts": dict(db.posts),
+                        "events": {event.event_id: event for event in db.get_all_events()},
+                        "topics": {topic.topic_id: topic for topic in db.get_all_topics()}
+                    }
+                    plan = {kind: self._plan(manifest["kinds"].get(kind) if current else None,
+                                             list(entities[kind]), changes[kind] if current else set())
+                            for kind in KINDS}
+                    records = {id(segment): [entities[kind][key].to_dict() for key in segment["keys"]]
+                               for kind in KINDS for segment in plan[kind] if segment["file"] is None}
+                    wal = db.wal.checkpoint() if checkpoint_wal and db.wal is not None else None
+                except BaseException:
+                    db.restore_changes(self.target, changes)
+                    raise
+
+            written = []
+            try:
+                for kind in KINDS:
+                    for segment in plan[kind]:
+                        if segment["file"] is None:
+                            segment["file"] = f"{kind}-{uuid.uuid4().hex[:12]}.json"
+                            written.append(segment["file"])
+                            _write_durably(os.path.join(self.directory, segment["file"]),
+                                           self._segment_text(records[id(segment)]).encode("utf-8"))
+
+                metadata = {
+                    "generated_at": datetime.now().isoformat(),
+                    "total_posts": len(entities["posts"]),
+                    "total_events": len(entities["events"]),
+                    "total_topics": len(entities["topics"]),
+                    # The write-ahead log records this file already includes
+                    **(wal or {}),
+                    **(extra_metadata or {})
+                }
+                self._write_json(plan, metadata)
+
+                manifest_path = os.path.join(self.directory, _MANIFEST)
+                _write_durably(manifest_path + ".tmp", json.dumps({
+                    "version": VERSION,
+                    "instance": db.instance_id,
+                    "segment_size": self.segment_size,
+                    "kinds": plan
+                }, ensure_ascii=False).encode("utf-8"))
+                os.replace(manifest_path + ".tmp", manifest_path)
+            except BaseException:
+                db.restore_changes(self.target, changes)
+                for name in written:
+                    path = os.path.join(self.directory, name)
+                    if os.path.exists(path):
+                        os.remove(path)
+                raise
+
+            self._remove_unreferenced(plan)
+            return {**metadata,
+                    "segments": sum(len(plan[kind]) for kind in KINDS),
+                    "rewritten": len(written)}
+
+    def _segment_text(self, records: List[dict]) -> str:
+        """The array elements exactly as json.dump(..., indent=2) writes them in the database file"""
+        return ",\n".join(
+            "    " + _indent(json.dumps(record, indent=2, ensure_ascii=False, cls=self.encoder), "    ")
+            for record in records
+        )
+
+    def _write_json(self, plan: Dict[str, List[dict]], metadata: dict):
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "wb") as out:
+            out.write(b"{\n")
+            for kind in KINDS:
+                if not plan[kind]:
+                    out.write(f'  "{kind}": [],\n'.encode("utf-8"))
+                    continue
+                out.write(f'  "{kind}": [\n'.encode("utf-8"))
+                for i, segment in enumerate(plan[kind]):
+                    if i:
+                        out.write(b",\n")
+                    with open(os.path.join(self.directory, segment["file"]), "rb") as f:
+                        shutil.copyfileobj(f, out)
+                out.write(b"\n  ],\n")
+            text = json.dumps(metadata, indent=2, ensure_ascii=False, cls=self.encoder)
+            out.write(f'  "metadata": {_indent(text, "  ")}\n}}'.encode("utf-8"))
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(temp_path, self.path)
+
+    def _remove_unreferenced(self, plan: Dict[str, List[dict]]):
+        """Delete segments no longer in the manifest, including any left by an interrupted save"""
+        referenced = {segment["file"] for kind in KINDS for segment in plan[kind]}
+        for name in os.listdir(self.directory):
+            if name != _MANIFEST and name not in referenced:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError as e:
+                    print(f"⚠️  Could not remove segment {name}: {e}")
+
+    def remove(self, db=None):
+        """Delete the segments (not the JSON file) and stop tracking changes for it"""
+        with self._lock:
+            if db is not None:
+                db.untrack_changes(self.target)
+            shutil.rmtree(self.directory, ignore_errors=True)
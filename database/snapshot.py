@@ -0,0 +1,275 @@
+"""
+Compact, versioned binary snapshot of the database.
+
+A snapshot is two files. The record file holds a fixed header, then one length-prefixed record
+per post, event and topic (compact JSON, in that order), then a footer with the metadata. Every
+keyword embedding is moved out of its record into one float32 (or float16) matrix saved as a
+.npy file next to it; the record keeps only the row number. On load the matrix is memory-mapped,
+so a Keyword.emb is a read-only row of it and nothing is parsed or copied until it is used.
+
+The record file is the commit point: it names the embedding file it was written with, and both
+are written to temporary names and swapped in, so a crash leaves the previous snapshot intact.
+
+Record file layout (little endian):
+    header   MAGIC, version (uint16), footer offset (uint64)
+    records  kind (uint8), payload length (uint32), payload
+    footer   a record of kind _FOOTER: {"metadata", "embeddings": {"file", "dtype", "shape"}, "counts"}
+"""
+import json
+import os
+import struct
+import uuid
+from datetime import datetime
+from typing import Any, Iterator, Optional, Tuple
+
+import numpy as np
+
+MAGIC = b"PLDRSNAP"
+VERSION = 1
+
+_HEADER = struct.Struct("<8sHQ")
+_RECORD = struct.Struct("<BI")
+_FOOTER = 0
+_KINDS = {"posts": 1, "events": 2, "topics": 3}
+_KIND_NAMES = {code: name for name, code in _KINDS.items()}
+_DTYPES = ("float32", "float16")
+
+
+def _default(obj):
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _encode(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=_default).encode("utf-8")
+
+
+def is_snapshot(path: str) -> bool:
+    """True when the file starts with the snapshot magic"""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def embeddings_path(path: str) -> Optional[str]:
+    """The embedding matrix a snapshot refers to, or None when it has none"""
+    with SnapshotReader(path) as reader:
+        name = reader.footer["embeddings"]["file"]
+    return os.path.join(os.path.dirname(path), name) if name else None
+
+
+class SnapshotWriter:
+    """
+    Write a snapshot record by record. Keyword embeddings are collected while records are
+    written and saved as one matrix on close, then both files are swapped in.
+    """
+
+    def __init__(self, path: str, dtype: str = "float32"):
+        if dtype not in _DTYPES:
+            raise ValueError(f"Unsupported embedding dtype '{dtype}', expected one of {_DTYPES}")
+        self.path = path
+        self.dtype = dtype
+        self.counts = {name: 0 for name in _KINDS}
+        self._vectors = []
+        self._dim = None
+        # Unique, so two writers of the same snapshot never write into each other's file
+        self._temp_path = f"{path}.{uuid.uuid4().hex[:12]}.tmp"
+        # The embedding matrix written by close, until the record file referring to it is swapped in
+        self._new_embeddings = None
+        self._file = open(self._temp_path, "wb")
+        self._file.write(_HEADER.pack(MAGIC, VERSION, 0))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            return
+        self._file.close()
+        for path in (self._temp_path, self._new_embeddings):
+            if path and os.path.exists(path):
+                os.remove(path)
+
+    def _embedding_row(self, emb) -> Optional[int]:
+        """Move an embedding into the matrix; None when it has to stay inline (empty or another dimension)"""
+        if emb is None or not len(emb):
+            return None
+        vector = np.asarray(emb, dtype=self.dtype)
+        if vector.ndim != 1 or (self._dim is not None and vector.shape[0] != self._dim):
+            return None
+        self._dim = vector.shape[0]
+        self._vectors.append(vector)
+        return len(self._vectors) - 1
+
+    def write(self, kind: str, record: dict):
+        """Append a post, event or topic dict (as produced by to_dict)"""
+        keywords = record.get("keywords") if kind == "events" else None
+        if keywords:
+            record = dict(record)
+            record["keywords"] = [self._keyword_record(keyword) for keyword in keywords]
+        payload = _encode(record)
+        self._file.write(_RECORD.pack(_KINDS[kind], len(payload)))
+        self._file.write(payload)
+        self.counts[kind] += 1
+
+    def _keyword_record(self, keyword: dict) -> dict:
+        row = self._embedding_row(keyword.get("emb"))
+        if row is None:
+            return keyword
+        return {"keyword": keyword.get("keyword"), "row": row}
+
+    def close(self, metadata: dict = None) -> str:
+        """Write the footer and the embedding matrix, swap both in and return the snapshot path"""
+        directory = os.path.dirname(self.path)
+        old_embeddings = embeddings_path(self.path) if is_snapshot(self.path) else None
+
+        embeddings_file = None
+        shape = [0, 0]
+        if self._vectors:
+            embeddings_file = f"{os.path.basename(self.path)}.{uuid.uuid4().hex[:12]}.npy"
+            matrix = np.stack(self._vectors)
+            shape = list(matrix.shape)
+            # The new matrix gets a fresh name, so it never replaces the one the current snapshot uses
+            self._new_embeddings = os.path.join(directory, embeddings_file)
+            with open(self._new_embeddings, "wb") as f:
+                np.save(f, matrix)
+                f.flush()
+                os.fsync(f.fileno())
+
+        footer_offset = self._file.tell()
+        footer = _encode({
+            "metadata": metadata or {},
+            "embeddings": {"file": embeddings_file, "dtype": self.dtype, "shape": shape},
+            "counts": self.counts
+        })
+        self._file.write(_RECORD.pack(_FOOTER, len(footer)))
+        self._file.write(footer)
+        self._file.seek(0)
+        self._file.write(_HEADER.pack(MAGIC, VERSION, footer_offset))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self._temp_path, self.path)
+
+        if old_embeddings and old_embeddings != self._new_embeddings and os.path.exists(old_embeddings):
+            try:
+                os.remove(old_embeddings)
+            except OSError as e:
+                # Still memory-mapped by this process on platforms that forbid that; it is only stale
+                print(f"⚠️  Could not remove previous embedding file {old_embeddings}: {e}")
+        self._new_embeddings = None
+        return self.path
+
+
+class SnapshotReader:
+    """Read a snapshot back as (kind, dict) pairs, in the shape to_dict produced them"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        magic, version, self._footer_offset = _HEADER.unpack(self._file.read(_HEADER.size))
+        if magic != MAGIC:
+            self._file.close()
+            raise ValueError(f"{path} is not a database snapshot")
+        if version > VERSION:
+            self._file.close()
+            raise ValueError(f"{path} is snapshot version {version}, this version reads up to {VERSION}")
+        if not self._footer_offset:
+            self._file.close()
+            raise ValueError(f"{path} is an incomplete snapshot")
+
+        self._file.seek(self._footer_offset)
+        self.footer = self._read_record()[1]
+        self.metadata = self.footer.get("metadata", {})
+        self.bytes_read = 0
+        self._embeddings = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self._file.close()
+
+    @property
+    def size(self) -> int:
+        return self._footer_offset
+
+    @property
+    def embeddings(self) -> Optional[np.ndarray]:
+        """The embedding matrix, memory-mapped read-only on first use"""
+        if self._embeddings is None:
+            info = self.footer["embeddings"]
+            if not info["file"] or not info["shape"][0]:
+                return None
+            path = os.path.join(os.path.dirname(self.path), info["file"])
+            self._embeddings = np.load(path, mmap_mode="r")
+            if list(self._embeddings.shape) != info["shape"]:
+                raise ValueError(f"{path} has shape {self._embeddings.shape}, the snapshot expects {info['shape']}")
+        return self._embeddings
+
+    def _read_record(self) -> Tuple[int, Any]:
+        kind, length = _RECORD.unpack(self._file.read(_RECORD.size))
+        payload = self._file.read(length)
+        if len(payload) != length:
+            raise ValueError(f"{self.path} is truncated")
+        return kind, json.loads(payload)
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        """Yield ('posts' | 'events' | 'topics', dict) for every record, then ('metadata', dict)"""
+        self._file.seek(_HEADER.size)
+        while self._file.tell() < self._footer_offset:
+            kind, record = self._read_record()
+            self.bytes_read = self._file.tell()
+            name = _KIND_NAMES.get(kind)
+            if name is None:
+                continue
+            if name == "events" and record.get("keywords"):
+                record["keywords"] = [self._keyword(keyword) for keyword in record["keywords"]]
+            yield name, record
+        yield "metadata", self.metadata
+
+    def _keyword(self, keyword: dict) -> dict:
+        if "row" not in keyword:
+            return keyword
+        return {"keyword": keyword["keyword"], "emb": self.embeddings[keyword["row"]]}
+
+
+def convert_json_to_snapshot(json_file: str, snapshot_file: str = None, dtype: str = "float32") -> str:
+    """Convert a database JSON file (as written by save_database_to_json) without loading it into the database"""
+    from database.json_stream import JsonStreamReader
+
+    if snapshot_file is None:
+        snapshot_file = os.path.splitext(json_file)[0] + ".snapshot"
+
+    metadata = {}
+    with open(json_file, 'r', encoding='utf-8') as f, SnapshotWriter(snapshot_file, dtype=dtype) as writer:
+        for key, value in JsonStreamReader(f).items():
+            if key in _KINDS:
+                writer.write(key, value)
+            elif key == "metadata":
+                metadata = value
+        writer.close(metadata)
+    return snapshot_file
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert a database JSON file to a binary snapshot")
+    parser.add_argument("json_file")
+    parser.add_argument("snapshot_file", nargs="?", help="defaults to the JSON file name with a .snapshot extension")
+    parser.add_argument("--float16", action="store_true", help="store embeddings as float16 (half the size)")
+    args = parser.parse_args()
+
+    path = convert_json_to_snapshot(args.json_file, args.snapshot_file, "float16" if args.float16 else "float32")
+    print(f"Snapshot written to {path}")
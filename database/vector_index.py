@@ -0,0 +1,367 @@
+"""
+Embedding indexes kept by InMemoryDB.
+
+VectorIndex is the interface; ExactVectorIndex scores every vector with one matrix product,
+IVFVectorIndex clusters the vectors (spherical k-means) and only scores the closest clusters
+for top-k searches once the index is big enough to make that worthwhile; threshold (radius)
+queries are always exact. All vectors are stored L2-normalized, so scores are cosine similarities.
+"""
+import functools
+import hashlib
+import json
+import threading
+from typing import Any, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+def text_fingerprint(text: Optional[str]) -> Optional[str]:
+    """Short hash of the text an embedding was computed from"""
+    if not text:
+        return None
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def _locked(method):
+    """Run an index method under the index's lock, so background writers and readers can share it"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _to_json_key(key):
+    return list(key) if isinstance(key, tuple) else key
+
+
+def _from_json_key(key):
+    return tuple(key) if isinstance(key, list) else key
+
+
+class VectorIndex:
+    """Interface of an incrementally maintained, persistable embedding index"""
+    kind = None
+
+    def add(self, key: Hashable, vector, tag: Optional[str] = None, fingerprint: Optional[str] = None):
+        """Insert or replace the vector stored under key"""
+        raise NotImplementedError
+
+    def remove(self, key: Hashable) -> bool:
+        raise NotImplementedError
+
+    def get(self, key: Hashable) -> Optional[np.ndarray]:
+        """Return the normalized vector stored under key"""
+        raise NotImplementedError
+
+    def fingerprint(self, key: Hashable) -> Optional[str]:
+        raise NotImplementedError
+
+    def search(self, query, k: int, tag: Optional[str] = None, min_score: Optional[float] = None) -> List[Tuple[Any, float]]:
+        """Return up to k (key, score) pairs, best first, optionally restricted to one tag"""
+        raise NotImplementedError
+
+    def radius(self, query, min_score: float, tag: Optional[str] = None,
+               keys: Optional[Iterable[Hashable]] = None) -> List[Tuple[Any, float]]:
+        """
+        Return every (key, score) pair with score >= min_score, best first, never missing one.
+        With keys, only the vectors stored under those keys are scored.
+        """
+        raise NotImplementedError
+
+    def save(self, path: str):
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+
+class ExactVectorIndex(VectorIndex):
+    """Brute-force index: all live vectors in one contiguous matrix"""
+    kind = "exact"
+    _initial_capacity = 256
+
+    def __init__(self, **_):
+        self._lock = threading.RLock()
+        self._dim = None
+        self._vectors = None
+        self._live = np.zeros(0, dtype=bool)
+        self._tags = np.zeros(0, dtype=np.int32)
+        self._keys: List[Any] = []
+        self._fingerprints: List[Optional[str]] = []
+        self._slots = {}
+        self._free: List[int] = []
+        self._tag_codes = {None: -1}
+
+    def __len__(self):
+        return len(self._slots)
+
+    def _grow(self, capacity: int):
+        vectors = np.zeros((capacity, self._dim), dtype=np.float32)
+        live = np.zeros(capacity, dtype=bool)
+        tags = np.full(capacity, -1, dtype=np.int32)
+        used = len(self._keys)
+        if self._vectors is not None:
+            vectors[:used] = self._vectors[:used]
+            live[:used] = self._live[:used]
+            tags[:used] = self._tags[:used]
+        self._vectors, self._live, self._tags = vectors, live, tags
+
+    def _tag_code(self, tag: Optional[str]) -> int:
+        if tag not in self._tag_codes:
+            self._tag_codes[tag] = len(self._tag_codes) - 1
+        return self._tag_codes[tag]
+
+    @staticmethod
+    def _unit(vector) -> Optional[np.ndarray]:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else None
+
+    @_locked
+    def add(self, key, vector, tag=None, fingerprint=None):
+        unit = self._unit(vector)
+        if unit is None:
+            self.remove(key)
+            return
+
+        if self._dim is None:
+            self._dim = unit.shape[0]
+            self._grow(self._initial_capacity)
+        elif unit.shape[0] != self._dim:
+            raise ValueError(f"Vector has dimension {unit.shape[0]}, index expects {self._dim}")
+
+        slot = self._slots.get(key)
+        if slot is None:
+            if self._free:
+                slot = self._free.pop()
+            else:
+                slot = len(self._keys)
+                if slot >= len(self._vectors):
+                    self._grow(len(self._vectors) * 2)
+                self._keys.append(None)
+                self._fingerprints.append(None)
+            self._slots[key] = slot
+        else:
+            self._on_remove(slot)
+
+        self._vectors[slot] = unit
+        self._live[slot] = True
+        self._tags[slot] = self._tag_code(tag)
+        self._keys[slot] = key
+        self._fingerprints[slot] = fingerprint
+        self._on_add(slot)
+
+    @_locked
+    def remove(self, key) -> bool:
+        slot = self._slots.pop(key, None)
+        if slot is None:
+            return False
+        self._on_remove(slot)
+        self._live[slot] = False
+        self._keys[slot] = None
+        self._fingerprints[slot] = None
+        self._free.append(slot)
+        return True
+
+    @_locked
+    def get(self, key):
+        slot = self._slots.get(key)
+        return None if slot is None else self._vectors[slot].copy()
+
+    @_locked
+    def fingerprint(self, key):
+        slot = self._slots.get(key)
+        return None if slot is None else self._fingerprints[slot]
+
+    # Hooks for subclasses that keep extra per-slot structures
+    def _on_add(self, slot: int):
+        pass
+
+    def _on_remove(self, slot: int):
+        pass
+
+    def _live_slots(self) -> np.ndarray:
+        return np.flatnonzero(self._live[:len(self._keys)])
+
+    def _candidate_slots(self, query: np.ndarray) -> np.ndarray:
+        """Slots a top-k search scores"""
+        return self._live_slots()
+
+    @_locked
+    def search(self, query, k, tag=None, min_score=None):
+        return self._search(query, k, tag, min_score, self._candidate_slots)
+
+    @_locked
+    def radius(self, query, min_score, tag=None, keys=None):
+        if keys is None:
+            candidates = lambda unit: self._live_slots()
+        else:
+            candidates = lambda unit: np.array([self._slots[key] for key in keys if key in self._slots], dtype=np.int64)
+        return self._search(query, len(self), tag, min_score, candidates)
+
+    def _search(self, query, k, tag, min_score, candidates) -> List[Tuple[Any, float]]:
+        """Score the slots candidates(unit query) returns"""
+        if not self._slots or k <= 0:
+            return []
+        unit = self._unit(query)
+        if unit is None:
+            return []
+        if tag is not None and tag not in self._tag_codes:
+            return []
+
+        slots = candidates(unit)
+        if tag is not None:
+            slots = slots[self._tags[slots] == self._tag_codes[tag]]
+        if len(slots) == 0:
+            return []
+
+        scores = self._vectors[slots] @ unit
+        if min_score is not None:
+            keep = scores >= min_score
+            slots, scores = slots[keep], scores[keep]
+        if len(slots) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            slots, scores = slots[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+
+        return [(self._keys[slots[i]], float(scores[i])) for i in order]
+
+    def _entries(self):
+        slots = sorted(self._slots.values())
+        tag_names = {code: tag for tag, code in self._tag_codes.items()}
+        return slots, [tag_names[int(self._tags[slot])] for slot in slots]
+
+    @_locked
+    def save(self, path: str):
+        slots, tags = self._entries()
+        vectors = self._vectors[slots] if slots else np.zeros((0, self._dim or 0), dtype=np.float32)
+        meta = {
+            "kind": self.kind,
+            "params": self._params(),
+            "keys": [_to_json_key(self._keys[slot]) for slot in slots],
+            "tags": tags,
+            "fingerprints": [self._fingerprints[slot] for slot in slots],
+        }
+        with open(path, "wb") as f:
+            np.savez(f, vectors=vectors, meta=np.array(json.dumps(meta)))
+
+    def _params(self) -> dict:
+        return {}
+
+    def _load_entries(self, vectors: np.ndarray, meta: dict):
+        for vector, key, tag, fingerprint in zip(vectors, meta["keys"], meta["tags"], meta["fingerprints"]):
+            self.add(_from_json_key(key), vector, tag=tag, fingerprint=fingerprint)
+
+
+class IVFVectorIndex(ExactVectorIndex):
+    """
+    Inverted-file index. Vectors are assigned to the nearest of ~sqrt(n) k-means centroids and
+    a top-k search only scores the vectors in its nprobe closest clusters. Below train_threshold
+    vectors (or until trained) it searches exactly. A search restricted to a tag that finds fewer
+    than k vectors in those clusters scores all vectors of the tag. radius stays exact: a threshold
+    query feeds event matching, where a missed match changes the result. Clusters are retrained
+    once the index doubles.
+    """
+    kind = "ivf"
+
+    def __init__(self, nprobe: int = 8, train_threshold: int = 2048, kmeans_iterations: int = 10, seed: int = 0, **_):
+        super().__init__()
+        self.nprobe = nprobe
+        self.train_threshold = train_threshold
+        self.kmeans_iterations = kmeans_iterations
+        self.seed = seed
+        self._centroids = None
+        self._lists: List[set] = []
+        self._assignment = {}
+        self._trained_size = 0
+
+    def _params(self):
+        return {
+            "nprobe": self.nprobe,
+            "train_threshold": self.train_threshold,
+            "kmeans_iterations": self.kmeans_iterations,
+            "seed": self.seed
+        }
+
+    def _on_add(self, slot):
+        if self._centroids is None:
+            if len(self._slots) >= self.train_threshold:
+                self.train()
+            return
+        if len(self._slots) >= 2 * self._trained_size:
+            self.train()
+            return
+        cluster = int(np.argmax(self._centroids @ self._vectors[slot]))
+        self._lists[cluster].add(slot)
+        self._assignment[slot] = cluster
+
+    def _on_remove(self, slot):
+        cluster = self._assignment.pop(slot, None)
+        if cluster is not None:
+            self._lists[cluster].discard(slot)
+
+    @_locked
+    def train(self):
+        """Cluster the live vectors with spherical k-means and rebuild the inverted lists"""
+        slots = np.flatnonzero(self._live[:len(self._keys)])
+        if len(slots) == 0:
+            return
+        data = self._vectors[slots]
+        nlist = max(1, int(np.sqrt(len(slots))))
+
+        rng = np.random.default_rng(self.seed)
+        centroids = data[rng.choice(len(slots), nlist, replace=False)].copy()
+        for _ in range(self.kmeans_iterations):
+            labels = np.argmax(data @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, data)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # Empty clusters keep their previous centroid
+            centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+        labels = np.argmax(data @ centroids.T, axis=1)
+
+        self._centroids = centroids
+        self._lists = [set() for _ in range(nlist)]
+        self._assignment = {}
+        for slot, cluster in zip(slots.tolist(), labels.tolist()):
+            self._lists[cluster].add(slot)
+            self._assignment[slot] = cluster
+        self._trained_size = len(slots)
+
+    @_locked
+    def search(self, query, k, tag=None, min_score=None):
+        results = self._search(query, k, tag, min_score, self._candidate_slots)
+        if tag is not None and len(results) < k and self._centroids is not None:
+            # The probed clusters may hold few vectors of this tag; score all of its vectors instead
+            results = self._search(query, k, tag, min_score, lambda unit: self._live_slots())
+        return results
+
+    def _candidate_slots(self, query):
+        if self._centroids is None:
+            return super()._candidate_slots(query)
+        nprobe = min(self.nprobe, len(self._lists))
+        probes = np.argpartition(-(self._centroids @ query), nprobe - 1)[:nprobe]
+        candidates = [slot for cluster in probes for slot in self._lists[cluster]]
+        return np.array(candidates, dtype=np.int64)
+
+
+_INDEX_KINDS = {
+    ExactVectorIndex.kind: ExactVectorIndex,
+    IVFVectorIndex.kind: IVFVectorIndex,
+}
+
+
+def create_vector_index(kind: str = "ivf", **params) -> VectorIndex:
+    if kind not in _INDEX_KINDS:
+        raise ValueError(f"Unknown vector index kind '{kind}', expected one of {sorted(_INDEX_KINDS)}")
+    return _INDEX_KINDS[kind](**params)
+
+
+def load_vector_index(path: str) -> VectorIndex:
+    with np.load(path, allow_pickle=False) as data:
+        vectors = data["vectors"]
+        meta = json.loads(str(data["meta"]))
+    index = create_vector_index(meta["kind"], **meta.get("params", {}))
+    index._load_entries(vectors, meta)
+    return index
@@ -0,0 +1,277 @@
+"""
+Append-only write-ahead log of database mutations.
+
+Records are compact JSON dicts, each framed by its length and CRC32 and numbered with an
+increasing sequence number. Appends only queue a record; a flusher thread writes everything
+queued and fsyncs it in one go every flush_interval seconds, so a burst of mutations costs one
+fsync. A record whose frame was torn by a crash (short or failing its CRC) ends the log.
+
+The log is a directory of segments. checkpoint() starts a new segment and returns the last
+sequence number before it; a snapshot written from that point includes everything up to it,
+after which release() deletes the segments it covers. Every segment starts with a header naming
+the log (wal_id) and the database it extends (base, the generated_at of the snapshot the log was
+started on), so a log left over from another database is never replayed onto it.
+"""
+import base64
+import json
+import os
+import struct
+import threading
+import uuid
+import zlib
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+_FRAME = struct.Struct("<II")
+_SEGMENT_SUFFIX = ".wal"
+VERSION = 1
+
+
+def pack_embedding(vector) -> str:
+    """An embedding as base64 of its float32 bytes, about a quarter of its JSON size"""
+    return base64.b64encode(np.asarray(vector, dtype=np.float32).tobytes()).decode("ascii")
+
+
+def unpack_embedding(text: str) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(text), dtype=np.float32)
+
+
+def _encode(record: dict) -> bytes:
+    payload = json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode("utf-8")
+    return _FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def _read_frames(path: str) -> Tuple[List[dict], int]:
+    """The records of a segment and the offset just after the last intact one"""
+    records = []
+    end = 0
+    with open(path, "rb") as f:
+        while True:
+            header = f.read(_FRAME.size)
+            if len(header) < _FRAME.size:
+                break
+            length, crc = _FRAME.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                break
+            try:
+                records.append(json.loads(payload))
+            except ValueError:
+                break
+            end = f.tell()
+    return records, end
+
+
+class WriteAheadLog:
+    def __init__(self, directory: str, flush_interval: float = 0.05, compact_after_bytes: int = 16 << 20):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.compact_after_bytes = compact_after_bytes
+        # Called from a background thread once compact_after_bytes were logged since the last
+        # checkpoint; expected to write a snapshot through checkpoint() and release()
+        self.compact: Optional[Callable[[], None]] = None
+
+        self.wal_id = None
+        self.base = None
+        self.compactions = 0
+        self._condition = threading.Condition()
+        # Held while writing to the segment file, so batches reach it in sequence order
+        self._io_lock = threading.Lock()
+        self._pending: List[bytes] = []
+        self._next_sequence = 1
+        self._durable_sequence = 0
+        self._bytes_since_checkpoint = 0
+        self._segment = 0
+        self._file = None
+        self._closed = True
+        self._compacting = False
+        self._flusher = None
+
+        os.makedirs(directory, exist_ok=True)
+
+    # Reading
+
+    def _segment_paths(self) -> List[Tuple[int, str]]:
+        segments = []
+        for name in os.listdir(self.directory):
+            stem, suffix = os.path.splitext(name)
+            if suffix == _SEGMENT_SUFFIX and stem.isdigit():
+                segments.append((int(stem), os.path.join(self.directory, name)))
+        return sorted(segments)
+
+    def _header(self) -> Optional[dict]:
+        for _, path in self._segment_paths():
+            records, _ = _read_frames(path)
+            if records and records[0].get("op") == "header":
+                return records[0]
+        return None
+
+    def applies_to(self, metadata: dict) -> bool:
+        """Whether the log on disk extends the database that was loaded with this metadata"""
+        header = self._header()
+        if header is None:
+            return False
+        # A snapshot written by a compaction names the log; one the log was started on is its base.
+        # Both are checked: a snapshot that still names a log deleted since is the base of a new one.
+        return metadata.get("wal_id") == header["wal_id"] or (metadata.get("generated_at") or "empty") == header["base"]
+
+    def records(self, after_sequence: int = 0) -> Iterator[dict]:
+        """Logged records with a sequence number above after_sequence, in order"""
+        for _, path in self._segment_paths():
+            records, _ = _read_frames(path)
+            for record in records:
+                if record.get("op") != "header" and record["seq"] > after_sequence:
+                    yield record
+
+    # Writing
+
+    def start(self, metadata: dict):
+        """
+        Open the log for appending on top of the loaded database. A log that extends it is
+        continued (after replaying it); any other log on disk is deleted.
+        """
+        segments = self._segment_paths()
+        continued = bool(segments) and self.applies_to(metadata)
+        if continued:
+            header = self._header()
+            self.wal_id, self.base = header["wal_id"], header["base"]
+            last_sequence = 0
+            for _, path in segments:
+                records, end = _read_frames(path)
+                last_sequence = max([last_sequence] + [r["seq"] for r in records if r.get("op") != "header"])
+                # Drop a torn tail so the next reader does not stop early
+                if end < os.path.getsize(path):
+                    with open(path, "r+b") as f:
+                        f.truncate(end)
+            self._next_sequence = last_sequence + 1
+        else:
+            for _, path in segments:
+                os.remove(path)
+            self.wal_id = uuid.uuid4().hex
+            self.base = metadata.get("generated_at") or "empty"
+            self._next_sequence = 1
+        self._durable_sequence = self._next_sequence - 1
+
+        self._segment = segments[-1][0] if continued else 0
+        self._closed = False
+        self._open_segment()
+        self._flusher = threading.Thread(target=self._flush_loop, name="wal-flusher", daemon=True)
+        self._flusher.start()
+
+    def _open_segment(self):
+        self._segment += 1
+        path = os.path.join(self.directory, f"{self._segment:08d}{_SEGMENT_SUFFIX}")
+        self._file = open(path, "ab")
+        self._file.write(_encode({"op": "header", "version": VERSION, "wal_id": self.wal_id,
+                                  "base": self.base, "segment": self._segment}))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def append(self, record: dict) -> int:
+        """Queue a record and return its sequence number; it is durable once flushed"""
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("The write-ahead log is not open")
+            sequence = self._next_sequence
+            self._next_sequence += 1
+            frame = _encode({**record, "seq": sequence})
+            self._pending.append(frame)
+            self._bytes_since_checkpoint += len(frame)
+            self._condition.notify_all()
+            return sequence
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every record appended so far is on disk; False if the timeout expired first"""
+        with self._condition:
+            target = self._next_sequence - 1
+            self._condition.notify_all()
+            return self._condition.wait_for(lambda: self._durable_sequence >= target or self._closed, timeout)
+
+    def _write_pending(self):
+        """Write and fsync the queued records; called with _io_lock held. Appends continue meanwhile."""
+        with self._condition:
+            batch, self._pending = self._pending, []
+            sequence = self._next_sequence - 1
+        if batch:
+            self._file.write(b"".join(batch))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        with self._condition:
+            self._durable_sequence = max(self._durable_sequence, sequence)
+            self._condition.notify_all()
+
+    def _flush_loop(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending or self._closed)
+                if self._closed:
+                    return
+                # Let more records join this batch before paying for the fsync
+                self._condition.wait(self.flush_interval)
+            with self._io_lock:
+                if self._file.closed:
+                    return
+                self._write_pending()
+            with self._condition:
+                if self._bytes_since_checkpoint >= self.compact_after_bytes and self.compact is not None \
+                        and not self._compacting:
+                    self._compacting = True
+                    threading.Thread(target=self._run_compaction, name="wal-compaction", daemon=True).start()
+
+    def _run_compaction(self):
+        try:
+            self.compact()
+            self.compactions += 1
+        except Exception as e:
+            print(f"⚠️  Write-ahead log compaction failed: {e}")
+        finally:
+            with self._condition:
+                self._compacting = False
+
+    def checkpoint(self) -> dict:
+        """
+        Close the current segment and continue in a new one. Call it while no mutation can be
+        logged; a snapshot of the database at this moment includes exactly the records up to
+        the returned wal_sequence, which goes into its metadata.
+        """
+        with self._io_lock:
+            self._write_pending()
+            self._file.close()
+            with self._condition:
+                self._open_segment()
+                self._bytes_since_checkpoint = 0
+                return {"wal_id": self.wal_id, "wal_sequence": self._next_sequence - 1}
+
+    def release(self, wal_sequence: int):
+        """Delete the segments that only hold records up to wal_sequence (now part of a snapshot)"""
+        with self._condition:
+            current = self._segment
+        for number, path in self._segment_paths():
+            if number >= current:
+                continue
+            records, _ = _read_frames(path)
+            if all(r.get("op") == "header" or r["seq"] <= wal_sequence for r in records):
+                os.remove(path)
+
+    def close(self):
+        with self._io_lock:
+            with self._condition:
+                if self._closed:
+                    return
+                self._closed = True
+                self._condition.notify_all()
+            self._write_pending()
+            self._file.close()
+        self._flusher.join()
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                "wal_id": self.wal_id,
+                "last_sequence": self._next_sequence - 1,
+                "durable_sequence": self._durable_sequence,
+                "segments": len(self._segment_paths()),
+                "bytes_since_checkpoint": self._bytes_since_checkpoint,
+                "compactions": self.compactions
+            }
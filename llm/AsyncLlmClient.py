@@ -0,0 +1,84 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
+import httpx
+
+from llm.LlmClient import LlmClient
+
+
+class AsyncLlmClient:
+    """asyncio counterpart of LlmClient for use inside FastAPI routes"""
+    # Requests share LlmClient's in-flight limit, polled between these delays while it is full
+    _slot_poll_min = 0.005
+    _slot_poll_max = 0.1
+
+    _async_client = None
+
+    def __init__(self, address = 'https://api.azerion.ai/v1/'):
+        # Request building and response parsing are shared with the blocking client
+        self.llm_client = LlmClient(address)
+        self.address = address
+
+    @classmethod
+    @asynccontextmanager
+    async def in_flight_slot(cls):
+        """Hold one of the slots of LlmClient.configure_concurrency, without blocking the event loop"""
+        semaphore = LlmClient._in_flight
+        delay = cls._slot_poll_min
+        while not semaphore.acquire(blocking=False):
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, cls._slot_poll_max)
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+    @classmethod
+    def get_async_client(cls) -> httpx.AsyncClient:
+        """Return the process-wide async HTTP client, creating it on first use"""
+        if cls._async_client is None or cls._async_client.is_closed:
+            cls._async_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=LlmClient._pool_maxsize,
+                    max_keepalive_connections=LlmClient._pool_maxsize if LlmClient._keep_alive else 0
+                ),
+                timeout=httpx.Timeout(LlmClient._read_timeout, connect=LlmClient._connect_timeout)
+            )
+        return cls._async_client
+
+    @classmethod
+    async def aclose(cls):
+        if cls._async_client is not None:
+            await cls._async_client.aclose()
+            cls._async_client = None
+
+    async def generate_response(self, prompt, endpoint = "chat/completions", all_embeddings: bool = False):
+        try:
+            headers, data = self.llm_client.build_request(prompt)
+            # The response cache is SQLite, read and written off the event loop
+            cache_key, cached = await asyncio.to_thread(self.llm_client.cache_lookup, endpoint, data) \
+                if self.llm_client.caches(endpoint) else (None, None)
+            if cached is not None:
+                return cached
+
+            async with self.in_flight_slot():
+                response = await self.get_async_client().post(
+                    self.address + endpoint,
+                    headers=headers,
+                    content=data
+                )
+
+            if response.status_code == 200:
+                try:
+                    result = self.llm_client.parse_response_data(response.json(), all_embeddings)
+                    if cache_key is not None:
+                        await asyncio.to_thread(self.llm_client.cache_store, cache_key, result)
+                    return result
+                except json.JSONDecodeError:
+                    return 'Invalid JSON'
+            else:
+                return f'Request failed with status code {response.status_code}'
+
+        except httpx.HTTPError as e:
+            return f'Request failed: {str(e)}'
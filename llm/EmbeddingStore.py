@@ -0,0 +1,176 @@
+import fcntl
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import List, Optional
+
+import numpy as np
+
+
+class EmbeddingStore:
+    """
+    Persistent embedding memo keyed by a hash of (model, text).
+    Vectors are appended to a float32 matrix file that is memory-mapped for reading, with an
+    append-only hash -> row index next to it, and the most recently used vectors are also kept in
+    an in-process LRU.
+
+    The files are shared by every process using the same directory (the API and main_generate.py).
+    A row is allocated from the matrix size on disk and appended together with its index entry
+    under an exclusive file lock, and a miss first picks up the entries other processes appended.
+    """
+    _matrix_file = "embeddings.f32"
+    _index_file = "index.tsv"
+    _meta_file = "meta.json"
+    _lock_file = "store.lock"
+
+    def __init__(self, directory: str = "embedding_store", lru_size: int = 4096):
+        self.directory = directory
+        self.lru_size = lru_size
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._lru: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._rows = {}
+        # Bytes of the index file read so far; everything before it ends in a complete line
+        self._index_offset = 0
+        self._dim = None
+        self._matrix = None
+
+        os.makedirs(directory, exist_ok=True)
+        self._read_meta()
+        self._read_index()
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\n{text}".encode("utf-8")).hexdigest()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive across processes; taken with _lock held"""
+        with open(self._path(self._lock_file), "a") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _read_meta(self):
+        meta_path = self._path(self._meta_file)
+        if self._dim is None and os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                self._dim = json.load(f)["dim"]
+
+    def _read_index(self):
+        """Add the index entries appended since the last read, by this or another process"""
+        index_path = self._path(self._index_file)
+        if not os.path.exists(index_path) or os.path.getsize(index_path) <= self._index_offset:
+            return
+        with open(index_path, "rb") as f:
+            f.seek(self._index_offset)
+            data = f.read()
+        # A torn last line from an interrupted write is left unread (and cut off by the next put)
+        complete = data[:data.rfind(b"\n") + 1]
+        for line in complete.decode("utf-8").splitlines():
+            parts = line.split("\t")
+            if len(parts) == 2 and parts[1].isdigit():
+                self._rows[parts[0]] = int(parts[1])
+        self._index_offset += len(complete)
+
+    def _row(self, row: int) -> np.ndarray:
+        """A stored row, remapping the matrix file when the row was appended after it was mapped"""
+        if self._matrix is None or row >= self._matrix.shape[0]:
+            rows = os.path.getsize(self._path(self._matrix_file)) // (self._dim * 4)
+            self._matrix = np.memmap(self._path(self._matrix_file), dtype=np.float32, mode="r",
+                                     shape=(rows, self._dim))
+        return self._matrix[row]
+
+    def get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                self.hits += 1
+                return self._lru[key]
+
+            row = self._rows.get(key)
+            if row is None:
+                self._read_index()
+                row = self._rows.get(key)
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            embedding = self._row(row).tolist()
+            self._remember(key, embedding)
+            return embedding
+
+    def put(self, key: str, embedding: List[float]) -> List[float]:
+        """Store an embedding and return it as it will be served from the store (float32)"""
+        vector = np.asarray(embedding, dtype=np.float32)
+
+        with self._lock:
+            if key not in self._rows:
+                with self._file_lock():
+                    self._read_meta()
+                    if self._dim is None:
+                        self._dim = int(vector.shape[0])
+                        with open(self._path(self._meta_file), "w", encoding="utf-8") as f:
+                            json.dump({"dim": self._dim}, f)
+                    self._check_dimension(vector)
+                    self._read_index()
+                    if key not in self._rows:
+                        self._append(key, vector)
+            else:
+                self._check_dimension(vector)
+
+            stored = vector.tolist()
+            self._remember(key, stored)
+            return stored
+
+    def _check_dimension(self, vector: np.ndarray):
+        if vector.shape[0] != self._dim:
+            raise ValueError(f"Embedding has dimension {vector.shape[0]}, store expects {self._dim}")
+
+    def _append(self, key: str, vector: np.ndarray):
+        """Append a row and its index entry; called with the file lock held"""
+        row_bytes = self._dim * 4
+        with open(self._path(self._matrix_file), "ab") as f:
+            row, torn = divmod(f.seek(0, os.SEEK_END), row_bytes)
+            if torn:
+                f.truncate(row * row_bytes)
+            f.write(vector.tobytes())
+
+        # The row is written before its index entry, so a crash never indexes garbage
+        line = f"{key}\t{row}\n".encode("utf-8")
+        with open(self._path(self._index_file), "ab") as f:
+            if f.seek(0, os.SEEK_END) > self._index_offset:
+                f.truncate(self._index_offset)
+            f.write(line)
+        self._index_offset += len(line)
+        self._rows[key] = row
+
+    def _remember(self, key: str, embedding: List[float]):
+        self._lru[key] = embedding
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._rows),
+                "lru_entries": len(self._lru),
+                "dim": self._dim
+            }
@@ -0,0 +1,116 @@
+import threading
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+
+class KeywordEmbeddingMatrix:
+    """
+    The keyword embeddings of many events packed into one contiguous, L2-normalized matrix.
+    offsets[i]:offsets[i + 1] are the rows belonging to events[i]. One instance may be shared by
+    several threads through match_counts.
+    """
+    # Rows of the packed matrix multiplied at once, bounds the size of the similarity block
+    _block_rows = 8192
+    # Products of normalized vectors can differ from the pairwise cosine in the last bits; pairs
+    # this close to the threshold are decided by the pairwise computation
+    _tolerance = 1e-9
+
+    def __init__(self):
+        self.events = []
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.matrix = None
+        self._packed_blocks = []
+        # id(event) -> (keywords list the block was built from, normalized block)
+        self._blocks = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(embeddings) -> np.ndarray:
+        vectors = np.asarray(embeddings, dtype=np.float64)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        # Zero vectors stay zero, so they never pass a positive threshold (same as cosine_similarity)
+        return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+    def _block_for(self, event) -> np.ndarray:
+        cached = self._blocks.get(id(event))
+        if cached is not None and cached[0] is event.keywords:
+            return cached[1]
+        block = self.normalize([kw.emb for kw in event.keywords])
+        self._blocks[id(event)] = (event.keywords, block)
+        return block
+
+    def sync(self, events: List):
+        """Repack for these events; only events whose keywords changed are re-normalized"""
+        packed_events = []
+        blocks = []
+        for event in events:
+            if not event.keywords:
+                continue
+            block = self._block_for(event)
+            if blocks and block.shape[1] != blocks[0].shape[1]:
+                continue
+            packed_events.append(event)
+            blocks.append(block)
+
+        live_ids = {id(event) for event in events}
+        self._blocks = {key: value for key, value in self._blocks.items() if key in live_ids}
+
+        unchanged = len(packed_events) == len(self.events) and all(
+            event is known_event and block is known_block
+            for event, known_event, block, known_block
+            in zip(packed_events, self.events, blocks, self._packed_blocks)
+        )
+        if unchanged:
+            return
+
+        self.events = packed_events
+        self.offsets = np.zeros(len(blocks) + 1, dtype=np.int64)
+        self.offsets[1:] = np.cumsum([len(block) for block in blocks])
+        self.matrix = np.concatenate(blocks) if blocks else None
+        self._packed_blocks = blocks
+
+    @classmethod
+    def above(cls, scores: np.ndarray, threshold: float,
+              exact: Optional[Callable[[int, int], float]] = None) -> np.ndarray:
+        """scores > threshold, with the pairs within _tolerance of it decided by exact(row, column)"""
+        hits = scores > threshold
+        if exact is not None:
+            for i, j in zip(*np.nonzero(np.abs(scores - threshold) <= cls._tolerance)):
+                hits[i, j] = exact(int(i), int(j)) > threshold
+        return hits
+
+    def match_counts(self, events: List, query_embeddings, threshold: float,
+                     cosine: Callable = None) -> List[Tuple[object, int]]:
+        """sync and count_matches in one step, safe against other threads: (event, count) per packed event"""
+        with self._lock:
+            self.sync(events)
+            return list(zip(self.events, self.count_matches(query_embeddings, threshold, cosine).tolist()))
+
+    def _keyword_embedding(self, row: int):
+        position = int(np.searchsorted(self.offsets, row, side="right")) - 1
+        return self.events[position].keywords[row - int(self.offsets[position])].emb
+
+    def count_matches(self, query_embeddings, threshold: float, cosine: Callable = None) -> np.ndarray:
+        """
+        For each packed event, count the (query keyword, event keyword) pairs whose cosine
+        similarity is strictly above threshold. With cosine (embedding, embedding) -> similarity,
+        pairs at the threshold are decided by it, as a pairwise comparison would.
+        """
+        counts = np.zeros(len(self.events), dtype=np.int64)
+        if self.matrix is None or len(query_embeddings) == 0:
+            return counts
+
+        queries = self.normalize(query_embeddings)
+        if queries.shape[1] != self.matrix.shape[1]:
+            raise ValueError("Embeddings must have the same dimension")
+
+        row_hits = np.empty(len(self.matrix), dtype=np.int64)
+        for start in range(0, len(self.matrix), self._block_rows):
+            block = self.matrix[start:start + self._block_rows]
+            exact = None if cosine is None else \
+                lambda i, j, start=start: cosine(query_embeddings[i], self._keyword_embedding(start + j))
+            row_hits[start:start + len(block)] = self.above(queries @ block.T, threshold, exact).sum(axis=0)
+
+        # Every packed event has at least one keyword, so no segment is empty
+        return np.add.reduceat(row_hits, self.offsets[:-1])
@@ -1,14 +1,144 @@
 import json
+import threading
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from config.PrivateKeys import _api_key
+from llm.ResponseCache import ResponseCache
 
 class LlmClient:
+    # Connection pool shared by every LlmClient in the process
+    _pool_connections = 10
+    _pool_maxsize = 20
+    _connect_timeout = 10
+    _read_timeout = 120
+    _keep_alive = True
+
+    _session = None
+    _session_lock = threading.Lock()
+
+    # Upper bound on requests in flight from this process, across all threads and AsyncLlmClients
+    _max_in_flight = 16
+    _in_flight = threading.BoundedSemaphore(_max_in_flight)
+
+    # Persistent response cache shared by every LlmClient in the process
+    _cache_enabled = True
+    _cache_path = "llm_cache.sqlite3"
+    _cache_max_bytes = 256 * 1024 * 1024
+    _cached_endpoints = ("chat/completions",)
+
+    _response_cache = None
+
     def __init__(self, address = 'https://api.azerion.ai/v1/'):
         self.address = address
         self.api_key = _api_key
 
+    @classmethod
+    def configure_session(cls, pool_connections: int = None, pool_maxsize: int = None,
+                          connect_timeout: float = None, read_timeout: float = None,
+                          keep_alive: bool = None):
+        """Change the pool size, keep-alive and timeouts; the shared session is rebuilt on next use"""
+        with cls._session_lock:
+            if pool_connections is not None:
+                cls._pool_connections = pool_connections
+            if pool_maxsize is not None:
+                cls._pool_maxsize = pool_maxsize
+            if connect_timeout is not None:
+                cls._connect_timeout = connect_timeout
+            if read_timeout is not None:
+                cls._read_timeout = read_timeout
+            if keep_alive is not None:
+                cls._keep_alive = keep_alive
+
+            if cls._session is not None:
+                cls._session.close()
+                cls._session = None
+
+    @classmethod
+    def get_session(cls) -> requests.Session:
+        """Return the process-wide pooled session, creating it on first use"""
+        if cls._session is None:
+            with cls._session_lock:
+                if cls._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(
+                        pool_connections=cls._pool_connections,
+                        pool_maxsize=cls._pool_maxsize
+                    )
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    session.headers['Connection'] = 'keep-alive' if cls._keep_alive else 'close'
+                    cls._session = session
+        return cls._session
+
+    @classmethod
+    def get_timeout(cls):
+        return (cls._connect_timeout, cls._read_timeout)
+
+    @classmethod
+    def configure_concurrency(cls, max_in_flight: int):
+        """Change the per-process cap on concurrent requests; requests already waiting keep the old cap"""
+        with cls._session_lock:
+            cls._max_in_flight = max_in_flight
+            cls._in_flight = threading.BoundedSemaphore(max_in_flight)
+
+    @classmethod
+    def configure_cache(cls, enabled: bool = None, path: str = None, max_bytes: int = None):
+        """Change the response cache settings; the cache is reopened on next use"""
+        with cls._session_lock:
+            if enabled is not None:
+                cls._cache_enabled = enabled
+            if path is not None:
+                cls._cache_path = path
+            if max_bytes is not None:
+                cls._cache_max_bytes = max_bytes
+
+            if cls._response_cache is not None:
+                cls._response_cache.close()
+                cls._response_cache = None
+
+    @classmethod
+    def get_response_cache(cls):
+        """Return the process-wide response cache, or None when caching is disabled"""
+        if not cls._cache_enabled:
+            return None
+        if cls._response_cache is None:
+            with cls._session_lock:
+                if cls._response_cache is None:
+                    cls._response_cache = ResponseCache(cls._cache_path, cls._cache_max_bytes)
+        return cls._response_cache
+
+    def caches(self, endpoint) -> bool:
+        """Whether responses of this endpoint go through the response cache"""
+        return self._cache_enabled and endpoint in self._cached_endpoints
+
+    def cache_lookup(self, endpoint, data):
+        """Return (key, cached response); key is None when this endpoint is not cached"""
+        cache = self.get_response_cache()
+        if cache is None or endpoint not in self._cached_endpoints:
+            return None, None
+        key = ResponseCache.make_key(self.address + endpoint, data)
+        return key, cache.get(key)
+
+    def cache_store(self, key, response):
+        cache = self.get_response_cache()
+        if cache is None or key is None:
+            return
+        # Only successful responses are worth replaying (embeddings are lists, answers strings)
+        if response is None or (isinstance(response, str) and self.is_failed_response(response)) \
+                or (isinstance(response, list) and not response):
+            return
+        cache.put(key, response)
+
+    @staticmethod
+    def is_failed_response(response) -> bool:
+        """True for the error strings generate_response returns instead of raising, and for empty answers"""
+        if not isinstance(response, str) or not response.strip():
+            return True
+        return response.startswith('Request failed') or \
+            response in ('Invalid JSON', 'Invalid response structure', 'No content found')
+
     @staticmethod
     def clean_response(text: str) -> str:
         """Remove surrounding quotation marks and extra whitespace from AI responses"""
@@ -24,45 +154,65 @@ class LlmClient:
         
         return text.strip()
 
-    def generate_response(self, prompt, endpoint = "chat/completions"):
+    def build_request(self, prompt):
+        """Return the headers and JSON body for a prompt"""
         headers = {
             'Content-Type': 'application/json',
             'Authorization': f'Bearer {self.api_key}'
         }
-        
-        try:
-            data= prompt.to_json() if hasattr(prompt, 'to_json') else json.dumps(prompt)
-            response = requests.post(
-                self.address + endpoint,
-                headers=headers,
-                data=data
-            )
+        data = prompt.to_json() if hasattr(prompt, 'to_json') else json.dumps(prompt)
+        return headers, data
 
-            if response.status_code == 200:
-                try:
-                    response_data = response.json()
+    @classmethod
+    def parse_response_data(cls, response_data, all_embeddings: bool = False):
+        """
+        Extract the embedding or the message content from a decoded response body.
+        With all_embeddings, every embedding of a batched request is returned in input order.
+        """
+        # Handle embeddings endpoint response (OpenAI-style)
+        if 'data' in response_data and isinstance(response_data['data'], list):
+            if all_embeddings:
+                items = sorted(response_data['data'], key=lambda item: item.get('index', 0))
+                return [item['embedding'] for item in items if 'embedding' in item]
+            if response_data['data'] and 'embedding' in response_data['data'][0]:
+                return response_data['data'][0]['embedding']
+
+        # Handle chat completions response (OpenAI-style)
+        elif 'choices' in response_data and isinstance(response_data['choices'], list) \
+                and response_data['choices']:
+            message = response_data['choices'][0].get('message', {})
+            content = message.get('content', 'No content found')
+            return cls.clean_response(content)
 
-                    # Handle embeddings endpoint response (OpenAI-style)
-                    if 'data' in response_data and isinstance(response_data['data'], list):
-                        if response_data['data'] and 'embedding' in response_data['data'][0]:
-                            return response_data['data'][0]['embedding']
+        # Handle Ollama /api/generate response
+        elif 'response' in response_data:
+            # e.g. {"model":"llama3.2-vision:11b", "response":"...", "done":true, ...}
+            content = response_data.get('response', '')
+            return cls.clean_response(content)
 
-                    # Handle chat completions response (OpenAI-style)
-                    elif 'choices' in response_data and isinstance(response_data['choices'], list) \
-                            and response_data['choices']:
-                        message = response_data['choices'][0].get('message', {})
-                        content = message.get('content', 'No content found')
-                        return self.clean_response(content)
+        else:
+            return 'Invalid response structure'
 
-                    # Handle Ollama /api/generate response
-                    elif 'response' in response_data:
-                        # e.g. {"model":"llama3.2-vision:11b", "response":"...", "done":true, ...}
-                        content = response_data.get('response', '')
-                        return self.clean_response(content)
+    def generate_response(self, prompt, endpoint = "chat/completions", all_embeddings: bool = False):
+        try:
+            headers, data = self.build_request(prompt)
+            cache_key, cached = self.cache_lookup(endpoint, data)
+            if cached is not None:
+                return cached
 
-                    else:
-                        return 'Invalid response structure'
+            with self._in_flight:
+                response = self.get_session().post(
+                    self.address + endpoint,
+                    headers=headers,
+                    data=data,
+                    timeout=self.get_timeout()
+                )
 
+            if response.status_code == 200:
+                try:
+                    result = self.parse_response_data(response.json(), all_embeddings)
+                    self.cache_store(cache_key, result)
+                    return result
                 except json.JSONDecodeError:
                     return 'Invalid JSON'
             else:
@@ -70,5 +220,3 @@ class LlmClient:
 
         except requests.exceptions.RequestException as e:
             return f'Request failed: {str(e)}'
-
-
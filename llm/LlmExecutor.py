@@ -0,0 +1,49 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List
+
+
+class LlmExecutor:
+    """
+    Process-wide thread pool for issuing independent LLM calls at the same time.
+    The number of requests actually in flight is capped separately by LlmClient.
+    """
+    _max_workers = 16
+
+    _executor = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, max_workers: int = None):
+        """Change the pool size; the pool is recreated on next use"""
+        with cls._lock:
+            if max_workers is not None:
+                cls._max_workers = max_workers
+            if cls._executor is not None:
+                cls._executor.shutdown(wait=False)
+                cls._executor = None
+
+    @classmethod
+    def get_executor(cls) -> ThreadPoolExecutor:
+        if cls._executor is None:
+            with cls._lock:
+                if cls._executor is None:
+                    cls._executor = ThreadPoolExecutor(max_workers=cls._max_workers, thread_name_prefix="llm")
+        return cls._executor
+
+    @classmethod
+    def run_concurrently(cls, *calls: Callable[[], Any]) -> List[Any]:
+        """
+        Run zero-argument callables concurrently and return their results in order.
+        The first call runs on the calling thread. A call still queued when its result is needed
+        is taken back and run inline, so nested fan-outs from pool workers never wait on a full pool.
+        """
+        if len(calls) <= 1:
+            return [call() for call in calls]
+
+        executor = cls.get_executor()
+        futures = [executor.submit(call) for call in calls[1:]]
+        results = [calls[0]()]
+        for call, future in zip(calls[1:], futures):
+            results.append(call() if future.cancel() else future.result())
+        return results
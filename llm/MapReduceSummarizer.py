@@ -0,0 +1,114 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import List
+
+from llm.AzerionPromptTemplate import AzerionPromptTemplate
+from llm.LlmClient import LlmClient
+from llm.LlmExecutor import LlmExecutor
+from llm.PromptTemplates.Prompts import chunk_summary_prompt
+
+
+class MapReduceSummarizer:
+    """
+    Condenses many texts so they fit in one prompt.
+
+    Texts that already fit in the token budget are returned joined, unchanged. Otherwise they are
+    packed into chunks of at most the budget, the chunks are condensed concurrently and the
+    condensed notes are reduced again, until everything fits. Chunk notes are cached in-process
+    by content hash, so a growing event only condenses its new chunks.
+    """
+    # Estimated tokens of post text per prompt
+    _token_budget = 3000
+    _chars_per_token = 4
+    # Reduction rounds before the remaining text is truncated to the budget
+    _max_depth = 4
+
+    _cache_size = 4096
+    _cache: "OrderedDict[str, str]" = OrderedDict()
+    _in_flight = {}
+    _cache_lock = threading.Lock()
+
+    def __init__(self, llm_client: LlmClient, token_budget: int = None):
+        self.llm_client = llm_client
+        self.token_budget = token_budget or self._token_budget
+
+    @classmethod
+    def configure(cls, token_budget: int = None, chars_per_token: int = None, cache_size: int = None):
+        if token_budget is not None:
+            cls._token_budget = token_budget
+        if chars_per_token is not None:
+            cls._chars_per_token = chars_per_token
+        if cache_size is not None:
+            cls._cache_size = cache_size
+
+    @classmethod
+    def estimate_tokens(cls, text: str) -> int:
+        return len(text) // cls._chars_per_token + 1
+
+    def condense(self, texts: List[str], separator: str = ' ') -> str:
+        """Return the texts joined, condensed as many times as needed to fit the token budget"""
+        texts = [text for text in texts if text]
+        for _ in range(self._max_depth):
+            joined = separator.join(texts)
+            if self.estimate_tokens(joined) <= self.token_budget:
+                return joined
+            chunks = self.chunk(texts)
+            texts = LlmExecutor.run_concurrently(*(lambda chunk=chunk: self._condense_chunk(chunk) for chunk in chunks))
+
+        joined = separator.join(texts)
+        return joined[:self.token_budget * self._chars_per_token]
+
+    def chunk(self, texts: List[str]) -> List[str]:
+        """Pack texts greedily into chunks of at most the token budget, splitting texts that are too long"""
+        max_chars = self.token_budget * self._chars_per_token
+        chunks = []
+        current = []
+        current_tokens = 0
+        for text in texts:
+            for start in range(0, len(text), max_chars):
+                piece = text[start:start + max_chars]
+                tokens = self.estimate_tokens(piece)
+                if current and current_tokens + tokens > self.token_budget:
+                    chunks.append(' '.join(current))
+                    current, current_tokens = [], 0
+                current.append(piece)
+                current_tokens += tokens
+        if current:
+            chunks.append(' '.join(current))
+        return chunks
+
+    def _condense_chunk(self, chunk: str) -> str:
+        key = hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+        cls = type(self)
+        with cls._cache_lock:
+            if key in cls._cache:
+                cls._cache.move_to_end(key)
+                return cls._cache[key]
+            # Identical chunks requested concurrently (e.g. by both event summaries) are condensed once
+            future = cls._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = cls._in_flight[key] = Future()
+        if not owner:
+            return future.result()
+
+        try:
+            notes = self.llm_client.generate_response(AzerionPromptTemplate(prompt=chunk_summary_prompt.format(texts=chunk)))
+            if LlmClient.is_failed_response(notes):
+                # Keep the raw text rather than an error message; truncation bounds it later
+                notes = chunk
+            else:
+                with cls._cache_lock:
+                    cls._cache[key] = notes
+                    while len(cls._cache) > cls._cache_size:
+                        cls._cache.popitem(last=False)
+            future.set_result(notes)
+            return notes
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with cls._cache_lock:
+                cls._in_flight.pop(key, None)
@@ -55,6 +55,13 @@ search_query_to_topic_name_prompt = textwrap.dedent(
     Return only the topic name, nothing else.
     """)
 
+chunk_summary_prompt = textwrap.dedent(
+    """
+    Condense these news articles / conversations into short notes for a later summary.
+    Keep every distinct issue, fact, question and opinion, drop repetition. Return only the notes.
+    {texts}
+    """)
+
 event_name_prompt = textwrap.dedent(
     """
     Generate a maximum of 10 words name for an event considering these 
@@ -83,6 +90,71 @@ event_big_summary_prompt = textwrap.dedent(
     {event_posts}
     """)
 
+event_keywords_update_prompt = textwrap.dedent(
+    """
+    These are the 15 keywords of an event:
+    {previous_keywords}
+    A new news article / conversation about the event was added:
+    {new_post}
+    Return the updated set of 15 keywords separated by commas. Keep every existing keyword
+    that still applies exactly as written and only replace the ones the new article makes less relevant.
+    """)
+
+event_summary_update_prompt = textwrap.dedent(
+    """
+    This is the current summary of approximatively 50 words for an event:
+    {previous_summary}
+    A new news article / conversation about the event was added:
+    {new_post}
+    Rewrite the summary so it also reflects the new article, in approximatively 50 words.
+    Return only the summary.
+    """)
+
+event_case_description_update_prompt = textwrap.dedent(
+    """
+    You are maintaining text for a semantic search index that groups social media discussions
+    about local issues and initiatives.
+
+    This is the current neutral description (2-3 sentences) of the main topic, issue, or situation
+    discussed in an event:
+    {previous_description}
+
+    A new post was added to the event:
+    \"\"\"{new_post}\"\"\"
+
+    Update the description so it also covers the new post, keeping it concise (2-3 sentences).
+    Focus on what the discussion is about and who or what it concerns.
+    Do NOT mention time, place, social platforms, or posting behavior.
+    Use clear, factual, and general language in English.
+
+    Event description:
+    """)
+
+post_enrichment_prompt = textwrap.dedent(
+    """
+    You are analysing a Dutch-language social media post or news article for a municipality.
+    Use this official information from the Dutch Municipality to recognise misinformation
+    and to answer questions:
+    {all_the_belastingdienst_data}
+    
+    AVAILABLE TOPICS:
+    {topics}
+    
+    Return ONLY one JSON object, with no markdown and no additional text, with exactly these fields:
+    - "sentiment": integer from 0 (very negative) to 100 (very positive) describing the tone of the post
+    - "subject_description": ONE neutral English sentence (max ~25 words) describing the central issue
+      and who is affected, without location, timing, platform or "this post"
+    - "topic": the ONE exact topic name from the list above that best matches the post, or "Other"
+    - "actionables": list (possibly empty) of the obvious misinformation phrases and genuine questions
+      in the post, each an object with:
+        - "content": the phrase exactly as it appears in the post
+        - "is_question": true if it is a question, false if it is misinformation
+        - "proposed_response": the answer to the question, or the correction of the misinformation
+    
+    POST:
+    {post_data}
+    """)
+
 actionable_is_question_prompt = textwrap.dedent(
     """
     Generate a yes/no question about whether the given text is a question
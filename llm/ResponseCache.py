@@ -0,0 +1,113 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+
+class ResponseCache:
+    """
+    Persistent cache of LLM responses stored in a local SQLite file.
+    Entries are keyed on a hash of the endpoint and the full request body (model, messages,
+    sampling parameters) and evicted least-recently-used once the stored size exceeds max_bytes.
+    """
+
+    def __init__(self, path: str = "llm_cache.sqlite3", max_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._connection.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+        self._connection.commit()
+
+        self._total_bytes = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def make_key(endpoint: str, data: str) -> str:
+        """Hash the endpoint and the request body, independent of JSON key order"""
+        try:
+            canonical = json.dumps(json.loads(data), sort_keys=True, ensure_ascii=False)
+        except (TypeError, ValueError):
+            canonical = data
+        return hashlib.sha256(f"{endpoint}\n{canonical}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        """Return the cached response for key, or None on a miss"""
+        with self._lock:
+            row = self._connection.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._connection.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._connection.commit()
+            return json.loads(row[0])
+
+    def put(self, key: str, response):
+        serialized = json.dumps(response, ensure_ascii=False)
+        size = len(serialized.encode("utf-8"))
+
+        with self._lock:
+            previous = self._connection.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            if previous is not None:
+                self._total_bytes -= previous[0]
+
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, serialized, size, time.time())
+            )
+            self._total_bytes += size
+            self._evict()
+            self._connection.commit()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        while self._total_bytes > self.max_bytes:
+            rows = self._connection.execute(
+                "SELECT key, size FROM responses ORDER BY last_access LIMIT 64"
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                return
+
+            for key, size in rows:
+                if self._total_bytes <= self.max_bytes:
+                    break
+                self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._total_bytes -= size
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": entries,
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes
+            }
+
+    def clear(self):
+        with self._lock:
+            self._connection.execute("DELETE FROM responses")
+            self._connection.commit()
+            self._total_bytes = 0
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
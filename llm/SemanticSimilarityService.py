@@ -1,9 +1,14 @@
+import asyncio
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import List
+from typing import Dict, List
 
 import numpy as np
 
+from llm.AsyncLlmClient import AsyncLlmClient
+from llm.EmbeddingStore import EmbeddingStore
 from llm.LlmClient import LlmClient
 
 
@@ -36,9 +41,55 @@ def cosine_similarity(embedding1: List[float], embedding2: List[float]) -> float
 class SemanticSimilarityService:
     _embedding_model = "gemini-embedding-001"
     _embedding_endpoint = "embeddings"
+    # Inputs per embeddings request and how many batch requests run at once
+    _embedding_batch_size = 100
+    _embedding_max_workers = 4
 
-    def __init__(self, llm_client: LlmClient):
+    # Embedding memo shared by every service in the process and persisted across runs
+    _store_enabled = True
+    _store_directory = "embedding_store"
+    _store_lru_size = 4096
+
+    _embedding_store = None
+    _store_lock = threading.Lock()
+
+    def __init__(self, llm_client: LlmClient, async_llm_client: AsyncLlmClient = None):
         self.llm_client = llm_client
+        self.async_llm_client = async_llm_client or AsyncLlmClient(llm_client.address)
+
+    @classmethod
+    def configure_store(cls, enabled: bool = None, directory: str = None, lru_size: int = None):
+        """Change the embedding store settings; the store is reopened on next use"""
+        with cls._store_lock:
+            if enabled is not None:
+                cls._store_enabled = enabled
+            if directory is not None:
+                cls._store_directory = directory
+            if lru_size is not None:
+                cls._store_lru_size = lru_size
+            cls._embedding_store = None
+
+    @classmethod
+    def get_embedding_store(cls):
+        """Return the process-wide embedding store, or None when it is disabled"""
+        if not cls._store_enabled:
+            return None
+        if cls._embedding_store is None:
+            with cls._store_lock:
+                if cls._embedding_store is None:
+                    cls._embedding_store = EmbeddingStore(cls._store_directory, cls._store_lru_size)
+        return cls._embedding_store
+
+    def _stored_embedding(self, key):
+        store = self.get_embedding_store()
+        return store.get(key) if store else None
+
+    def _remember_embedding(self, key, response):
+        store = self.get_embedding_store()
+        # Error strings from the client are passed through untouched, never stored
+        if store is None or not isinstance(response, list):
+            return response
+        return store.put(key, response)
 
     def embed(self, txt: str) -> List[float]:
         prompt = EmbeddingsPromptTemplate(
@@ -46,13 +97,107 @@ class SemanticSimilarityService:
             prompt= txt
         )
 
+        key = EmbeddingStore.make_key(prompt.model, txt)
+        cached = self._stored_embedding(key)
+        if cached is not None:
+            return cached
+
         try:
             response = self.llm_client.generate_response(prompt, endpoint=self._embedding_endpoint)
 
-            return response
+            return self._remember_embedding(key, response)
+        except Exception as e:
+            raise Exception(f"Failed to generate embedding: {str(e)}")
+
+    async def embed_async(self, txt: str) -> List[float]:
+        prompt = EmbeddingsPromptTemplate(
+            model= "gemini-embedding-001",
+            prompt= txt
+        )
+
+        # The store reads and appends files, which is done off the event loop
+        key = EmbeddingStore.make_key(prompt.model, txt)
+        cached = await asyncio.to_thread(self._stored_embedding, key)
+        if cached is not None:
+            return cached
+
+        try:
+            response = await self.async_llm_client.generate_response(prompt, endpoint=self._embedding_endpoint)
+
+            return await asyncio.to_thread(self._remember_embedding, key, response)
         except Exception as e:
             raise Exception(f"Failed to generate embedding: {str(e)}")
 
+    def _split_cached(self, texts: List[str]):
+        """Return the embeddings already in the store and the distinct texts still to embed"""
+        store = self.get_embedding_store()
+        found: Dict[str, List[float]] = {}
+        missing: List[str] = []
+        for txt in dict.fromkeys(texts):
+            cached = store.get(EmbeddingStore.make_key(self._embedding_model, txt)) if store else None
+            if cached is not None:
+                found[txt] = cached
+            else:
+                missing.append(txt)
+        return found, missing
+
+    def _batches(self, texts: List[str]) -> List[List[str]]:
+        size = self._embedding_batch_size
+        return [texts[i:i + size] for i in range(0, len(texts), size)]
+
+    def _collect_batch(self, batch: List[str], response, found: Dict[str, List[float]]):
+        if not isinstance(response, list) or len(response) != len(batch):
+            raise Exception(f"Failed to generate embedding: {response if not isinstance(response, list) else 'batch size mismatch'}")
+        for txt, embedding in zip(batch, response):
+            found[txt] = self._remember_embedding(EmbeddingStore.make_key(self._embedding_model, txt), embedding)
+
+    @staticmethod
+    def _to_matrix(texts: List[str], found: Dict[str, List[float]]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.array([found[txt] for txt in texts], dtype=np.float32)
+
+    def embed_many(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed many texts with as few requests as possible.
+        Returns an (n, d) float32 array whose rows follow the order of texts.
+        """
+        found, missing = self._split_cached(texts)
+        batches = self._batches(missing)
+
+        def request(batch):
+            prompt = EmbeddingsPromptTemplate(model=self._embedding_model, prompt=batch)
+            return self.llm_client.generate_response(prompt, endpoint=self._embedding_endpoint, all_embeddings=True)
+
+        if len(batches) == 1:
+            responses = [request(batches[0])]
+        elif batches:
+            with ThreadPoolExecutor(max_workers=self._embedding_max_workers) as executor:
+                responses = list(executor.map(request, batches))
+        else:
+            responses = []
+
+        for batch, response in zip(batches, responses):
+            self._collect_batch(batch, response, found)
+        return self._to_matrix(texts, found)
+
+    async def embed_many_async(self, texts: List[str]) -> np.ndarray:
+        found, missing = await asyncio.to_thread(self._split_cached, texts)
+        batches = self._batches(missing)
+
+        responses = await asyncio.gather(*[
+            self.async_llm_client.generate_response(
+                EmbeddingsPromptTemplate(model=self._embedding_model, prompt=batch),
+                endpoint=self._embedding_endpoint,
+                all_embeddings=True
+            )
+            for batch in batches
+        ])
+
+        for batch, response in zip(batches, responses):
+            await asyncio.to_thread(self._collect_batch, batch, response, found)
+        return self._to_matrix(texts, found)
+
     def cosine_similarity(self, embedding1: List[float], embedding2: List[float]) -> float:
         vec1 = np.array(embedding1)
         vec2 = np.array(embedding2)
@@ -73,4 +218,8 @@ class SemanticSimilarityService:
     def similarity(self, text1: str, text2: str) -> float:
         embedding1 = self.embed(text1)
         embedding2 = self.embed(text2)
-        return self.cosine_similarity(embedding1, embedding2)
\ No newline at end of file
+        return self.cosine_similarity(embedding1, embedding2)
+
+    async def similarity_async(self, text1: str, text2: str) -> float:
+        embedding1, embedding2 = await asyncio.gather(self.embed_async(text1), self.embed_async(text2))
+        return self.cosine_similarity(embedding1, embedding2)
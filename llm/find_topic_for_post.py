@@ -5,6 +5,7 @@
 # 3. Returns the topic with the highest cosine similarity.
 
 from typing import List
+from llm.AsyncLlmClient import AsyncLlmClient
 from llm.AzerionPromptTemplate import AzerionPromptTemplate
 from llm.LlmClient import LlmClient
 from llm.PromptTemplates.Prompts import find_topic_for_post_prompt
@@ -27,10 +28,7 @@ def find_topic_for_post_old(post: Post, topics: List[Topic]) -> Topic:
     return most_similar_topic
 
 
-# Use prompt for this one
-def find_topic_for_post(post: Post, topics: List[Topic]) -> Topic:
-    llm_client = LlmClient()
-    
+def _build_find_topic_prompt(post: Post, topics: List[Topic]) -> AzerionPromptTemplate:
     # Use subject_description if available, otherwise fall back to content
     post_description = post.subject_description if post.subject_description else post.content
     
@@ -41,8 +39,10 @@ def find_topic_for_post(post: Post, topics: List[Topic]) -> Topic:
         post_description=post_description, 
         topics=topics_list
     )
-    response = llm_client.generate_response(AzerionPromptTemplate(prompt=prompt))
-    
+    return AzerionPromptTemplate(prompt=prompt)
+
+
+def _match_topic(response: str, topics: List[Topic]) -> Topic:
     # Clean up response (remove whitespace, quotes, etc.)
     response = response.strip().strip('"').strip("'")
     
@@ -59,4 +59,17 @@ def find_topic_for_post(post: Post, topics: List[Topic]) -> Topic:
     
     # If no match, return "Other" topic
     print(f"  ⚠️  No match for '{response}', using 'Other' topic")
-    return db.get_topic_by_name("Other")
\ No newline at end of file
+    return db.get_topic_by_name("Other")
+
+
+# Use prompt for this one
+def find_topic_for_post(post: Post, topics: List[Topic]) -> Topic:
+    llm_client = LlmClient()
+    response = llm_client.generate_response(_build_find_topic_prompt(post, topics))
+    return _match_topic(response, topics)
+
+
+async def find_topic_for_post_async(post: Post, topics: List[Topic]) -> Topic:
+    llm_client = AsyncLlmClient()
+    response = await llm_client.generate_response(_build_find_topic_prompt(post, topics))
+    return _match_topic(response, topics)
@@ -48,7 +48,7 @@ def process_csv_data(csv_file: str):
         print(f"Event small summary: {event.small_summary}")
         print(f"Event big summary: {event.big_summary}")
         print(f"Event date: {event.date}")
-        print(f"Event topic: {event.get_event_topic()}")
+        print(f"Event topic: {db.get_event_topic_name(event)}")
         print(f"Event posts: {[p.link for p in event.posts] if event.posts else []}")
         print("-" * 70)
     print(f"\n✓ Successfully processed posts!")
@@ -3,103 +3,141 @@ Generate database from CSV files and save to JSON
 This script processes all CSV files, enriches them with LLM data,
 and saves the resulting database to a JSON file.
 """
+import argparse
 import json
-import csv
 import os
+import threading
 from datetime import datetime
+import numpy as np
 from llm.LlmClient import LlmClient
-from models.Post import Post
 from Services.EventAssigningService import EventAssigningService
+from Services.EventEnrichmentQueue import EventEnrichmentQueue
+from Services.EventProcessingService import EventProcessingService
+from Services.IngestionPipeline import IngestionPipeline
 from database import db
+from database.segmented_json import SegmentedJsonStore
+from database.snapshot import SnapshotReader, SnapshotWriter
 
 
 # CONFIGURATION: Control how many posts to process
 RIJSWIJK_FEED_LIMIT = 10  # Number of posts to process from rijswijk_feed_news.csv (None = all)
 NUM_SNAPSHOT_FILES = 5    # Number of snapshot files to process (0-24)
+SNAPSHOT_ROW_LIMIT = 10   # Number of posts to process from each snapshot file (None = all)
+
+# CONFIGURATION: Ingestion pipeline
+ENRICHMENT_WORKERS = 4     # Threads enriching posts in parallel
+PIPELINE_MAX_PENDING = 32  # Rows read but not yet written; the reader waits when this many are in flight
+
+# CONFIGURATION: Background re-enrichment of events that receive new posts
+ENRICHMENT_QUEUE_WINDOW = 2.0      # Seconds without new posts before an event is regenerated (None = synchronous)
+ENRICHMENT_QUEUE_MAX_DELAY = 10.0  # Seconds after which a busy event is regenerated anyway
+ENRICHMENT_QUEUE_WORKERS = 2       # Threads regenerating events
+
+# CONFIGURATION: Checkpointing (run with --resume to continue from the last checkpoint)
+CHECKPOINT_FILE = "db_checkpoint.json"
+CHECKPOINT_EVERY = 25      # Rows written between checkpoints (None = no checkpoints)
+
+# CONFIGURATION: Incremental JSON saves (only segments with a changed entity are serialized again)
+JSON_SEGMENT_SIZE = 256    # Posts, events or topics per segment
+
+# CONFIGURATION: The database JSON, saved incrementally by the API (overwrite endpoint, log compaction)
+DATABASE_FILE = "db_generated.json"
+
+# CONFIGURATION: Binary snapshot written next to the JSON (loaded by the API when it is the newer file)
+SNAPSHOT_FILE = "db_generated.snapshot"
+SNAPSHOT_EMBEDDING_DTYPE = "float32"  # "float16" halves the embedding file at a small precision cost
+
+# CONFIGURATION: Write-ahead log the API records mutations in between snapshots
+WAL_DIRECTORY = "db_wal"
+WAL_FLUSH_INTERVAL = 0.05           # Seconds mutations are batched for before one fsync
+WAL_COMPACT_AFTER_BYTES = 16 << 20  # Logged bytes after which SNAPSHOT_FILE is rewritten and the log truncated
+
+# Held while saving the database, so saves that checkpoint the write-ahead log (a compaction and
+# an API request, or two requests) run one at a time and the file on disk is always the newest
+_save_lock = threading.RLock()
 
 # Custom JSON encoder to handle datetime objects
 class DateTimeEncoder(json.JSONEncoder):
     def default(self, obj):
         if isinstance(obj, datetime):
             return obj.isoformat()
+        # Keyword embeddings loaded from a snapshot are numpy rows
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+        if isinstance(obj, np.generic):
+            return obj.item()
         return super().default(obj)
 
 
-def process_csv_row(row, llm_client, event_assigning_service):
+def parse_csv_row(row):
     """
-    Process a single CSV row and create a Post object
+    Parse a single CSV row into the fields needed to create a Post
     
-    Returns: True if processed successfully, False otherwise
+    Returns: dict with link, content, date, source and total_engagement, or None for a malformed row
     """
     if len(row) < 3:
-        return False
+        return None
     
-    try:
-        # Extract basic fields
-        link = row[0] if row[0] else "No link"
-        content = row[1] if len(row) > 1 else ""
-        date_str = row[2] if len(row) > 2 else datetime.now().isoformat()
-        
-        # Parse comments and likes based on CSV structure
-        # The CSV has: link, message, date_iso8601, comments_json, likes
-        # But comments_json may contain commas, so we need to find where it ends
-        
-        comment_count = 0
-        likes = 0
-        
-        if len(row) > 3 and row[3]:
-            try:
-                comments = json.loads(row[3])
-            except:
-                comments = []
-            comment_count = len(comments) if isinstance(comments, list) else 0
-        if len(row) > 4 and row[4]:
-            try:
-                likes = int(row[4])
-            except:
-                likes = 0
-        
-        total_engagement = likes + comment_count
-        
-        print(f"Parsed - Link: {link[:50]}... | Comments: {comment_count} | Likes: {likes} | Total: {total_engagement}")
-
-        # Parse date
+    # Extract basic fields
+    link = row[0] if row[0] else "No link"
+    content = row[1] if len(row) > 1 else ""
+    date_str = row[2] if len(row) > 2 else datetime.now().isoformat()
+    
+    # Parse comments and likes based on CSV structure
+    # The CSV has: link, message, date_iso8601, comments_json, likes
+    # But comments_json may contain commas, so we need to find where it ends
+    
+    comment_count = 0
+    likes = 0
+    
+    if len(row) > 3 and row[3]:
         try:
-            post_date = datetime.fromisoformat(date_str.replace('+01:00', ''))
+            comments = json.loads(row[3])
         except:
-            post_date = datetime.now()
-
-        # Determine source from link
-        if 'feelgoodradio' in link:
-            source = "Feelgood Radio - Nieuws"
-        elif 'inrijswijk.com' in link:
-            source = "InRijswijk.com"
-        elif 'ad.nl' in link:
-            source = "AD - Algemeen Dagblad"
-        else:
-            source = "Unknown Source"
-
-        # Use LLM enrichment to generate sentiment, actionables, and topics
-        post = Post.create_with_enrichment(
-            link=link,
-            content=content,
-            date=post_date,
-            source=source,
-            total_engagement=total_engagement
-        )
-        if db.add_post(post):
-            event_assigning_service.assign_posts_to_events(post)
-        return True
-        
-    except Exception as e:
-        print(f"Error processing row: {e}")
-        return False
+            comments = []
+        comment_count = len(comments) if isinstance(comments, list) else 0
+    if len(row) > 4 and row[4]:
+        try:
+            likes = int(row[4])
+        except:
+            likes = 0
+    
+    total_engagement = likes + comment_count
+    
+    print(f"Parsed - Link: {link[:50]}... | Comments: {comment_count} | Likes: {likes} | Total: {total_engagement}")
+
+    # Parse date
+    try:
+        post_date = datetime.fromisoformat(date_str.replace('+01:00', ''))
+    except:
+        post_date = datetime.now()
+
+    # Determine source from link
+    if 'feelgoodradio' in link:
+        source = "Feelgood Radio - Nieuws"
+    elif 'inrijswijk.com' in link:
+        source = "InRijswijk.com"
+    elif 'ad.nl' in link:
+        source = "AD - Algemeen Dagblad"
+    else:
+        source = "Unknown Source"
+
+    return {
+        "link": link,
+        "content": content,
+        "date": post_date,
+        "source": source,
+        "total_engagement": total_engagement
+    }
 
 
-def process_csv_files(llm_client):
+def process_csv_files(llm_client, resume_from: dict = None):
     """
     Process rijswijk_feed_news.csv first, then snapshot files from csv_timestamps/
-    and convert rows to Post objects in the database
+    and convert rows to Post objects in the database.
+    Rows are enriched by ENRICHMENT_WORKERS threads and assigned to events in file order.
+    The database and the CSV cursor are checkpointed every CHECKPOINT_EVERY rows;
+    resume_from is a checkpointed cursor to continue after.
     
     Returns: number of posts processed
     """
@@ -107,115 +145,96 @@ def process_csv_files(llm_client):
     print("PROCESSING CSV FILES")
     print("=" * 70)
     
-    event_assigning_service = EventAssigningService(llm_client)
-    
-    # First, process rijswijk_feed_news.csv from the project root
-    rijswijk_file = "rijswijk_feed_news.csv"
-    limit_msg = f" (limit: {RIJSWIJK_FEED_LIMIT})" if RIJSWIJK_FEED_LIMIT else " (no limit)"
-    print(f"\n[1] Processing {rijswijk_file}{limit_msg}...")
+    enrichment_queue = None
+    if ENRICHMENT_QUEUE_WINDOW is not None:
+        enrichment_queue = EventEnrichmentQueue(
+            window=ENRICHMENT_QUEUE_WINDOW,
+            max_delay=ENRICHMENT_QUEUE_MAX_DELAY,
+            workers=ENRICHMENT_QUEUE_WORKERS
+        )
+    event_assigning_service = EventAssigningService(llm_client, enrichment_queue)
+    pipeline = IngestionPipeline(
+        event_assigning_service,
+        parse_csv_row,
+        workers=ENRICHMENT_WORKERS,
+        max_pending=PIPELINE_MAX_PENDING
+    )
     
-    if os.path.exists(rijswijk_file):
-        with open(rijswijk_file, 'r', encoding='utf-8') as file:
-            reader = csv.reader(file)
-            next(reader)  # Skip header
-            
-            row_count = 0
-            for row in reader:
-                # Check if we've reached the limit
-                if RIJSWIJK_FEED_LIMIT is not None and row_count >= RIJSWIJK_FEED_LIMIT:
-                    break
-                
-                if process_csv_row(row, llm_client, event_assigning_service):
-                    row_count += 1
-            
-            print(f"Processed {row_count} posts from {rijswijk_file}")
-    else:
-        print(f"Warning: File '{rijswijk_file}' not found, skipping...")
+    written = 0
+    def checkpoint(item):
+        nonlocal written
+        written += 1
+        if CHECKPOINT_EVERY and written % CHECKPOINT_EVERY == 0:
+            # Dirty events are not marked as such in the checkpoint, so they are regenerated first
+            if enrichment_queue is not None:
+                print(f"Flushing {enrichment_queue.pending()} pending event regenerations before checkpoint")
+                enrichment_queue.flush()
+            save_database_to_json(CHECKPOINT_FILE, extra_metadata={"cursor": pipeline.cursor})
+    pipeline.on_written = checkpoint
     
-    # Then process snapshot CSV files from csv_timestamps directory
+    # First rijswijk_feed_news.csv from the project root, then the snapshot files from csv_timestamps/
+    rijswijk_file = "rijswijk_feed_news.csv"
     csv_directory = "csv_timestamps"
-    csv_files = [f"snapshot_{i:02d}.csv" for i in range(NUM_SNAPSHOT_FILES)]
+    sources = [(rijswijk_file, RIJSWIJK_FEED_LIMIT)]
+    sources += [(os.path.join(csv_directory, f"snapshot_{i:02d}.csv"), SNAPSHOT_ROW_LIMIT)
+                for i in range(NUM_SNAPSHOT_FILES)]
     
-    print(f"\n[2] Processing {len(csv_files)} snapshot files from {csv_directory}/")
+    limit_msg = f" (limit: {RIJSWIJK_FEED_LIMIT})" if RIJSWIJK_FEED_LIMIT else " (no limit)"
+    print(f"\n[1] Processing {rijswijk_file}{limit_msg}")
+    print(f"[2] Processing {NUM_SNAPSHOT_FILES} snapshot files from {csv_directory}/")
+    print(f"Using {ENRICHMENT_WORKERS} enrichment workers")
+    if resume_from:
+        print(f"Resuming after row {resume_from['row_number']} of {resume_from['source_file']}")
     
-    for i, csv_filename in enumerate(csv_files):
-        print(f"\n[{i+1}/{len(csv_files)}] Processing {csv_filename}...")
-        csv_path = os.path.join(csv_directory, csv_filename)
-        
-        if not os.path.exists(csv_path):
-            print(f"Warning: File '{csv_path}' not found, skipping...")
-            continue
-            
-        with open(csv_path, 'r', encoding='utf-8') as file:
-            reader = csv.reader(file)
-            next(reader)
-
-            needed_posts = 10
-
-            for row in reader:
-                if needed_posts <= 0:
-                    break
-                
-                if process_csv_row(row, llm_client, event_assigning_service):
-                    needed_posts -= 1
+    counts = pipeline.run(sources, resume_from=resume_from)
+    if enrichment_queue is not None:
+        print(f"Waiting for {enrichment_queue.pending()} pending event regenerations...")
+        enrichment_queue.close()
+        stats = enrichment_queue.stats()
+        print(f"Event regenerations: {stats['regenerations']} for {stats['coalesced_posts']} added posts")
+    for source_file, _ in sources:
+        print(f"Processed {counts.get(source_file, 0)} posts from {source_file}")
     
     print("\n" + "=" * 70)
     print("COMPLETED PROCESSING ALL FILES")
     print("=" * 70)
+    return sum(counts.values())
 
 
-def save_database_to_json(filename: str = None):
-    """Save the entire database to a JSON file"""
+def save_database_to_json(filename: str = None, extra_metadata: dict = None):
+    """
+    Save the entire database to a JSON file.
+    Only the segments holding posts, events or topics changed since the previous save to the same
+    file are serialized again (see database/segmented_json.py). The file is written next to the
+    target and swapped in, so a crash never leaves a truncated file.
+    Saving DATABASE_FILE while a write-ahead log is attached also compacts the log.
+    """
     if filename is None:
-        filename = "db_generated.json"
+        filename = DATABASE_FILE
     
     print("\n" + "=" * 70)
     print("SAVING DATABASE TO JSON")
     print("=" * 70)
     
     try:
-        # Get all data from database
-        all_posts = db.get_all_posts()
-        all_events = db.get_all_events()
-        all_topics = db.get_all_topics()
-        
-        print(f"\nCollecting data:")
-        print(f"  - Posts: {len(all_posts)}")
-        print(f"  - Events: {len(all_events)}")
-        print(f"  - Topics: {len(all_topics)}")
-        
-        # Serialize using automatic to_dict() with custom encoders
-        print("\nSerializing posts...")
-        posts_data = [post.to_dict() for post in all_posts]
-        
-        print("Serializing events...")
-        events_data = [event.to_dict() for event in all_events]
-        
-        print("Serializing topics...")
-        topics_data = [topic.to_dict() for topic in all_topics]
-        
-        db_data = {
-            "posts": posts_data,
-            "events": events_data,
-            "topics": topics_data,
-            "metadata": {
-                "generated_at": datetime.now().isoformat(),
-                "total_posts": len(all_posts),
-                "total_events": len(all_events),
-                "total_topics": len(all_topics)
-            }
-        }
-        
-        # Save to file with custom datetime encoder
         print(f"\nWriting to file: {filename}")
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(db_data, f, indent=2, ensure_ascii=False, cls=DateTimeEncoder)
+        with _save_lock:
+            compact_wal = db.wal is not None and os.path.abspath(filename) == os.path.abspath(DATABASE_FILE)
+            store = SegmentedJsonStore(filename, segment_size=JSON_SEGMENT_SIZE, encoder=DateTimeEncoder)
+            saved = store.save(db, extra_metadata, checkpoint_wal=compact_wal)
+            
+            # The event vector index lives next to the JSON so startup can skip re-embedding
+            db.save_vector_index(db.vector_index_path(filename))
+            if compact_wal:
+                # Under the save lock the file on disk is the one just written
+                release_write_ahead_log(saved)
         
         print(f"\n✅ SUCCESS! Database saved to: {filename}")
         print(f"\nStats:")
-        print(f"  - Total Posts: {len(all_posts)}")
-        print(f"  - Total Events: {len(all_events)}")
-        print(f"  - Total Topics: {len(all_topics)}")
+        print(f"  - Total Posts: {saved['total_posts']}")
+        print(f"  - Total Events: {saved['total_events']}")
+        print(f"  - Total Topics: {saved['total_topics']}")
+        print(f"  - Segments rewritten: {saved['rewritten']} of {saved['segments']}")
         print("=" * 70 + "\n")
         
         return filename
@@ -226,8 +245,87 @@ def save_database_to_json(filename: str = None):
         raise
 
 
+def save_database_snapshot(filename: str = None, extra_metadata: dict = None, dtype: str = None):
+    """
+    Save the entire database as a binary snapshot (see database/snapshot.py).
+    Like the JSON save, the files are written under temporary names and swapped in.
+    Saving SNAPSHOT_FILE while a write-ahead log is attached also compacts the log.
+    """
+    if filename is None:
+        filename = SNAPSHOT_FILE
+    
+    print("\n" + "=" * 70)
+    print("SAVING DATABASE SNAPSHOT")
+    print("=" * 70)
+    
+    try:
+        with _save_lock:
+            compact_wal = db.wal is not None and os.path.abspath(filename) == os.path.abspath(SNAPSHOT_FILE)
+            exported = db.export(checkpoint_wal=compact_wal)
+            
+            print(f"\nWriting to file: {filename}")
+            with SnapshotWriter(filename, dtype=dtype or SNAPSHOT_EMBEDDING_DTYPE) as writer:
+                for kind in ("posts", "events", "topics"):
+                    for record in exported[kind]:
+                        writer.write(kind, record)
+                writer.close({
+                    "generated_at": datetime.now().isoformat(),
+                    "total_posts": len(exported["posts"]),
+                    "total_events": len(exported["events"]),
+                    "total_topics": len(exported["topics"]),
+                    # The write-ahead log records this snapshot already includes
+                    **(exported["wal"] or {}),
+                    **(extra_metadata or {})
+                })
+            
+            db.save_vector_index(db.vector_index_path(filename))
+            if exported["wal"]:
+                with SnapshotReader(filename) as reader:
+                    release_write_ahead_log(reader.metadata)
+        
+        print(f"\n✅ SUCCESS! Database snapshot saved to: {filename}")
+        print(f"  - Posts: {len(exported['posts'])}, Events: {len(exported['events'])}, Topics: {len(exported['topics'])}")
+        print("=" * 70 + "\n")
+        
+        return filename
+        
+    except Exception as e:
+        print(f"\n❌ ERROR saving database snapshot: {e}")
+        print("=" * 70 + "\n")
+        raise
+
+
+def release_write_ahead_log(metadata: dict):
+    """Delete the write-ahead log segments that the database file saved with this metadata includes"""
+    if db.wal is not None and metadata.get("wal_id") == db.wal.wal_id and metadata.get("wal_sequence") is not None:
+        db.wal.release(metadata["wal_sequence"])
+
+
+def load_checkpoint(llm_client):
+    """Load the checkpointed database and return the CSV cursor to resume from, or None"""
+    if not os.path.exists(CHECKPOINT_FILE):
+        print(f"No checkpoint found at {CHECKPOINT_FILE}, starting from the beginning")
+        return None
+    
+    service = EventProcessingService(llm_client)
+    loaded = service.load_database_from_json(CHECKPOINT_FILE)
+    return loaded["metadata"].get("cursor")
+
+
+def remove_checkpoint():
+    for path in (CHECKPOINT_FILE, db.vector_index_path(CHECKPOINT_FILE)):
+        if os.path.exists(path):
+            os.remove(path)
+    SegmentedJsonStore(CHECKPOINT_FILE, segment_size=JSON_SEGMENT_SIZE).remove(db)
+
+
 def main():
     """Main function to generate and save database"""
+    parser = argparse.ArgumentParser(description="Generate the database from the CSV files")
+    parser.add_argument("--resume", action="store_true",
+                        help=f"continue from the last checkpoint ({CHECKPOINT_FILE}) instead of starting over")
+    args = parser.parse_args()
+    
     print("\n" + "=" * 70)
     print("DATABASE GENERATION SCRIPT")
     print("=" * 70)
@@ -239,23 +337,37 @@ def main():
         print("\nConfiguration:")
         print(f"  - Rijswijk Feed Limit: {RIJSWIJK_FEED_LIMIT if RIJSWIJK_FEED_LIMIT else 'All posts'}")
         print(f"  - Snapshot Files: {NUM_SNAPSHOT_FILES}")
+        print(f"  - Enrichment Workers: {ENRICHMENT_WORKERS}")
         llm_client = LlmClient()
         
+        resume_from = None
+        if args.resume:
+            print("\n[Step 0] Loading checkpoint...")
+            resume_from = load_checkpoint(llm_client)
+        
         # Process CSV files
         print("\n[Step 1] Processing CSV files...")
-        process_csv_files(llm_client)
+        process_csv_files(llm_client, resume_from=resume_from)
         
         # Save to JSON
         print("\n[Step 2] Saving database to JSON...")
         filename = save_database_to_json()
+        save_database_snapshot()
+        remove_checkpoint()
         
         print("\n" + "=" * 70)
         print("🎉 COMPLETE! Database generation finished successfully")
         print(f"Generated file: {filename}")
+        cache = LlmClient.get_response_cache()
+        if cache:
+            stats = cache.stats()
+            print(f"LLM cache: {stats['hits']} hits, {stats['misses']} misses, {stats['entries']} entries")
         print("=" * 70 + "\n")
         
     except KeyboardInterrupt:
         print("\n\n⚠️  Process interrupted by user")
+        if CHECKPOINT_EVERY and os.path.exists(CHECKPOINT_FILE):
+            print(f"Run with --resume to continue from the last checkpoint ({CHECKPOINT_FILE})")
         print("=" * 70 + "\n")
     except Exception as e:
         print(f"\n\n❌ FATAL ERROR: {e}")
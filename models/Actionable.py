@@ -5,8 +5,10 @@ from llm.AzerionPromptTemplate import AzerionPromptTemplate
 from llm.LlmClient import LlmClient
 from llm.PromptTemplates.Prompts import actionable_proposed_answer_prompt, actionable_is_question_prompt
 from llm.PromptTemplates.BelastingdienstData import _belastingdienst_data
+from models.codecs import fast_codec
 
 
+@fast_codec
 @dataclass_json
 @dataclass
 class Actionable:
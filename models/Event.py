@@ -1,16 +1,28 @@
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import List, Optional
+from typing import TYPE_CHECKING, List, Optional
+
+import numpy as np
 from dataclasses_json import dataclass_json, config
 
 from llm.AzerionPromptTemplate import AzerionPromptTemplate
+from llm.KeywordEmbeddingMatrix import KeywordEmbeddingMatrix
 from llm.LlmClient import LlmClient
+from llm.LlmExecutor import LlmExecutor
+from llm.MapReduceSummarizer import MapReduceSummarizer
 from llm.PromptTemplates.Prompts import event_name_prompt, event_keywords_prompt, event_big_summary_prompt, \
-    event_small_summary_prompt
+    event_small_summary_prompt, event_keywords_update_prompt, event_summary_update_prompt, \
+    event_case_description_update_prompt
 from llm.SemanticSimilarityService import SemanticSimilarityService
+from models.codecs import fast_codec
 from models.Keyword import Keyword
 from models.Post import Post
 
+if TYPE_CHECKING:
+    # Type-only: the database package and models.Topic import this module
+    from database.vector_index import VectorIndex
+    from models.Topic import Topic
+
 # the date of an event is the date of the latest post (biggest post date)
 # event_id: int,
 # name: str,
@@ -20,11 +32,22 @@ from models.Post import Post
 # similar_events=None,
 # keywords: List[Keyword] = None,
 
+@fast_codec
 @dataclass_json
 @dataclass
 class Event:
     _minimum_event_similarity_threshold = 0.7
     _minimum_words_in_common = 2
+    # Packed keyword embeddings of the events last compared against, shared by all events
+    _keyword_matrix = KeywordEmbeddingMatrix()
+    # The keyword index holds float32 vectors; pairs this close to the threshold are recomputed
+    _keyword_index_tolerance = 1e-5
+    # add_post folds the new post into the existing keywords and summaries. Everything is rebuilt
+    # from all posts every _full_rebuild_every posts, or when more than _max_keyword_churn of the
+    # keywords were replaced by an update (the event drifted away from what was summarized).
+    _incremental_updates = True
+    _full_rebuild_every = 5
+    _max_keyword_churn = 0.5
 
     event_id: Optional[int] = None
     name: Optional[str] = None
@@ -47,22 +70,32 @@ class Event:
         encoder=lambda dt: dt.isoformat() if dt else None,
         decoder=lambda s: datetime.fromisoformat(s) if s else None
     ))
+    # L2-normalized embedding of matching_text(), together with the text it was computed from.
+    # Not serialized; recomputed lazily whenever the description changes.
+    description_embedding: Optional[np.ndarray] = field(default=None, repr=False, compare=False,
+                                                        metadata=config(exclude=lambda x: True))
+    description_embedding_text: Optional[str] = field(default=None, repr=False, compare=False,
+                                                      metadata=config(exclude=lambda x: True))
 
     @classmethod
-    def create_with_enrichment(cls, posts: List[Post] = None, other_events: List['Event'] = None) -> 'Event':
+    def create_with_enrichment(cls, posts: List[Post] = None, other_events: List['Event'] = None,
+                               keyword_index: 'VectorIndex' = None) -> 'Event':
         """Factory method to create an Event with LLM enrichment"""
         if other_events is None:
             other_events = []
         
         llm_client = LlmClient()
         
-        # Generate LLM data
-        name = cls._extract_name_from_posts(posts, llm_client)
-        (small_summary, big_summary) = cls._generate_summaries(posts, llm_client)
-        keywords = cls._extract_keywords(posts, llm_client)
-        similar_events = cls._find_similar_events_static(keywords, other_events, llm_client)
+        # Generate LLM data; only the similar events depend on another result (the keywords)
+        (name, small_summary, big_summary, keywords, case_description) = LlmExecutor.run_concurrently(
+            lambda: cls._extract_name_from_posts(posts, llm_client),
+            lambda: cls._generate_small_summary(posts, llm_client),
+            lambda: cls._generate_large_summary(posts, llm_client),
+            lambda: cls._extract_keywords(posts, llm_client),
+            lambda: cls._generate_case_description_static(posts, llm_client)
+        )
+        similar_events = cls._find_similar_events_static(keywords, other_events, llm_client, keyword_index)
         date = cls._find_most_recent_post_date(posts)
-        case_description = cls._generate_case_description_static(posts, llm_client)
         
         return cls(
             posts=posts,
@@ -79,22 +112,91 @@ class Event:
     def __repr__(self):
         return f"Event(event_id={self.event_id}, name={self.name}, small_summary={self.small_summary}, big_summary={self.big_summary}, posts={self.posts}, similar_events={self.similar_events}, keywords={self.keywords})"
 
-# add the post to posts and regenerate everything
-    def add_post(self, post: Post, other_events: List['Event'] = None):
+# add the post to posts and update everything
+    def add_post(self, post: Post, other_events: List['Event'] = None, keyword_index: 'VectorIndex' = None):
+        self.attach_post(post)
+        self.refresh_enrichment([post], other_events, keyword_index)
+
+    def attach_post(self, post: Post):
+        """Add the post without touching the LLM-generated fields; refresh_enrichment updates those"""
+        self.posts = (self.posts or []) + [post]
+        self.date = Event._find_most_recent_post_date(self.posts)
+
+    def refresh_enrichment(self, new_posts: List[Post], other_events: List['Event'] = None,
+                           keyword_index: 'VectorIndex' = None, posts: List[Post] = None):
+        """
+        Bring the LLM-generated fields up to date after new_posts were attached. posts is the
+        event's posts up to and including new_posts (self.posts by default), for callers that
+        keep attaching posts while this runs.
+        """
         if other_events is None:
             other_events = []
+        if posts is None:
+            posts = self.posts
         
         llm_client = LlmClient()
-        self.posts = (self.posts or []) + [post]
+        previous_count = len(posts) - len(new_posts)
+        rebuild_due = len(posts) // self._full_rebuild_every > previous_count // self._full_rebuild_every
+        if not (self._incremental_updates and not rebuild_due and self._update_incrementally(new_posts, llm_client)):
+            self._rebuild_enrichment(llm_client, posts)
+        
+        self.similar_events = Event._find_similar_events_static(self.keywords, other_events, llm_client, keyword_index)
+
+    def _rebuild_enrichment(self, llm_client: LlmClient, posts: List[Post]):
+        """Regenerate keywords, summaries and case description from all posts"""
+        previous_keywords = self.keywords
+        (self.keywords, self.small_summary, self.big_summary, self.case_description) = LlmExecutor.run_concurrently(
+            lambda: Event._extract_keywords(posts, llm_client, previous_keywords),
+            lambda: Event._generate_small_summary(posts, llm_client),
+            lambda: Event._generate_large_summary(posts, llm_client),
+            lambda: Event._generate_case_description_static(posts, llm_client)
+        )
 
-        self.keywords = Event._extract_keywords(self.posts, llm_client)
-        (self.small_summary, self.big_summary) = Event._generate_summaries(self.posts, llm_client)
-        self.similar_events = Event._find_similar_events_static(self.keywords, other_events, llm_client)
-        self.date = Event._find_most_recent_post_date(self.posts)
-        self.case_description = Event._generate_case_description_static(self.posts, llm_client)
+    def _update_incrementally(self, new_posts: List[Post], llm_client: LlmClient) -> bool:
+        """
+        Fold the new posts into the current keywords, summaries and case description.
+        Returns False, leaving the event unchanged, if an update failed or the keywords drifted.
+        """
+        if not (self.keywords and self.small_summary and self.big_summary and self.case_description):
+            return False
+        new_content = ' '.join(post.content for post in new_posts)
+        
+        keyword_names, small_summary, big_summary, case_description = LlmExecutor.run_concurrently(
+            lambda: llm_client.generate_response(AzerionPromptTemplate(prompt=event_keywords_update_prompt.format(
+                previous_keywords=', '.join(kw.keyword for kw in self.keywords), new_post=new_content))),
+            lambda: llm_client.generate_response(AzerionPromptTemplate(prompt=event_summary_update_prompt.format(
+                previous_summary=self.small_summary, new_post=new_content))),
+            lambda: llm_client.generate_response(AzerionPromptTemplate(prompt=event_summary_update_prompt.format(
+                previous_summary=self.big_summary, new_post=new_content))),
+            lambda: llm_client.generate_response(AzerionPromptTemplate(prompt=event_case_description_update_prompt.format(
+                previous_description=self.case_description, new_post=new_content)))
+        )
+        if any(LlmClient.is_failed_response(response)
+               for response in (keyword_names, small_summary, big_summary, case_description)):
+            return False
+        
+        keyword_names = Event._parse_keywords(keyword_names)
+        previous_names = {kw.keyword.lower() for kw in self.keywords}
+        kept = len({name.lower() for name in keyword_names} & previous_names)
+        churn = 1 - kept / len(previous_names)
+        if not keyword_names or churn > self._max_keyword_churn:
+            print(f"  Event '{self.name}' drifted ({churn:.0%} of its keywords changed), rebuilding")
+            return False
+        
+        self.keywords = Event._keywords_with_embeddings(keyword_names, llm_client, self.keywords)
+        self.small_summary = small_summary
+        self.big_summary = big_summary
+        self.case_description = case_description.strip()
+        return True
+
+    def get_event_topic(self, filed_topic: Optional['Topic'] = None) -> str:
+        """
+        Returns the topic name (string) of this event: the topic it is filed under (as resolved by
+        InMemoryDB.get_event_topic_name), or, for an event not filed yet, the topic of its first post
+        """
+        if filed_topic is not None:
+            return filed_topic.name
         
-    def get_event_topic(self) -> str:
-        """Returns the topic name (string) of this event based on its first post"""
         if not self.posts:
             return None
         
@@ -108,6 +210,29 @@ class Event:
         else:
             return str(topic)  # It's already a string
 
+    def matching_text(self) -> Optional[str]:
+        """Text used to match posts and queries against this event"""
+        return self.case_description if self.case_description else self.small_summary
+
+    def has_fresh_description_embedding(self) -> bool:
+        return self.description_embedding is not None and self.description_embedding_text == self.matching_text()
+
+    def set_description_embedding(self, embedding):
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        self.description_embedding = vector / norm if norm > 0 else vector
+        self.description_embedding_text = self.matching_text()
+
+    @staticmethod
+    def refresh_description_embeddings(events: List['Event'], embedding_service: SemanticSimilarityService):
+        """Embed, in one batched call, the descriptions of events whose cached embedding is stale"""
+        stale = [event for event in events if event.matching_text() and not event.has_fresh_description_embedding()]
+        if not stale:
+            return
+        embeddings = embedding_service.embed_many([event.matching_text() for event in stale])
+        for event, embedding in zip(stale, embeddings):
+            event.set_description_embedding(embedding)
+
     @staticmethod
     def _find_most_recent_post_date(posts: List[Post]) -> datetime:
         if not posts:
@@ -125,38 +250,48 @@ class Event:
         return name
 
     @staticmethod
-    def _extract_keywords(posts: List[Post], llm_client: LlmClient) -> List[Keyword]:
+    def _extract_keywords(posts: List[Post], llm_client: LlmClient, previous: List[Keyword] = None) -> List[Keyword]:
         if not posts:
             return []
         
         total_context = ' '.join(post.content for post in posts)
         keywords_find_prompt = event_keywords_prompt.format(event_posts=total_context)
         keywords = llm_client.generate_response(AzerionPromptTemplate(prompt=keywords_find_prompt))
-        kw_list = keywords.split(',')
+        return Event._keywords_with_embeddings(Event._parse_keywords(keywords), llm_client, previous)
 
-        kws = []
-        embedding_service = SemanticSimilarityService(llm_client)
-        for kw in kw_list:
-            # Clean each keyword to remove quotes and extra whitespace
-            cleaned_kw = LlmClient.clean_response(kw)
-            if cleaned_kw:  # Only add non-empty keywords
-                embedding = embedding_service.embed(cleaned_kw)
-                kws.append(Keyword(cleaned_kw, embedding))
+    @staticmethod
+    def _parse_keywords(response: str) -> List[str]:
+        # Clean each keyword to remove quotes and extra whitespace, only keep non-empty ones
+        cleaned_kws = [LlmClient.clean_response(kw) for kw in response.split(',')]
+        return [kw for kw in cleaned_kws if kw]
 
-        return kws
+    @staticmethod
+    def _keywords_with_embeddings(names: List[str], llm_client: LlmClient, previous: List[Keyword] = None) -> List[Keyword]:
+        """Build Keywords for these names, reusing the embeddings of previous keywords with the same text"""
+        if not names:
+            return []
+        known = {kw.keyword: kw for kw in previous or [] if kw.emb is not None and len(kw.emb)}
+        missing = list(dict.fromkeys(name for name in names if name not in known))
+        if missing:
+            embedding_service = SemanticSimilarityService(llm_client)
+            for name, embedding in zip(missing, embedding_service.embed_many(missing)):
+                known[name] = Keyword(name, embedding.tolist())
+        return [known[name] for name in names]
 
     @staticmethod
     def _generate_summaries(posts: List[Post], llm_client: LlmClient):
-        small = Event._generate_small_summary(posts, llm_client)
-        large = Event._generate_large_summary(posts, llm_client)
-        return small, large
+        return tuple(LlmExecutor.run_concurrently(
+            lambda: Event._generate_small_summary(posts, llm_client),
+            lambda: Event._generate_large_summary(posts, llm_client)
+        ))
 
     @staticmethod
     def _generate_small_summary(posts: List[Post], llm_client: LlmClient):
         if not posts:
             return "No summary available"
         
-        total_context = ' '.join(post.content for post in posts)
+        # Busy events are condensed chunk by chunk first so the prompt stays within budget
+        total_context = MapReduceSummarizer(llm_client).condense([post.content for post in posts])
         small_summary_find_prompt = event_small_summary_prompt.format(event_posts=total_context)
         small_summary = llm_client.generate_response(AzerionPromptTemplate(prompt=small_summary_find_prompt))
         return small_summary
@@ -166,7 +301,8 @@ class Event:
         if not posts:
             return "No summary available"
         
-        total_context = ' '.join(post.content for post in posts)
+        # Busy events are condensed chunk by chunk first so the prompt stays within budget
+        total_context = MapReduceSummarizer(llm_client).condense([post.content for post in posts])
         big_summary_find_prompt = event_big_summary_prompt.format(event_posts=total_context)
         big_summary = llm_client.generate_response(AzerionPromptTemplate(prompt=big_summary_find_prompt))
         return big_summary
@@ -228,12 +364,37 @@ Subject Description:"""
         return case_description.strip()
 
     @staticmethod
-    def _find_similar_events_static(keywords: List[Keyword], other_events: List['Event'], llm_client: LlmClient) -> List['Event']:
-        sim_events = []
-        for event in other_events:
-            if Event._events_are_similar_static(keywords, event, llm_client):
-                sim_events.append(event)
-        return sim_events
+    def _find_similar_events_static(keywords: List[Keyword], other_events: List['Event'], llm_client: LlmClient,
+                                    keyword_index: 'VectorIndex' = None) -> List['Event']:
+        if not keywords:
+            return []
+
+        threshold = Event._minimum_event_similarity_threshold
+        # Pairs close to the threshold are decided by the pairwise float64 cosine, as they always were
+        cosine = SemanticSimilarityService(llm_client).cosine_similarity
+
+        # With the database keyword index, each keyword is one radius query instead of a scan
+        if keyword_index is not None and len(keyword_index):
+            events_by_id = {event.event_id: event for event in other_events}
+            tolerance = Event._keyword_index_tolerance
+            kws_in_common = {}
+            for kw in keywords:
+                for (event_id, position), score in keyword_index.radius(kw.emb, threshold - tolerance):
+                    event = events_by_id.get(event_id)
+                    if event is None:
+                        continue
+                    if abs(score - threshold) <= tolerance and position < len(event.keywords or []):
+                        score = cosine(kw.emb, event.keywords[position].emb)
+                    if score > threshold:
+                        kws_in_common[event_id] = kws_in_common.get(event_id, 0) + 1
+            return [event for event in other_events
+                    if kws_in_common.get(event.event_id, 0) >= Event._minimum_words_in_common]
+
+        # All other events' keyword embeddings are scored in one blocked matrix product
+        counts = Event._keyword_matrix.match_counts(other_events, [kw.emb for kw in keywords], threshold, cosine)
+        similar = {id(event) for event, count in counts
+                   if count >= Event._minimum_words_in_common}
+        return [event for event in other_events if id(event) in similar]
 
     @staticmethod
     def _events_are_similar_static(keywords: List[Keyword], other_event: 'Event', llm_client: LlmClient) -> bool:
@@ -241,16 +402,17 @@ Subject Description:"""
         if not keywords or not other_event.keywords:
             return False
 
-        semantic_similarity_service = SemanticSimilarityService(llm_client)
-        kws_in_common = 0
+        keyword_embeddings = KeywordEmbeddingMatrix.normalize([kw.emb for kw in keywords])
+        other_embeddings = KeywordEmbeddingMatrix.normalize([kw.emb for kw in other_event.keywords])
+        if keyword_embeddings.shape[1] != other_embeddings.shape[1]:
+            raise ValueError("Embeddings must have the same dimension")
 
-        for kw1 in keywords:
-            for kw2 in other_event.keywords:
-                cosine_similarity = semantic_similarity_service.cosine_similarity(kw1.emb, kw2.emb)
-                if cosine_similarity > Event._minimum_event_similarity_threshold:
-                    kws_in_common += 1
-
-        return kws_in_common >= Event._minimum_words_in_common
+        cosine = SemanticSimilarityService(llm_client).cosine_similarity
+        hits = KeywordEmbeddingMatrix.above(
+            keyword_embeddings @ other_embeddings.T, Event._minimum_event_similarity_threshold,
+            lambda i, j: cosine(keywords[i].emb, other_event.keywords[j].emb)
+        )
+        return int(hits.sum()) >= Event._minimum_words_in_common
 
     # Instance method for checking similarity (uses self.keywords)
     def events_are_similar(self, other_event: 'Event', llm_client: LlmClient) -> bool:
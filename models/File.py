@@ -3,7 +3,6 @@ from io import BytesIO
 import PyPDF2
 import docx
 from PIL import Image
-import requests
 
 from llm.LlmClient import LlmClient
 import subprocess
@@ -123,11 +122,12 @@ class File:
             "stream": "false",}
 
         try:
-            response = requests.post(
+            response = LlmClient.get_session().post(
                 "https://api.azerion.ai/v1/audio/transcriptions",
                 headers=headers,
                 files=files,
                 data=data,
+                timeout=LlmClient.get_timeout(),
             )
 
             if response.status_code == 200:
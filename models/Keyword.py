@@ -1,11 +1,14 @@
 from dataclasses import dataclass
 from typing import List
 from dataclasses_json import dataclass_json
+from models.codecs import fast_codec
 
+@fast_codec
 @dataclass_json
 @dataclass
 class Keyword:
     keyword: str
+    # A list, or a read-only row of the embedding matrix when loaded from a snapshot
     emb: List[float]
 
     def __repr__(self):
@@ -1,15 +1,23 @@
+import json
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import List, Optional, Tuple
+from typing import TYPE_CHECKING, List, Optional, Tuple
 from dataclasses_json import dataclass_json, config
 
 from llm.AzerionPromptTemplate import AzerionPromptTemplate
 from llm.LlmClient import LlmClient
-from llm.PromptTemplates.Prompts import build_sentiment_prompt, event_find_actionable_exerpts_prompt
+from llm.LlmExecutor import LlmExecutor
+from llm.PromptTemplates.Prompts import build_sentiment_prompt, event_find_actionable_exerpts_prompt, \
+    post_enrichment_prompt
 from models.Actionable import Actionable
+from models.codecs import fast_codec
 from llm.PromptTemplates.BelastingdienstData import _belastingdienst_data
 
+if TYPE_CHECKING:
+    from models.Topic import Topic
 
+
+@fast_codec
 @dataclass_json
 @dataclass
 class Post:
@@ -41,6 +49,11 @@ class Post:
         )
     )
     total_engagement: int = 0
+
+    # One JSON-returning prompt for all post-level fields instead of one prompt per field
+    _use_combined_enrichment = True
+    # Most actionables kept per post
+    _max_actionables = 2
     
     @classmethod
     def create_with_enrichment(cls, link: str, content: str, date: datetime, source: str, total_engagement: int = 0) -> 'Post':
@@ -49,11 +62,25 @@ class Post:
         from database import db
         
         llm_client = LlmClient()
+        topics = db.get_all_topics()
+        
+        # Ask for every field in one structured call; whatever fails to parse is None
+        enrichment = {}
+        if cls._use_combined_enrichment:
+            enrichment = cls._generate_combined_enrichment(content, link, topics, llm_client)
         
-        # Get LLM-generated data
-        satisfaction_rating = cls._get_sentiment_score(content, llm_client)
-        actionables = cls._generate_actionables(content, link, llm_client)
-        subject_description = cls._generate_subject_description_static(content, llm_client)
+        # Fall back to the per-field prompts for whatever is missing; they are independent, so run them together
+        fallbacks = {
+            "sentiment": lambda: cls._get_sentiment_score(content, llm_client),
+            "actionables": lambda: cls._generate_actionables(content, link, llm_client),
+            "subject_description": lambda: cls._generate_subject_description_static(content, llm_client),
+        }
+        missing = [name for name in fallbacks if enrichment.get(name) is None]
+        results = dict(zip(missing, LlmExecutor.run_concurrently(*(fallbacks[name] for name in missing))))
+        
+        satisfaction_rating = results.get("sentiment", enrichment.get("sentiment"))
+        actionables = results.get("actionables", enrichment.get("actionables"))
+        subject_description = results.get("subject_description", enrichment.get("subject_description"))
         
         # Create post first (needed for find_topic_for_post)
         post = cls(
@@ -70,8 +97,7 @@ class Post:
         )
         
         # Find topic (needs the post object)
-        topics = db.get_all_topics()
-        post.topic = find_topic_for_post(post, topics)
+        post.topic = enrichment.get("topic") or find_topic_for_post(post, topics)
         
         return post
     
@@ -149,4 +175,93 @@ class Post:
                     content=cleaned_actionable
                 ))
 
-        return actionables_list[:2]
+        return actionables_list[:Post._max_actionables]
+
+    @staticmethod
+    def _generate_combined_enrichment(content: str, link: str, topics: List['Topic'], llm_client: LlmClient) -> dict:
+        """
+        Request sentiment, subject description, topic and actionables as one JSON object.
+        Returns the fields that passed validation; invalid or missing fields map to None.
+        """
+        topics_list = "\n".join([f"- {topic.name}: {topic.icon}" for topic in topics])
+        prompt = post_enrichment_prompt.format(
+            all_the_belastingdienst_data=_belastingdienst_data,
+            topics=topics_list,
+            post_data=content
+        )
+        response = llm_client.generate_response(AzerionPromptTemplate(prompt=prompt))
+        return Post._parse_combined_enrichment(response, link, topics, llm_client)
+
+    @staticmethod
+    def _parse_combined_enrichment(response: str, link: str, topics: List['Topic'], llm_client: LlmClient) -> dict:
+        fields = {"sentiment": None, "subject_description": None, "topic": None, "actionables": None}
+        
+        data = Post._extract_json_object(response)
+        if data is None:
+            print("  ⚠️  Combined enrichment returned no JSON object, using per-field prompts")
+            return fields
+        
+        sentiment = data.get("sentiment")
+        if isinstance(sentiment, (int, float)) and not isinstance(sentiment, bool) and 0 <= sentiment <= 100:
+            fields["sentiment"] = int(sentiment)
+        
+        subject_description = data.get("subject_description")
+        if isinstance(subject_description, str) and subject_description.strip():
+            fields["subject_description"] = subject_description.strip()
+        
+        topic_name = data.get("topic")
+        if isinstance(topic_name, str):
+            topic_name = LlmClient.clean_response(topic_name)
+            fields["topic"] = next((t for t in topics if t.name == topic_name), None) or \
+                next((t for t in topics if t.name.lower() == topic_name.lower()), None)
+        
+        items = data.get("actionables")
+        if isinstance(items, list) and all(isinstance(item, dict) and isinstance(item.get("content"), str) for item in items):
+            items = [item for item in items if LlmClient.clean_response(item["content"])]
+            fields["actionables"] = [
+                Post._actionable_from_enrichment(item, str(len(items)) + link, link, llm_client)
+                for item in items[:Post._max_actionables]
+            ]
+        
+        failed = [name for name, value in fields.items() if value is None]
+        if failed:
+            print(f"  ⚠️  Combined enrichment fields failed validation: {', '.join(failed)}")
+        return fields
+
+    @staticmethod
+    def _actionable_from_enrichment(item: dict, actionable_id: str, link: str, llm_client: LlmClient) -> Actionable:
+        """Build an Actionable from a validated JSON item, asking separately only for missing parts"""
+        content = LlmClient.clean_response(item["content"])
+        
+        is_question = item.get("is_question")
+        if isinstance(is_question, bool):
+            is_question = 'True' if is_question else 'False'
+        else:
+            is_question = Actionable._is_question(content, llm_client)
+        
+        proposed_response = item.get("proposed_response")
+        if not isinstance(proposed_response, str) or not proposed_response.strip():
+            proposed_response = Actionable._generate_proposed_answer(content, llm_client)
+        
+        return Actionable(
+            actionable_id=actionable_id,
+            base_link=link,
+            content=content,
+            is_question=is_question,
+            proposed_response=proposed_response.strip()
+        )
+
+    @staticmethod
+    def _extract_json_object(response) -> Optional[dict]:
+        """Parse the first JSON object in a response, tolerating markdown code fences around it"""
+        if not isinstance(response, str):
+            return None
+        start = response.find('{')
+        end = response.rfind('}')
+        if start == -1 or end <= start:
+            return None
+        try:
+            data = json.loads(response[start:end + 1])
+        except json.JSONDecodeError:
+            return None
+        return data if isinstance(data, dict) else None
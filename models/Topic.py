@@ -2,9 +2,11 @@ from dataclasses import dataclass, field
 from typing import List, Optional
 from dataclasses_json import dataclass_json, config
 
+from models.codecs import fast_codec
 from models.Event import Event
 from models.Forum import Forum
 
+@fast_codec
 @dataclass_json
 @dataclass
 class Topic:
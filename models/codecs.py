@@ -0,0 +1,221 @@
+"""
+Specialized to_dict/from_dict for the dataclass_json models.
+
+dataclasses_json inspects fields, type hints and overrides again for every object it encodes or
+decodes. fast_codec instead generates one plain encoder and one decoder function per class (the
+first time either is used, once the class's forward references resolve) from the same field
+metadata: exclusions and field encoders/decoders are honoured, and primitives, lists, optionals
+and nested dataclasses are converted with the same rules dataclasses_json applies, so the
+result is identical. Anything else falls back to dataclasses_json per field.
+
+The reflective implementations stay available as reflective_to_dict/reflective_from_dict, and are
+still used for encode_json=True and infer_missing=True. The generator relies on private helpers of
+dataclasses_json, so its version is pinned; should they be missing, the models keep the
+reflective implementations.
+"""
+import dataclasses
+import threading
+import typing
+from typing import Any, Callable, Dict, Tuple
+
+try:
+    # Private helpers of the pinned dataclasses_json version (requirements.txt)
+    from dataclasses_json.core import _asdict, _decode_generic, _is_supported_generic, _support_extended_types, \
+        _user_overrides_or_exts
+except ImportError as e:
+    print(f"⚠️  dataclasses_json internals changed ({e}), models use its own to_dict/from_dict")
+    _asdict = None
+
+_PRIMITIVES = (str, int, float, bool)
+_PRIMITIVE_TYPES = frozenset(_PRIMITIVES + (type(None),))
+
+_lock = threading.RLock()
+_codecs: Dict[type, Tuple[Callable, Callable]] = {}
+
+
+def _unwrap_new_type(hint):
+    while hasattr(hint, "__supertype__"):
+        hint = hint.__supertype__
+    return hint
+
+
+def _optional_arg(hint):
+    """X for Optional[X], else None"""
+    args = typing.get_args(hint)
+    if typing.get_origin(hint) is typing.Union and len(args) == 2 and type(None) in args:
+        return args[0] if args[1] is type(None) else args[1]
+    return None
+
+
+def _list_arg(hint):
+    """X for List[X] (or list), else None"""
+    if hint is list:
+        return Any
+    if typing.get_origin(hint) is list:
+        args = typing.get_args(hint)
+        return args[0] if args else Any
+    return None
+
+
+def _encode_mapping(mapping):
+    """_asdict of a dict, copied directly when its keys and values are all primitives"""
+    if type(mapping) is dict and all(type(key) in _PRIMITIVE_TYPES and type(value) in _PRIMITIVE_TYPES
+                                     for key, value in mapping.items()):
+        return dict(mapping)
+    return _asdict(mapping)
+
+
+class _Builder:
+    """Accumulates the source and the globals of one generated function"""
+
+    def __init__(self):
+        self.globals = {"_asdict": _asdict, "_decode_generic": _decode_generic,
+                        "_support_extended_types": _support_extended_types}
+        self._counter = 0
+
+    def name(self, prefix: str, value=None) -> str:
+        self._counter += 1
+        name = f"_{prefix}{self._counter}"
+        if value is not None:
+            self.globals[name] = value
+        return name
+
+    def encode(self, hint, var: str) -> str:
+        """Expression encoding var like dataclasses_json's _asdict"""
+        hint = _unwrap_new_type(hint)
+        if hint in _PRIMITIVES or hint is type(None):
+            return var
+        optional = _optional_arg(hint)
+        if optional is not None:
+            inner = self.encode(optional, var)
+            return var if inner == var else f"(None if {var} is None else {inner})"
+        item = _list_arg(hint)
+        if item is not None and _unwrap_new_type(item) in _PRIMITIVES:
+            return f"(None if {var} is None else list({var}))"
+        if item is not None:
+            element = self.name("x")
+            return f"(None if {var} is None else [{self.encode(item, element)} for {element} in {var}])"
+        if hint is dict or typing.get_origin(hint) is dict:
+            return f"{self.name('mapping', _encode_mapping)}({var})"
+        if isinstance(hint, type) and dataclasses.is_dataclass(hint):
+            encoder = self.name("encode", lambda obj: _codec(type(obj))[0](obj))
+            return f"(None if {var} is None else {encoder}({var}))"
+        return f"_asdict({var})"
+
+    def decode(self, hint, var: str) -> str:
+        """Expression decoding var like dataclasses_json's _decode_type for this hint"""
+        hint = _unwrap_new_type(hint)
+        if hint is Any:
+            return var
+        if hint in _PRIMITIVES:
+            name = self.name("t", hint)
+            return f"({var} if isinstance({var}, {name}) else {name}({var}))"
+        optional = _optional_arg(hint)
+        if optional is not None:
+            return f"(None if {var} is None else {self.decode(optional, var)})"
+        item = _list_arg(hint)
+        if item is not None:
+            element = self.name("x")
+            return f"[{self.decode(item, element)} for {element} in {var}]"
+        if hint is dict or (typing.get_origin(hint) is dict and all(arg is Any for arg in typing.get_args(hint))):
+            return f"dict({var})"
+        if isinstance(hint, type) and dataclasses.is_dataclass(hint):
+            decoder = self.name("decode", lambda kvs, cls=hint: _codec(cls)[1](kvs))
+            return f"({var} if dataclasses.is_dataclass({var}) else {decoder}({var}))"
+        if _is_supported_generic(hint) and hint is not str:
+            return f"_decode_generic({self.name('h', hint)}, {var}, False)"
+        return f"_support_extended_types({self.name('h', hint)}, {var})"
+
+    def compile(self, source: str, function: str) -> Callable:
+        namespace = dict(self.globals, dataclasses=dataclasses)
+        exec(compile(source, f"<codec {function}>", "exec"), namespace)
+        return namespace[function]
+
+
+def _compile_encoder(cls) -> Callable:
+    overrides = _user_overrides_or_exts(cls)
+    hints = typing.get_type_hints(cls)
+    builder = _Builder()
+    lines = ["def to_dict(obj):", "    result = {}"]
+    for field in dataclasses.fields(cls):
+        override = overrides[field.name]
+        if override.letter_case is not None:
+            raise TypeError(f"fast_codec does not support letter_case ({cls.__name__}.{field.name})")
+        lines.append(f"    value = obj.{field.name}")
+        if override.encoder is not None:
+            expression = f"{builder.name('encoder', override.encoder)}(value)"
+        else:
+            expression = builder.encode(hints[field.name], "value")
+        if override.exclude is not None:
+            lines.append(f"    if not {builder.name('exclude', override.exclude)}(value):")
+            lines.append(f"        result[{field.name!r}] = {expression}")
+        else:
+            lines.append(f"    result[{field.name!r}] = {expression}")
+    lines.append("    return result")
+    return builder.compile("\n".join(lines), "to_dict")
+
+
+def _compile_decoder(cls) -> Callable:
+    overrides = _user_overrides_or_exts(cls)
+    hints = typing.get_type_hints(cls)
+    builder = _Builder()
+    builder.globals["_cls"] = cls
+    lines = ["def from_dict(kvs):", "    if isinstance(kvs, _cls):", "        return kvs"]
+    arguments = []
+    for field in dataclasses.fields(cls):
+        if not field.init:
+            continue
+        if field.default is not dataclasses.MISSING:
+            lines.append(f"    value = kvs.get({field.name!r}, {builder.name('default', [field.default])}[0])")
+        elif field.default_factory is not dataclasses.MISSING:
+            factory = builder.name("factory", field.default_factory)
+            lines.append(f"    value = kvs[{field.name!r}] if {field.name!r} in kvs else {factory}()")
+        else:
+            lines.append(f"    value = kvs[{field.name!r}]")
+
+        hint = _unwrap_new_type(hints[field.name])
+        decoder = overrides[field.name].decoder
+        if decoder is not None:
+            # dataclasses_json keeps a value that already has exactly the annotated type
+            expression = f"value if type(value) is {builder.name('h', hint)} else {builder.name('decoder', decoder)}(value)"
+        else:
+            expression = builder.decode(hint, "value")
+        argument = f"_{field.name}"
+        lines.append(f"    {argument} = None if value is None else {expression}")
+        arguments.append(f"{field.name}={argument}")
+    lines.append(f"    return _cls({', '.join(arguments)})")
+    return builder.compile("\n".join(lines), "from_dict")
+
+
+def _codec(cls) -> Tuple[Callable, Callable]:
+    codec = _codecs.get(cls)
+    if codec is None:
+        with _lock:
+            codec = _codecs.get(cls)
+            if codec is None:
+                codec = _codecs[cls] = (_compile_encoder(cls), _compile_decoder(cls))
+    return codec
+
+
+def fast_codec(cls):
+    """Class decorator, applied on top of @dataclass_json, replacing to_dict/from_dict with generated ones"""
+    reflective_to_dict = cls.to_dict
+    reflective_from_dict = cls.from_dict.__func__
+    cls.reflective_to_dict = reflective_to_dict
+    cls.reflective_from_dict = classmethod(reflective_from_dict)
+    if _asdict is None:
+        return cls
+
+    def to_dict(self, encode_json=False) -> dict:
+        if encode_json:
+            return reflective_to_dict(self, encode_json=True)
+        return _codec(type(self))[0](self)
+
+    def from_dict(kls, kvs, *, infer_missing=False):
+        if infer_missing:
+            return reflective_from_dict(kls, kvs, infer_missing=True)
+        return _codec(kls)[1](kvs)
+
+    cls.to_dict = to_dict
+    cls.from_dict = classmethod(from_dict)
+    return cls
@@ -0,0 +1,67 @@
+import hashlib
+import os
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import db as database  # noqa: E402
+from llm.LlmClient import LlmClient  # noqa: E402
+from llm.SemanticSimilarityService import SemanticSimilarityService  # noqa: E402
+from models.Event import Event  # noqa: E402
+from models.Keyword import Keyword  # noqa: E402
+from models.Post import Post  # noqa: E402
+
+START = datetime(2025, 1, 1)
+
+
+class FakeEmbeddingService:
+    """Deterministic bag-of-words embeddings, so nothing reaches the LLM API"""
+    dim = 16
+
+    def embed(self, text: str) -> list:
+        vector = np.zeros(self.dim)
+        for word in text.lower().split():
+            vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % self.dim] += 1
+        return vector.tolist()
+
+    def embed_many(self, texts) -> list:
+        return [self.embed(text) for text in texts]
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    """No test talks to the LLM API or writes to its caches"""
+    def generate_response(*args, **kwargs):
+        raise AssertionError("The LLM API was called")
+    monkeypatch.setattr(LlmClient, "generate_response", generate_response)
+    LlmClient.configure_cache(enabled=False)
+    SemanticSimilarityService.configure_store(enabled=False)
+
+
+@pytest.fixture
+def db():
+    """The shared database, emptied for the test"""
+    database.__init__()
+    database._embedding_service = FakeEmbeddingService()
+    yield database
+    if database.wal is not None:
+        database.wal.close()
+    database.__init__()
+
+
+def make_post(i: int, topic: str = "Traffic and Safety") -> Post:
+    return Post(link=f"https://example.com/post/{i}", content=f"Road works near the station {i}",
+                date=START + timedelta(hours=i), source="facebook", topic=topic, total_engagement=i)
+
+
+def make_event(posts, name: str = "Road works") -> Event:
+    # Small integer embeddings survive the write-ahead log's float32 packing unchanged
+    keywords = [Keyword(f"{name} {k}", [float((k + j) % 3) for j in range(FakeEmbeddingService.dim)])
+                for k in range(3)]
+    return Event(name=name, small_summary=f"{name}.", big_summary=f"{name} near the station.",
+                 case_description=f"Residents ask about {name.lower()}.", posts=list(posts), similar_events=[],
+                 keywords=keywords, date=max(post.date for post in posts))
@@ -0,0 +1,78 @@
+import asyncio
+import threading
+
+import pytest
+
+from llm.AsyncLlmClient import AsyncLlmClient
+from llm.LlmClient import LlmClient
+from llm.ResponseCache import ResponseCache
+
+
+class _Response:
+    status_code = 200
+
+    def json(self):
+        return {"choices": [{"message": {"content": "Road works until Friday."}}]}
+
+
+class _AsyncClient:
+    """Stands in for httpx.AsyncClient, counting the requests sent"""
+    def __init__(self):
+        self.posts = 0
+
+    async def post(self, url, headers=None, content=None):
+        self.posts += 1
+        return _Response()
+
+
+@pytest.fixture
+def http(monkeypatch):
+    client = _AsyncClient()
+    monkeypatch.setattr(AsyncLlmClient, "get_async_client", classmethod(lambda cls: client))
+    yield client
+    LlmClient.configure_concurrency(LlmClient._max_in_flight)
+
+
+def test_async_requests_share_the_blocking_clients_limit(http):
+    LlmClient.configure_concurrency(1)
+
+    async def scenario():
+        # A blocking request holds the only slot
+        LlmClient._in_flight.acquire()
+        request = asyncio.create_task(AsyncLlmClient().generate_response({"messages": []}))
+        await asyncio.sleep(0.05)
+        assert http.posts == 0 and not request.done()
+
+        LlmClient._in_flight.release()
+        assert await request == "Road works until Friday."
+        # The slot is released again
+        assert LlmClient._in_flight.acquire(blocking=False)
+        LlmClient._in_flight.release()
+
+    asyncio.run(scenario())
+    assert http.posts == 1
+
+
+def test_response_cache_is_used_off_the_event_loop(http, tmp_path, monkeypatch):
+    LlmClient.configure_cache(enabled=True, path=str(tmp_path / "cache.sqlite3"))
+    threads = []
+    get = ResponseCache.get
+
+    def recording_get(self, key):
+        threads.append(threading.get_ident())
+        return get(self, key)
+    monkeypatch.setattr(ResponseCache, "get", recording_get)
+
+    async def scenario():
+        client = AsyncLlmClient()
+        return [await client.generate_response({"messages": [{"role": "user", "content": "Is the road open?"}]})
+                for _ in range(2)], threading.get_ident()
+
+    try:
+        answers, loop_thread = asyncio.run(scenario())
+    finally:
+        LlmClient.configure_cache(enabled=False)
+    assert answers == ["Road works until Friday."] * 2
+    # Miss then hit: only the first request reached the API
+    assert http.posts == 1
+    assert len(threads) == 2 and loop_thread not in threads
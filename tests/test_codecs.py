@@ -0,0 +1,60 @@
+import json
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import List, Optional
+
+from dataclasses_json import dataclass_json
+
+from conftest import START, make_event, make_post
+from main_generate import DateTimeEncoder
+from models import codecs
+from models.Actionable import Actionable
+from models.Event import Event
+from models.Post import Post
+from models.Topic import Topic
+
+
+def _json(data) -> str:
+    return json.dumps(data, indent=2, ensure_ascii=False, cls=DateTimeEncoder)
+
+
+def _objects():
+    posts = [make_post(i) for i in range(4)]
+    posts[0].actionables = [Actionable("0-0", posts[0].link, "Wanneer is de weg open?", "True", "Volgende week.")]
+    posts[1].delta_interactions = [(START + timedelta(minutes=m), m) for m in range(3)]
+    posts[2].subject_description = None
+    first = make_event(posts[:2], "Road works")
+    first.event_id = 1
+    second = make_event(posts[2:], "Bus detour")
+    second.event_id = 2
+    second.similar_events = [first]
+    topic = Topic(topic_id=1, name="Traffic and Safety", events=[first, second], icon="🚦",
+                  actionables={"misinformation": 2, "questions": 1, "by_week": {"2025-01": [1, 2]}})
+    return [(Post, posts), (Event, [first, second]), (Topic, [topic, Topic(topic_id=2, name="Other")])]
+
+
+def test_generated_codecs_match_dataclasses_json():
+    for cls, objects in _objects():
+        generated = [obj.to_dict() for obj in objects]
+        assert _json(generated) == _json([obj.reflective_to_dict() for obj in objects])
+
+        dicts = json.loads(_json(generated))
+        assert _json([cls.from_dict(d).to_dict() for d in dicts]) == \
+            _json([cls.reflective_from_dict(d).to_dict() for d in dicts])
+        assert cls.to_dict(objects[0], encode_json=True) == objects[0].reflective_to_dict(encode_json=True)
+
+
+def test_models_fall_back_to_dataclasses_json_without_its_internals(monkeypatch):
+    monkeypatch.setattr(codecs, "_asdict", None)
+
+    @codecs.fast_codec
+    @dataclass_json
+    @dataclass
+    class Note:
+        text: str
+        tags: List[str] = field(default_factory=list)
+        parent: Optional[str] = None
+
+    assert Note.to_dict is Note.reflective_to_dict
+    note = Note("road works", ["traffic"])
+    assert Note.from_dict(note.to_dict()) == note
@@ -0,0 +1,76 @@
+import multiprocessing
+import os
+
+import numpy as np
+import pytest
+
+from llm.EmbeddingStore import EmbeddingStore
+
+
+def _vector(i: int, dim: int = 8) -> list:
+    return [float(i)] * dim
+
+
+def _fill(directory: str, start: int, count: int):
+    store = EmbeddingStore(directory)
+    for i in range(start, start + count):
+        store.put(f"key-{i}", _vector(i))
+
+
+def test_stored_embeddings_survive_a_reload(tmp_path):
+    store = EmbeddingStore(str(tmp_path), lru_size=2)
+    key = EmbeddingStore.make_key("model", "text")
+    assert store.get(key) is None
+    assert store.put(key, [0.1, 0.2, 0.3]) == np.asarray([0.1, 0.2, 0.3], dtype=np.float32).tolist()
+    for i in range(3):
+        store.put(f"other-{i}", [float(i)] * 3)
+    # Evicted from the LRU, read back from the mapped matrix
+    assert store.get(key) == pytest.approx([0.1, 0.2, 0.3])
+    assert store.stats()["hits"] == 1 and store.stats()["misses"] == 1
+
+    reloaded = EmbeddingStore(str(tmp_path))
+    assert len(reloaded) == 4
+    assert reloaded.get(key) == pytest.approx([0.1, 0.2, 0.3])
+    with pytest.raises(ValueError):
+        reloaded.put("wrong", [1.0, 2.0])
+
+
+def test_torn_writes_are_ignored_and_repaired(tmp_path):
+    store = EmbeddingStore(str(tmp_path))
+    store.put("a", _vector(1))
+    # A crash left half a row and half an index line behind
+    with open(tmp_path / "embeddings.f32", "ab") as f:
+        f.write(b"\x00" * 12)
+    with open(tmp_path / "index.tsv", "a") as f:
+        f.write("b\t")
+
+    store = EmbeddingStore(str(tmp_path))
+    assert store.get("b") is None
+    store.put("c", _vector(3))
+    reloaded = EmbeddingStore(str(tmp_path))
+    assert reloaded.get("a") == _vector(1)
+    assert reloaded.get("c") == _vector(3)
+    assert (tmp_path / "index.tsv").read_text().splitlines() == ["a\t0", "c\t1"]
+
+
+def test_processes_sharing_a_store_never_share_a_row(tmp_path):
+    directory = str(tmp_path)
+    store = EmbeddingStore(directory)
+    store.put("key-first", _vector(-1))
+
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_fill, args=(directory, start, 200)) for start in (0, 1000, 2000)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+
+    # An open store sees what the other processes added
+    assert store.get("key-1150") == _vector(1150)
+    reloaded = EmbeddingStore(directory)
+    assert len(reloaded) == 601
+    for i in [*range(0, 200), *range(1000, 1200), *range(2000, 2200)]:
+        assert reloaded.get(f"key-{i}") == _vector(i)
+    rows = [line.split("\t")[1] for line in open(os.path.join(directory, "index.tsv"))]
+    assert len(rows) == len(set(rows)) == 601
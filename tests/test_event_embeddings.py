@@ -0,0 +1,29 @@
+from conftest import FakeEmbeddingService, make_event, make_post
+from models.Event import Event
+
+
+class _CountingService(FakeEmbeddingService):
+    def __init__(self):
+        self.batches = []
+
+    def embed_many(self, texts) -> list:
+        self.batches.append(list(texts))
+        return super().embed_many(texts)
+
+
+def test_only_stale_description_embeddings_are_recomputed():
+    events = [make_event([make_post(i)], f"Works {i}") for i in range(3)]
+    service = _CountingService()
+    Event.refresh_description_embeddings(events, service)
+    assert service.batches == [[event.case_description for event in events]]
+    assert all(event.has_fresh_description_embedding() for event in events)
+
+    events[1].case_description = "Residents ask about the bus detour."
+    Event.refresh_description_embeddings(events, service)
+    assert service.batches[1] == ["Residents ask about the bus detour."]
+    Event.refresh_description_embeddings(events, service)
+    assert len(service.batches) == 2
+
+    embedding = events[1].description_embedding
+    assert abs(float(embedding @ embedding) - 1.0) < 1e-6
+    assert "description_embedding" not in events[1].to_dict()
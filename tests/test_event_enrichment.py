@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from conftest import FakeEmbeddingService, make_event, make_post
+from llm.LlmClient import LlmClient
+from llm.SemanticSimilarityService import SemanticSimilarityService
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    """Answers every prompt; keyword prompts get llm.keywords. Records prompts and embedded texts."""
+    class Llm:
+        keywords = "Road works 0, Road works 1, Detour"
+        prompts = []
+        embedded = []
+
+    def generate_response(self, prompt, *args, **kwargs):
+        Llm.prompts.append(prompt.prompt)
+        return Llm.keywords if "keywords" in prompt.prompt.lower() else "Updated text."
+
+    def embed_many(self, texts):
+        Llm.embedded.extend(texts)
+        return np.array(FakeEmbeddingService().embed_many(texts), dtype=np.float32)
+    monkeypatch.setattr(LlmClient, "generate_response", generate_response)
+    monkeypatch.setattr(SemanticSimilarityService, "embed_many", embed_many)
+    return Llm
+
+
+def test_new_post_is_folded_into_the_previous_enrichment(llm):
+    event = make_event([make_post(0), make_post(1)])
+    kept = event.keywords[0]
+    event.add_post(make_post(2))
+
+    assert len(llm.prompts) == 4
+    assert not any(make_post(0).content in prompt for prompt in llm.prompts)
+    assert all(make_post(2).content in prompt for prompt in llm.prompts)
+    assert [kw.keyword for kw in event.keywords] == ["Road works 0", "Road works 1", "Detour"]
+    assert event.keywords[0] is kept and llm.embedded == ["Detour"]
+    assert event.small_summary == event.case_description == "Updated text."
+
+
+def test_drift_rebuilds_from_all_posts(llm):
+    llm.keywords = "Choir, Concert, Park"
+    event = make_event([make_post(0), make_post(1)])
+    event.add_post(make_post(2))
+
+    # Four incremental updates, then four prompts over every post
+    assert len(llm.prompts) == 8
+    assert all(make_post(0).content in prompt for prompt in llm.prompts[4:])
+    assert [kw.keyword for kw in event.keywords] == ["Choir", "Concert", "Park"]
@@ -0,0 +1,51 @@
+import threading
+import time
+
+import pytest
+
+from conftest import make_event, make_post
+from models.Event import Event
+from Services.EventEnrichmentQueue import EventEnrichmentQueue
+
+
+@pytest.fixture
+def refreshes(monkeypatch):
+    """(event_id, new posts, snapshot of the event's posts) per refresh_enrichment call"""
+    calls = []
+    lock = threading.Lock()
+
+    def refresh_enrichment(self, new_posts, other_events=None, keyword_index=None, posts=None):
+        with lock:
+            calls.append((self.event_id, list(new_posts), list(posts)))
+    monkeypatch.setattr(Event, "refresh_enrichment", refresh_enrichment)
+    return calls
+
+
+def test_a_burst_of_posts_costs_one_regeneration(db, refreshes):
+    events = [db.add_event(make_event([make_post(i)], f"Works {i}")) for i in range(2)]
+    queue = EventEnrichmentQueue(window=0.2, max_delay=5.0)
+    posts = [make_post(10 + i) for i in range(5)]
+    for post in posts:
+        queue.mark_dirty(events[0], post)
+    queue.mark_dirty(events[1], make_post(20))
+
+    # Posts are attached right away, the regeneration waits for the window
+    assert events[0].posts[1:] == posts
+    assert queue.pending() == 2 and refreshes == []
+
+    queue.close()
+    assert sorted((event_id, len(new_posts)) for event_id, new_posts, _ in refreshes) == [(1, 5), (2, 1)]
+    assert refreshes[[call[0] for call in refreshes].index(1)][2] == events[0].posts
+    assert queue.stats() == {"pending": 0, "regenerations": 2, "coalesced_posts": 6}
+
+
+def test_a_busy_event_is_regenerated_after_max_delay(db, refreshes):
+    event = db.add_event(make_event([make_post(0)]))
+    queue = EventEnrichmentQueue(window=0.2, max_delay=0.3)
+    deadline = time.monotonic() + 1.0
+    while not refreshes and time.monotonic() < deadline:
+        queue.mark_dirty(event, make_post(1))
+        time.sleep(0.02)
+
+    assert refreshes, "the event was not regenerated while posts kept arriving"
+    queue.close()
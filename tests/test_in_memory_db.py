@@ -0,0 +1,84 @@
+from datetime import timedelta
+
+from conftest import START, make_event, make_post
+from models.Topic import Topic
+
+
+def _add_events(db, count: int, topic_name: str = "Traffic and Safety"):
+    topic = db.get_topic_by_name(topic_name)
+    return [db.add_event(make_event([make_post(i)], f"Works {i}"), topic=topic) for i in range(count)]
+
+
+def test_lookups_follow_updates_and_deletes(db):
+    events = _add_events(db, 6)
+    traffic = db.get_topic_by_name("Traffic and Safety")
+    assert db.delete_event(events[1].event_id) and db.delete_event(events[3].event_id)
+    assert not db.delete_event(events[3].event_id)
+
+    replacement = make_event([make_post(9)], "Detour")
+    db.update_event(events[4].event_id, replacement)
+    assert db.events == [events[0], events[2], replacement, events[5]]
+    assert traffic.events == db.events
+    assert db.get_event_by_id(events[4].event_id) is replacement
+    assert db.get_event_by_id(events[1].event_id) is None
+
+    # IDs are never reused after a delete
+    assert db.add_event(make_event([make_post(10)])).event_id == 7
+    assert db.get_topic_by_id(traffic.topic_id) is traffic
+
+
+def test_events_keep_the_topic_they_are_filed_under(db):
+    event = _add_events(db, 1)[0]
+    assert db.get_event_topic_name(event) == "Traffic and Safety"
+    assert db.get_all_events_by_topic("Traffic and Safety") == [event]
+
+    search_topic = db.add_topic(Topic(topic_id=None, name="Search: road works", events=[event], icon="🔍"))
+    assert db.get_event_topic_name(event) == "Traffic and Safety"
+
+    culture = db.get_topic_by_name("Culture and Events")
+    db.add_event_to_topic(event, culture)
+    assert db.get_event_topic_name(event) == "Culture and Events"
+    assert db.get_all_events_by_topic("Traffic and Safety") == []
+    assert search_topic.events == [event]
+
+    # An unfiled copy answers from its first post
+    copy = make_event(event.posts)
+    copy.event_id = event.event_id
+    assert db.get_event_topic_name(copy) == "Traffic and Safety"
+
+
+def test_loaded_events_keep_their_ids(db):
+    loaded = make_event([make_post(0)])
+    loaded.event_id = 41
+    db.load_event(loaded)
+    assert db.get_event_by_id(41) is loaded
+    assert db.add_event(make_event([make_post(1)])).event_id == 42
+
+
+def test_recent_events_come_from_the_topic_timeline(db):
+    traffic = db.get_topic_by_name("Traffic and Safety")
+    culture = db.get_topic_by_name("Culture and Events")
+    events = []
+    for i in range(40):
+        # Posts every 5 hours, out of date order, alternating between two topics
+        post = make_post((i * 7) % 40 * 5)
+        events.append(db.add_event(make_event([post], f"Works {i}"), topic=traffic if i % 2 else culture))
+
+    def brute_force(date, topic, hours):
+        return sorted((e for e in db.events if db.get_event_topic_name(e) == topic
+                       and e.date > date - timedelta(hours=hours)), key=lambda e: (e.date, e.event_id))
+
+    now = START + timedelta(hours=150)
+    assert db.get_events_by_topic_from_last_24_hours(now, traffic.name) == brute_force(now, traffic.name, 72)
+    assert db.get_events_by_topic_from_last_24_hours(now, culture.name, window_hours=12) == \
+        brute_force(now, culture.name, 12)
+
+    # An attached post moves the event forward, a delete takes it out
+    oldest = db.get_events_by_topic_from_last_24_hours(START + timedelta(days=30), traffic.name, window_hours=10 ** 4)[0]
+    oldest.attach_post(make_post(300))
+    db.update_event_date(oldest)
+    db.delete_event(events[1].event_id)
+    latest = START + timedelta(hours=300)
+    assert db.get_events_by_topic_from_last_24_hours(latest, traffic.name) == brute_force(latest, traffic.name, 72)
+    assert db.get_events_by_topic_from_last_24_hours(latest, traffic.name)[-1] is oldest
+    assert events[1] not in db.get_events_by_topic_from_last_24_hours(now, traffic.name, window_hours=10 ** 4)
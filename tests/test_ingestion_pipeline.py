@@ -0,0 +1,151 @@
+import csv
+import json
+import random
+import threading
+import time
+
+import pytest
+
+import main_generate
+from conftest import START, FakeEmbeddingService, make_post
+from llm.LlmClient import LlmClient
+from models.Post import Post
+from Services.IngestionPipeline import IngestionPipeline
+
+
+class RecordingAssigner:
+    """Stands in for EventAssigningService and records the order posts are assigned in"""
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.links = []
+
+    def assign_posts_to_events(self, post: Post):
+        time.sleep(self.delay)
+        self.links.append(post.link)
+
+
+def _write_csv(path, rows) -> str:
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["link", "message", "date_iso8601", "comments_json", "likes"])
+        for link, likes in rows:
+            writer.writerow([link, f"Message of {link}", START.isoformat(), json.dumps([]), likes])
+    return str(path)
+
+
+@pytest.fixture
+def enrichment(monkeypatch):
+    """Fake enrichment taking a random time; records the links it enriched"""
+    enriched = []
+    rng = random.Random(3)
+    lock = threading.Lock()
+
+    def create_with_enrichment(link, content, date, source, total_engagement=0):
+        with lock:
+            enriched.append(link)
+            delay = rng.random() * 0.01
+        time.sleep(delay)
+        return Post(link=link, content=content, date=date, source=source, total_engagement=total_engagement)
+    monkeypatch.setattr(Post, "create_with_enrichment", create_with_enrichment)
+    return enriched
+
+
+def test_posts_are_written_in_row_order(db, tmp_path, enrichment):
+    feed = _write_csv(tmp_path / "feed.csv", [(f"https://example.com/{i}", i) for i in range(40)])
+    snapshot = _write_csv(tmp_path / "snapshot.csv", [(f"https://example.com/{i}", 100 + i) for i in range(35, 50)])
+    assigner = RecordingAssigner()
+
+    counts = IngestionPipeline(assigner, main_generate.parse_csv_row, workers=4, max_pending=8).run(
+        [(feed, 30), (snapshot, None)])
+
+    assert counts == {feed: 30, snapshot: 15}
+    assert assigner.links == [f"https://example.com/{i}" for i in list(range(30)) + list(range(35, 50))]
+    assert sorted(enrichment) == sorted(assigner.links)
+
+
+def test_known_posts_only_update_their_engagement(db, tmp_path, enrichment):
+    post = make_post(1)
+    db.add_post(post)
+    feed = _write_csv(tmp_path / "feed.csv", [(post.link, 7)])
+
+    IngestionPipeline(RecordingAssigner(), main_generate.parse_csv_row).run([(feed, None)])
+    assert enrichment == []
+    assert post.total_engagement == 7
+    assert post.delta_interactions[-1] == (START, 6)
+
+
+def test_reader_waits_for_the_writer(db, tmp_path, enrichment, monkeypatch):
+    feed = _write_csv(tmp_path / "feed.csv", [(f"https://example.com/{i}", i) for i in range(30)])
+    pipeline = IngestionPipeline(RecordingAssigner(delay=0.005), main_generate.parse_csv_row,
+                                 workers=2, max_pending=4)
+    written = []
+    pipeline.on_written = lambda item: written.append(item.seq)
+    ahead = []
+    enrich = Post.create_with_enrichment
+
+    def create_with_enrichment(**fields):
+        ahead.append(len(enrichment) + 1 - len(written))
+        return enrich(**fields)
+    monkeypatch.setattr(Post, "create_with_enrichment", create_with_enrichment)
+
+    pipeline.run([(feed, None)])
+    assert written == list(range(30))
+    assert max(ahead) <= 4
+
+
+def test_repeated_link_is_enriched_when_its_first_row_failed(db, tmp_path, monkeypatch):
+    calls = []
+
+    def create_with_enrichment(link, content, date, source, total_engagement=0):
+        calls.append(total_engagement)
+        if len(calls) == 1:
+            raise RuntimeError("LLM unavailable")
+        return Post(link=link, content=content, date=date, source=source, total_engagement=total_engagement)
+    monkeypatch.setattr(Post, "create_with_enrichment", create_with_enrichment)
+    feed = _write_csv(tmp_path / "feed.csv", [("https://example.com/1", 3), ("https://example.com/1", 5)])
+
+    assigner = RecordingAssigner()
+    counts = IngestionPipeline(assigner, main_generate.parse_csv_row).run([(feed, None)])
+    assert counts == {feed: 1}
+    assert calls == [3, 5]
+    assert assigner.links == ["https://example.com/1"]
+    assert db.posts["https://example.com/1"].total_engagement == 5
+
+
+def test_resume_continues_after_the_cursor(db, tmp_path, enrichment):
+    feed = _write_csv(tmp_path / "feed.csv", [(f"https://example.com/{i}", i) for i in range(10)])
+    snapshot = _write_csv(tmp_path / "snapshot.csv", [(f"https://example.com/{i}", i) for i in range(10, 15)])
+    sources = [(feed, 6), (snapshot, None)]
+
+    interrupted = IngestionPipeline(RecordingAssigner(), main_generate.parse_csv_row)
+
+    def stop_after_four(item):
+        if item.seq == 3:
+            raise KeyboardInterrupt
+    interrupted.on_written = stop_after_four
+    with pytest.raises(KeyboardInterrupt):
+        interrupted.run(sources)
+    assert interrupted.cursor == {"source_file": feed, "row_number": 4, "rows_taken": 4}
+
+    assigner = RecordingAssigner()
+    counts = IngestionPipeline(assigner, main_generate.parse_csv_row).run(sources, resume_from=interrupted.cursor)
+    assert counts == {feed: 2, snapshot: 5}
+    assert assigner.links == [f"https://example.com/{i}" for i in [4, 5] + list(range(10, 15))]
+
+
+def test_checkpoint_round_trip(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(main_generate, "CHECKPOINT_FILE", str(tmp_path / "checkpoint.json"))
+    for i in range(3):
+        db.add_post(make_post(i))
+    cursor = {"source_file": "feed.csv", "row_number": 3, "rows_taken": 3}
+    main_generate.save_database_to_json(main_generate.CHECKPOINT_FILE, extra_metadata={"cursor": cursor})
+
+    db.__init__()
+    db._embedding_service = FakeEmbeddingService()
+    assert main_generate.load_checkpoint(LlmClient()) == cursor
+    assert sorted(db.posts) == [make_post(i).link for i in range(3)]
+    # Loading does not add a second initial engagement delta
+    assert all(len(post.delta_interactions) == 1 for post in db.posts.values())
+
+    main_generate.remove_checkpoint()
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,48 @@
+import io
+import json
+
+import main_generate
+from conftest import FakeEmbeddingService, make_event, make_post
+from database.json_stream import JsonStreamReader
+from llm.LlmClient import LlmClient
+from Services.EventProcessingService import EventProcessingService
+
+
+def test_members_are_read_through_a_small_window():
+    document = {
+        "posts": [{"link": f"https://example.com/{i}", "score": -2.5 * i, "tags": ["a", "b"] * i} for i in range(50)],
+        "empty": [],
+        "metadata": {"total_posts": 50, "note": "ünïcode \" and , inside"},
+        "count": 123456789,
+    }
+    text = json.dumps(document, indent=2, ensure_ascii=False)
+    for buffer_size in (1, 7, 64, 1 << 20):
+        items = list(JsonStreamReader(io.StringIO(text), buffer_size=buffer_size).items())
+        assert [value for key, value in items if key == "posts"] == document["posts"]
+        assert dict(item for item in items if item[0] != "posts") == {
+            "metadata": document["metadata"], "count": 123456789}
+
+
+def test_database_round_trip(db, tmp_path):
+    traffic = db.get_topic_by_name("Traffic and Safety")
+    for i in range(5):
+        post = make_post(i)
+        db.add_post(post)
+        db.add_event(make_event([post], f"Works {i}"), topic=traffic)
+    db.delete_event(db.events[2].event_id)
+    # Similar events point forward and backward in the file
+    db.events[0].similar_events = [db.events[3]]
+    db.events[2].similar_events = [db.events[0], db.events[1]]
+    path = str(tmp_path / "db.json")
+    main_generate.save_database_to_json(path)
+    saved = {event.event_id: ([p.link for p in event.posts], [e.event_id for e in event.similar_events])
+             for event in db.events}
+
+    db.__init__()
+    db._embedding_service = FakeEmbeddingService()
+    EventProcessingService(LlmClient()).load_database_from_json(path)
+    loaded = {event.event_id: ([p.link for p in event.posts], [e.event_id for e in event.similar_events])
+              for event in db.events}
+    assert loaded == saved
+    assert [event.event_id for event in db.get_topic_by_name("Traffic and Safety").events] == [1, 2, 4, 5]
+    assert all(event.posts[0] is db.posts[event.posts[0].link] for event in db.events)
@@ -0,0 +1,54 @@
+import random
+
+from conftest import make_event, make_post
+from models.Keyword import Keyword
+
+VOCABULARY = ["road works", "station", "bus detour", "Crossing", "school run", "parking fees", "market",
+              "bike lane", "noise", "Street lights", "playground", "tram", "recycling", "dog park"]
+
+
+def _scan_keywords(events, query_words):
+    """The full scan search_keywords_by_query used to run"""
+    matching, seen = [], set()
+    for event in events:
+        for keyword in event.keywords or []:
+            if any(word.lower() in keyword.keyword.lower() for word in query_words) and keyword.keyword not in seen:
+                matching.append(keyword)
+                seen.add(keyword.keyword)
+    return matching
+
+
+def _scan_events(events, keywords):
+    wanted = {keyword.keyword for keyword in keywords}
+    return [event for event in events if any(keyword.keyword in wanted for keyword in event.keywords or [])]
+
+
+def _random_keywords(rng):
+    return [Keyword(name, [1.0, 0.0]) for name in rng.sample(VOCABULARY, 3)]
+
+
+def test_keyword_search_matches_the_full_scan(db):
+    rng = random.Random(5)
+    for i in range(60):
+        event = make_event([make_post(i)], f"Works {i}")
+        event.keywords = _random_keywords(rng)
+        db.add_event(event)
+    for event in db.events[::7]:
+        event.keywords = _random_keywords(rng)
+        db.index_events([event])
+    for event_id in [3, 10, 11, 40]:
+        db.delete_event(event_id)
+
+    for query in (["park"], ["ROAD", "tram"], ["st"], ["light", "lane", "fees"], ["nothing"]):
+        found = db.search_keywords_by_query(query)
+        assert [(kw.keyword, id(kw)) for kw in found] == [(kw.keyword, id(kw)) for kw in _scan_keywords(db.events, query)]
+        assert db.get_events_by_keywords(found) == _scan_events(db.events, found)
+
+
+def test_fuzzy_search_tolerates_typos(db):
+    event = make_event([make_post(0)])
+    event.keywords = [Keyword("playground", [1.0, 0.0]), Keyword("Street lights", [0.0, 1.0])]
+    db.add_event(event)
+    assert [kw.keyword for kw in db.search_keywords_fuzzy(["playgrund"])] == ["playground"]
+    assert [kw.keyword for kw in db.search_keywords_fuzzy(["streetlight"])] == ["Street lights"]
+    assert db.search_keywords_by_query(["playgrund"]) == []
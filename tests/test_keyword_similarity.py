@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from database.vector_index import create_vector_index
+from llm.KeywordEmbeddingMatrix import KeywordEmbeddingMatrix
+from llm.LlmClient import LlmClient
+from llm.SemanticSimilarityService import SemanticSimilarityService
+from models.Event import Event
+from models.Keyword import Keyword
+
+
+def _similar_before_matrices(keywords, other_event, llm_client) -> bool:
+    """Event._events_are_similar_static as it was, one float64 cosine per pair"""
+    if not keywords or not other_event.keywords:
+        return False
+    semantic_similarity_service = SemanticSimilarityService(llm_client)
+    kws_in_common = 0
+    for kw1 in keywords:
+        for kw2 in other_event.keywords:
+            if semantic_similarity_service.cosine_similarity(kw1.emb, kw2.emb) > Event._minimum_event_similarity_threshold:
+                kws_in_common += 1
+    return kws_in_common >= Event._minimum_words_in_common
+
+
+@pytest.fixture(scope="module")
+def borderline_pairs():
+    """Vector pairs whose normalized product differs from their pairwise cosine in the last bits"""
+    rng = np.random.default_rng(3)
+    cosine = SemanticSimilarityService(LlmClient()).cosine_similarity
+    pairs = []
+    while len(pairs) < 5:
+        a, b = rng.normal(size=(2, 64)).tolist()
+        product = float((KeywordEmbeddingMatrix.normalize([a]) @ KeywordEmbeddingMatrix.normalize([b]).T)[0, 0])
+        if product != cosine(a, b):
+            pairs.append((a, b, cosine(a, b)))
+    return pairs
+
+
+def test_threshold_pairs_are_decided_as_before(borderline_pairs, monkeypatch):
+    llm_client = LlmClient()
+    monkeypatch.setattr(Event, "_minimum_words_in_common", 1)
+    events = []
+    for event_id, (_, b, _) in enumerate(borderline_pairs):
+        event = Event(name=f"Event {event_id}", keywords=[Keyword(f"keyword {event_id}", b)])
+        event.event_id = event_id
+        events.append(event)
+    index = create_vector_index("exact")
+    for event in events:
+        index.add((event.event_id, 0), event.keywords[0].emb)
+
+    decisions = set()
+    for a, _, cosine in borderline_pairs:
+        keywords = [Keyword("query", a)]
+        # At the pair's own cosine it is not above the threshold; just below, it is
+        for threshold in (cosine, np.nextafter(cosine, -1.0)):
+            monkeypatch.setattr(Event, "_minimum_event_similarity_threshold", threshold)
+            expected = [event for event in events if _similar_before_matrices(keywords, event, llm_client)]
+            decisions.add(len(expected))
+
+            assert Event._find_similar_events_static(keywords, events, llm_client) == expected
+            assert Event._find_similar_events_static(keywords, events, llm_client, keyword_index=index) == expected
+            assert [event for event in events
+                    if Event._events_are_similar_static(keywords, event, llm_client)] == expected
+    assert len(decisions) > 1
@@ -0,0 +1,99 @@
+import pytest
+
+from llm.LlmClient import LlmClient
+from llm.ResponseCache import ResponseCache
+
+# The blocking client as shipped, before the offline fixture replaces it
+_generate_response = LlmClient.generate_response
+
+
+class _Response:
+    status_code = 200
+
+    def __init__(self, content):
+        self.content = content
+
+    def json(self):
+        return {"choices": [{"message": {"content": self.content}}]}
+
+
+class _Session:
+    """Stands in for the pooled requests.Session, recording the requests sent"""
+    def __init__(self, content="Road works until Friday."):
+        self.content = content
+        self.requests = []
+
+    def post(self, url, headers=None, data=None, timeout=None):
+        self.requests.append((url, data, timeout))
+        return _Response(self.content)
+
+
+@pytest.fixture
+def session(monkeypatch):
+    session = _Session()
+    monkeypatch.setattr(LlmClient, "generate_response", _generate_response)
+    monkeypatch.setattr(LlmClient, "get_session", classmethod(lambda cls: session))
+    return session
+
+
+def _prompt(question: str) -> dict:
+    return {"model": "gpt-4o", "messages": [{"role": "user", "content": question}]}
+
+
+def test_clients_share_one_session_until_reconfigured():
+    first = LlmClient().get_session()
+    assert LlmClient().get_session() is first
+    assert first.get_adapter("https://")._pool_maxsize == LlmClient._pool_maxsize
+
+    read_timeout = LlmClient._read_timeout
+    try:
+        LlmClient.configure_session(read_timeout=30, keep_alive=False)
+        second = LlmClient().get_session()
+        assert second is not first
+        assert second.headers["Connection"] == "close"
+        assert LlmClient.get_timeout() == (LlmClient._connect_timeout, 30)
+    finally:
+        LlmClient.configure_session(read_timeout=read_timeout, keep_alive=True)
+
+
+def test_requests_use_the_shared_timeouts(session):
+    assert LlmClient().generate_response(_prompt("Is the road open?")) == "Road works until Friday."
+    assert session.requests[0][2] == LlmClient.get_timeout()
+
+
+def test_chat_completions_are_cached_on_disk(session, tmp_path):
+    LlmClient.configure_cache(enabled=True, path=str(tmp_path / "cache.sqlite3"))
+    try:
+        client = LlmClient()
+        assert client.generate_response(_prompt("Is the road open?")) == "Road works until Friday."
+        assert client.generate_response(_prompt("Is the road open?")) == "Road works until Friday."
+        assert client.generate_response(_prompt("When is the market?")) == "Road works until Friday."
+        assert len(session.requests) == 2
+        assert LlmClient.get_response_cache().stats()["hits"] == 1
+
+        # Reopened, as by the next run of main_generate.py
+        LlmClient.configure_cache(path=str(tmp_path / "cache.sqlite3"))
+        client.generate_response(_prompt("Is the road open?"))
+        assert len(session.requests) == 2
+
+        # Failed answers are not replayed
+        session.content = "No content found"
+        client.generate_response(_prompt("Who is responsible?"))
+        client.generate_response(_prompt("Who is responsible?"))
+        assert len(session.requests) == 4
+    finally:
+        LlmClient.configure_cache(enabled=False)
+
+
+def test_cache_keys_ignore_json_key_order_and_evict_least_recently_used(tmp_path):
+    assert ResponseCache.make_key("chat", '{"a": 1, "b": 2}') == ResponseCache.make_key("chat", '{"b": 2, "a": 1}')
+
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"), max_bytes=40)
+    cache.put("old", "x" * 15)
+    cache.put("recent", "y" * 15)
+    assert cache.get("old") == "x" * 15
+    cache.put("new", "z" * 15)
+    assert cache.get("recent") is None
+    assert cache.get("old") == "x" * 15 and cache.get("new") == "z" * 15
+    assert cache.stats()["bytes"] <= 40
+    cache.close()
@@ -0,0 +1,24 @@
+import threading
+
+from llm.LlmExecutor import LlmExecutor
+
+
+def test_calls_run_together_and_return_in_order():
+    barrier = threading.Barrier(4, timeout=5)
+
+    def call(i):
+        # Only returns once all four calls are running at the same time
+        barrier.wait()
+        return i
+
+    assert LlmExecutor.run_concurrently(*(lambda i=i: call(i) for i in range(4))) == [0, 1, 2, 3]
+
+
+def test_nested_fan_outs_run_inline():
+    def outer():
+        worker = threading.current_thread()
+        return LlmExecutor.run_concurrently(lambda: threading.current_thread() is worker,
+                                            lambda: threading.current_thread() is worker)
+
+    results = LlmExecutor.run_concurrently(outer, outer)
+    assert results == [[True, True], [True, True]]
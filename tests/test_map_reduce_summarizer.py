@@ -0,0 +1,59 @@
+import pytest
+
+from conftest import make_event, make_post
+from llm.LlmClient import LlmClient
+from llm.MapReduceSummarizer import MapReduceSummarizer
+
+
+@pytest.fixture
+def prompts(monkeypatch):
+    """Chunk-condensing prompts sent to a fake LLM, which answers with a short note"""
+    sent = []
+
+    def generate_response(self, prompt, *args, **kwargs):
+        sent.append(prompt.prompt)
+        return f"note {len(sent)}"
+    monkeypatch.setattr(LlmClient, "generate_response", generate_response)
+    monkeypatch.setattr(MapReduceSummarizer, "_cache", type(MapReduceSummarizer._cache)())
+    return sent
+
+
+def test_texts_that_fit_are_joined_unchanged(prompts):
+    summarizer = MapReduceSummarizer(LlmClient(), token_budget=100)
+    assert summarizer.condense(["first post", "", "second post"], separator="\n") == "first post\nsecond post"
+    assert prompts == []
+
+
+def test_large_input_is_condensed_chunk_by_chunk_and_cached(prompts):
+    summarizer = MapReduceSummarizer(LlmClient(), token_budget=50)
+    texts = [f"post {i} " + "x" * 120 for i in range(6)]
+    condensed = summarizer.condense(texts)
+    assert summarizer.estimate_tokens(condensed) <= 50
+    assert len(prompts) == len(summarizer.chunk(texts))
+
+    # Only the chunk holding the new post is condensed again
+    calls = len(prompts)
+    summarizer.condense(texts + ["post 6 " + "y" * 120])
+    assert len(prompts) - calls == 1
+
+
+def test_event_report_keeps_post_metadata(db, prompts, monkeypatch):
+    posts = [make_post(i) for i in range(3)]
+    for post in posts:
+        db.add_post(post)
+    event = db.add_event(make_event(posts), index=False)
+
+    # Fits in one prompt: the posts are formatted in full, as before condensing existed
+    prompt = db._raport_prompt_for_event(event.event_id).prompt
+    assert str(posts) in prompt
+    assert prompts == []
+
+    monkeypatch.setattr(MapReduceSummarizer, "_token_budget", 40)
+    for i in range(3, 12):
+        post = make_post(i)
+        db.add_post(post)
+        event.attach_post(post)
+    prompt = db._raport_prompt_for_event(event.event_id).prompt
+    # Too large: one line per post, with its metadata, went through condensing
+    assert prompts and "note" in prompt
+    assert "facebook (sentiment 0, engagement 3): Road works near the station 3" in "".join(prompts)
@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+from conftest import START
+from llm.LlmClient import LlmClient
+from models.Actionable import Actionable
+from models.Post import Post
+
+REPLY = {
+    "sentiment": 35,
+    "subject_description": "Road works block the crossing near the station.",
+    "topic": "traffic and safety",
+    "actionables": [
+        {"content": "When will the crossing reopen?", "is_question": True,
+         "proposed_response": "The crossing reopens on Friday."},
+        {"content": "Put up signs for the detour", "is_question": False},
+    ],
+}
+
+
+@pytest.fixture
+def replies(monkeypatch):
+    """The prompts sent to the LLM; every call answers with the JSON in replies.reply"""
+    class Replies(list):
+        reply = REPLY
+
+    prompts = Replies()
+
+    def generate_response(self, prompt, *args, **kwargs):
+        prompts.append(prompt)
+        return f"```json\n{json.dumps(prompts.reply)}\n```"
+    monkeypatch.setattr(LlmClient, "generate_response", generate_response)
+    return prompts
+
+
+def _enrich() -> Post:
+    return Post.create_with_enrichment(link="https://example.com/post/1", content="Road works again!",
+                                       date=START, source="facebook")
+
+
+def test_one_call_enriches_every_field(db, replies, monkeypatch):
+    monkeypatch.setattr(Actionable, "_generate_proposed_answer",
+                        staticmethod(lambda content, llm_client: "Follow the signs."))
+    post = _enrich()
+
+    assert len(replies) == 1
+    assert post.satisfaction_rating == 35
+    assert post.subject_description == REPLY["subject_description"]
+    assert post.topic.name == "Traffic and Safety"
+    assert [(a.content, a.is_question, a.proposed_response) for a in post.actionables] == [
+        ("When will the crossing reopen?", "True", "The crossing reopens on Friday."),
+        ("Put up signs for the detour", "False", "Follow the signs."),
+    ]
+
+
+def test_invalid_fields_fall_back_to_their_own_prompts(db, replies, monkeypatch):
+    replies.reply = dict(REPLY, sentiment=140, subject_description="", actionables=REPLY["actionables"][:1])
+    monkeypatch.setattr(Post, "_get_sentiment_score", staticmethod(lambda content, llm_client: 60))
+    monkeypatch.setattr(Post, "_generate_subject_description_static",
+                        staticmethod(lambda content, llm_client: "Road works."))
+    monkeypatch.setattr(Post, "_generate_actionables", staticmethod(lambda *args: pytest.fail("valid field redone")))
+    post = _enrich()
+
+    assert len(replies) == 1
+    assert (post.satisfaction_rating, post.subject_description) == (60, "Road works.")
+    assert post.topic.name == "Traffic and Safety"
+    assert len(post.actionables) == 1
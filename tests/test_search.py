@@ -0,0 +1,34 @@
+import asyncio
+
+from conftest import make_event, make_post
+from api.routes import search as search_route
+from llm.AsyncLlmClient import AsyncLlmClient
+from llm.SemanticSimilarityService import SemanticSimilarityService
+
+
+def _search(db, monkeypatch, query: str):
+    async def embed_async(self, text):
+        return db._embedding_service.embed(text)
+
+    async def generate_response(self, prompt, *args, **kwargs):
+        return "🚧"
+    monkeypatch.setattr(SemanticSimilarityService, "embed_async", embed_async)
+    monkeypatch.setattr(AsyncLlmClient, "generate_response", generate_response)
+    return asyncio.run(search_route.search_by_similarity(search_route.SearchRequest(query=query)))
+
+
+def test_search_returns_every_event_above_the_threshold(db, monkeypatch):
+    query = "road works block the crossing near the station"
+    for i in range(120):
+        post = make_post(i)
+        db.add_post(post)
+        event = make_event([post], f"Works {i}")
+        # Half of the events describe the query, the others something unrelated
+        event.case_description = query if i % 2 == 0 else f"choir concert in the park {i}"
+        db.add_event(event)
+
+    topic = _search(db, monkeypatch, query)
+    assert len(topic.events) == 60
+    assert {event.event_id for event in topic.events} == {event.event_id for event in db.events[::2]}
+    assert all(event.similarity_score >= topic.similarity_threshold for event in topic.events)
+    assert len(db.get_topic_by_id(topic.topic_id).events) == 60
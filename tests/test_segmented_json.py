@@ -0,0 +1,130 @@
+import json
+import os
+from datetime import timedelta
+
+import pytest
+
+from conftest import START, make_event, make_post
+from database.segmented_json import SegmentedJsonStore
+from main_generate import DateTimeEncoder
+
+
+def _expected(db, saved: dict) -> bytes:
+    """The file json.dump(..., indent=2) writes for the database and the metadata of a save"""
+    metadata = {key: value for key, value in saved.items() if key not in ("segments", "rewritten")}
+    return json.dumps({
+        "posts": [post.to_dict() for post in db.posts.values()],
+        "events": [event.to_dict() for event in db.get_all_events()],
+        "topics": [topic.to_dict() for topic in db.get_all_topics()],
+        "metadata": metadata
+    }, indent=2, ensure_ascii=False, cls=DateTimeEncoder).encode("utf-8")
+
+
+def _save(store: SegmentedJsonStore, db) -> dict:
+    saved = store.save(db, {"cursor": {"file": "feed.csv", "row": 3}})
+    with open(store.path, "rb") as f:
+        assert f.read() == _expected(db, saved)
+    return saved
+
+
+def _segment_files(store: SegmentedJsonStore) -> set:
+    return set(os.listdir(store.directory)) - {"manifest.json"}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SegmentedJsonStore(str(tmp_path / "db.json"), segment_size=4, encoder=DateTimeEncoder)
+
+
+@pytest.fixture
+def filled(db):
+    posts = [make_post(i) for i in range(10)]
+    for post in posts:
+        db.add_post(post)
+    for i in range(0, 10, 2):
+        db.add_event(make_event(posts[i:i + 2], f"Event {i}"), index=False,
+                     topic=db.get_topic_by_name("Traffic and Safety"))
+    return db
+
+
+def test_empty_database_matches_json_dump(db, store):
+    db.topics = []
+    _save(store, db)
+
+
+def test_output_matches_json_dump_after_changes(filled, store):
+    db = filled
+    saved = _save(store, db)
+    assert saved["rewritten"] == saved["segments"]
+
+    # Appends
+    for i in range(10, 13):
+        db.add_post(make_post(i))
+    db.add_event(make_event([db.get_post_by_id(make_post(10).link)], "Appended"), index=False)
+    _save(store, db)
+
+    # Deletes, in the middle and at the end
+    db.delete_post(make_post(5).link)
+    db.delete_post(make_post(12).link)
+    db.delete_event(db.get_all_events()[1].event_id)
+    _save(store, db)
+
+    # An event moved to another topic and an engagement update
+    db.add_event_to_topic(db.get_all_events()[0], db.get_topic_by_name("Other"))
+    db.update_post_engagement(make_post(0).link, START + timedelta(days=2), 99)
+    _save(store, db)
+
+    # A post deleted and added again moves to the end
+    post = db.get_post_by_id(make_post(2).link)
+    db.delete_post(post.link)
+    db.add_post(post)
+    _save(store, db)
+
+    # Nothing changed
+    saved = _save(store, db)
+    assert saved["rewritten"] == 0
+
+
+def test_only_changed_segments_are_rewritten(filled, store):
+    db = filled
+    _save(store, db)
+    before = _segment_files(store)
+
+    db.update_post_engagement(make_post(5).link, START + timedelta(days=1), 50)
+    saved = _save(store, db)
+    assert saved["rewritten"] == 1
+    # The replaced segment file is removed, every other one is reused
+    assert len(_segment_files(store) - before) == 1
+    assert len(before - _segment_files(store)) == 1
+
+
+def test_failed_save_keeps_the_changes_and_the_previous_files(filled, store, monkeypatch):
+    db = filled
+    _save(store, db)
+    files = _segment_files(store)
+    with open(store.path, "rb") as f:
+        previous = f.read()
+
+    db.update_post_engagement(make_post(1).link, START + timedelta(days=1), 7)
+
+    def fail(plan, metadata):
+        raise OSError("disk full")
+    monkeypatch.setattr(store, "_write_json", fail)
+    with pytest.raises(OSError):
+        store.save(db)
+    assert _segment_files(store) == files
+    with open(store.path, "rb") as f:
+        assert f.read() == previous
+
+    # The next save still writes the change the failed one took
+    monkeypatch.undo()
+    saved = _save(store, db)
+    assert saved["rewritten"] == 1
+
+
+def test_another_database_instance_rewrites_everything(filled, store):
+    db = filled
+    _save(store, db)
+    db.instance_id = "restarted"
+    saved = _save(store, db)
+    assert saved["rewritten"] == saved["segments"]
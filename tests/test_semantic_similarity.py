@@ -0,0 +1,70 @@
+import asyncio
+import threading
+
+import pytest
+
+from llm.EmbeddingStore import EmbeddingStore
+from llm.LlmClient import LlmClient
+from llm.SemanticSimilarityService import SemanticSimilarityService
+
+
+class _EmbeddingsApi:
+    """Answers embeddings requests with one vector per input, recording the batches"""
+    def __init__(self):
+        self.batches = []
+
+    def answer(self, prompt):
+        texts = prompt.prompt if isinstance(prompt.prompt, list) else [prompt.prompt]
+        self.batches.append(texts)
+        vectors = [[float(len(text)), float(i), 1.0] for i, text in enumerate(texts)]
+        return vectors if isinstance(prompt.prompt, list) else vectors[0]
+
+
+@pytest.fixture
+def api(monkeypatch, tmp_path):
+    api = _EmbeddingsApi()
+
+    def generate_response(self, prompt, *args, **kwargs):
+        return api.answer(prompt)
+
+    async def generate_response_async(self, prompt, *args, **kwargs):
+        return api.answer(prompt)
+    monkeypatch.setattr(LlmClient, "generate_response", generate_response)
+    monkeypatch.setattr("llm.AsyncLlmClient.AsyncLlmClient.generate_response", generate_response_async)
+    SemanticSimilarityService.configure_store(enabled=True, directory=str(tmp_path / "store"))
+    yield api
+    SemanticSimilarityService.configure_store(enabled=False)
+
+
+def test_async_embedding_uses_the_store_off_the_event_loop(api, monkeypatch):
+    threads = []
+    for name in ("get", "put"):
+        method = getattr(EmbeddingStore, name)
+        monkeypatch.setattr(EmbeddingStore, name,
+                            lambda self, *args, method=method: threads.append(threading.get_ident()) or method(self, *args))
+
+    async def scenario():
+        service = SemanticSimilarityService(LlmClient())
+        first = await service.embed_async("road works")
+        again = await service.embed_async("road works")
+        matrix = await service.embed_many_async(["road works", "bus detour"])
+        return first, again, matrix, threading.get_ident()
+
+    first, again, matrix, loop_thread = asyncio.run(scenario())
+    assert first == again and matrix[0].tolist() == first
+    # "road works" was requested once, then served from the store
+    assert api.batches == [["road works"], ["bus detour"]]
+    assert threads and loop_thread not in threads
+
+
+def test_embed_many_batches_distinct_uncached_texts_in_order(api, monkeypatch):
+    monkeypatch.setattr(SemanticSimilarityService, "_embedding_batch_size", 2)
+    service = SemanticSimilarityService(LlmClient())
+    service.embed("bus detour")
+
+    texts = ["road works", "bus detour", "market", "road works", "choir", "ferry"]
+    matrix = service.embed_many(texts)
+    assert matrix.shape == (6, 3)
+    assert [row.tolist() for row in matrix] == [service.embed(text) for text in texts]
+    # Stored and repeated texts are not requested again
+    assert sorted(map(tuple, api.batches[1:])) == [("choir", "ferry"), ("road works", "market")]
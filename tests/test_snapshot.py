@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+import main_generate
+from conftest import FakeEmbeddingService, make_event, make_post
+from database.snapshot import convert_json_to_snapshot, is_snapshot
+from llm.LlmClient import LlmClient
+from Services.EventProcessingService import EventProcessingService
+
+
+def _fill(db):
+    traffic = db.get_topic_by_name("Traffic and Safety")
+    for i in range(4):
+        post = make_post(i)
+        db.add_post(post)
+        db.add_event(make_event([post], f"Works {i}"), topic=traffic)
+    db.events[0].similar_events = [db.events[2]]
+
+
+def _contents(db):
+    return ({link: post.to_dict() for link, post in db.posts.items()},
+            [(event.event_id, event.name, [p.link for p in event.posts], [e.event_id for e in event.similar_events],
+              [(kw.keyword, [float(x) for x in kw.emb]) for kw in event.keywords]) for event in db.events],
+            [(topic.topic_id, [e.event_id for e in topic.events]) for topic in db.topics])
+
+
+def _reload(db, load):
+    db.__init__()
+    db._embedding_service = FakeEmbeddingService()
+    load(EventProcessingService(LlmClient()))
+    return _contents(db)
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16"])
+def test_snapshot_round_trip(db, tmp_path, dtype):
+    _fill(db)
+    expected = _contents(db)
+    path = main_generate.save_database_snapshot(str(tmp_path / "db.snapshot"), dtype=dtype)
+    assert is_snapshot(path)
+
+    # The small integer test embeddings are exact in float16 too
+    assert _reload(db, lambda service: service.load_database_from_snapshot(path)) == expected
+    emb = db.events[0].keywords[0].emb
+    assert isinstance(emb, np.ndarray) and emb.dtype == np.dtype(dtype) and not emb.flags.writeable
+
+
+def test_json_converts_to_the_same_snapshot(db, tmp_path):
+    _fill(db)
+    expected = _contents(db)
+    json_file = main_generate.save_database_to_json(str(tmp_path / "db.json"))
+    snapshot = convert_json_to_snapshot(json_file)
+    assert _reload(db, lambda service: service.load_database_from_snapshot(snapshot)) == expected
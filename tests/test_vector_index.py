@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from database.vector_index import IVFVectorIndex, create_vector_index, load_vector_index
+
+
+def _filled(kind: str, vectors: np.ndarray, tags=None, **params):
+    index = create_vector_index(kind, **params)
+    for i, vector in enumerate(vectors):
+        index.add(i, vector, tag=tags[i] if tags is not None else None)
+    return index
+
+
+@pytest.fixture(scope="module")
+def clustered():
+    """Vectors around 40 directions, as embeddings of related texts are"""
+    rng = np.random.default_rng(7)
+    centers = rng.normal(size=(40, 32))
+    return (centers[rng.integers(0, 40, 3000)] + 0.3 * rng.normal(size=(3000, 32))).astype(np.float32)
+
+
+def test_exact_search_and_radius_match_brute_force(clustered):
+    index = _filled("exact", clustered[:500])
+    query = clustered[0] + 0.1
+    units = clustered[:500] / np.linalg.norm(clustered[:500], axis=1, keepdims=True)
+    scores = units @ (query / np.linalg.norm(query))
+
+    top = index.search(query, 10)
+    assert [key for key, _ in top] == list(np.argsort(-scores, kind="stable")[:10])
+    assert [score for _, score in top] == pytest.approx(np.sort(scores)[::-1][:10], abs=1e-5)
+    assert {key for key, _ in index.radius(query, 0.5)} == set(np.flatnonzero(scores >= 0.5))
+    assert {key for key, _ in index.radius(query, 0.5, keys=range(100))} == set(np.flatnonzero(scores[:100] >= 0.5))
+
+
+def test_ivf_recall_against_exact(clustered):
+    exact = _filled("exact", clustered)
+    ivf = _filled("ivf", clustered, train_threshold=1000)
+    assert ivf._centroids is not None
+
+    rng = np.random.default_rng(1)
+    recalls = []
+    for query in clustered[rng.choice(len(clustered), 50, replace=False)] + 0.1:
+        expected = {key for key, _ in exact.search(query, 10)}
+        recalls.append(len(expected & {key for key, _ in ivf.search(query, 10)}) / 10)
+        # Threshold queries never miss a vector
+        assert ivf.radius(query, 0.6) == exact.radius(query, 0.6)
+    assert np.mean(recalls) >= 0.95
+
+
+def test_ivf_tag_search_finds_vectors_outside_the_probed_clusters(clustered):
+    tags = ["common"] * len(clustered)
+    # A few vectors of a rare tag, all far from the query
+    rare = np.argsort(clustered @ clustered[0])[:5]
+    for i in rare:
+        tags[i] = "rare"
+    ivf = _filled("ivf", clustered, tags, train_threshold=1000, nprobe=1)
+
+    hits = ivf.search(clustered[0], 3, tag="rare")
+    assert len(hits) == 3
+    assert {key for key, _ in hits} <= set(rare.tolist())
+    assert hits == _filled("exact", clustered, tags).search(clustered[0], 3, tag="rare")
+
+
+def test_updates_and_persistence(tmp_path, clustered):
+    index = _filled("ivf", clustered[:50])
+    index.add(("event", 1), clustered[60], tag="Traffic", fingerprint="abc")
+    index.add(3, clustered[61])
+    assert index.remove(4) and not index.remove(4)
+    assert index.search(clustered[61], 1)[0][0] == 3
+
+    path = str(tmp_path / "index.npz")
+    index.save(path)
+    loaded = load_vector_index(path)
+    assert isinstance(loaded, IVFVectorIndex)
+    assert len(loaded) == len(index) == 50
+    assert loaded.fingerprint(("event", 1)) == "abc"
+    assert np.allclose(loaded.get(3), index.get(3))
+    assert loaded.search(clustered[60], 1, tag="Traffic")[0][0] == ("event", 1)
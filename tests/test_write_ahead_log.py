@@ -0,0 +1,271 @@
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import main_generate
+from conftest import START, make_event, make_post
+from database.write_ahead_log import WriteAheadLog
+from llm.LlmClient import LlmClient
+from models.Keyword import Keyword
+from models.Topic import Topic
+from Services.EventProcessingService import EventProcessingService
+
+
+def _sequences(wal: WriteAheadLog) -> list:
+    return [record["seq"] for record in wal.records()]
+
+
+def _segments(directory) -> list:
+    return sorted(name for name in os.listdir(directory) if name.endswith(".wal"))
+
+
+def test_torn_tail_is_ignored_then_truncated(tmp_path):
+    metadata = {"generated_at": "2025-01-01T00:00:00"}
+    wal = WriteAheadLog(str(tmp_path))
+    wal.start(metadata)
+    for i in range(3):
+        wal.append({"op": "topic", "i": i})
+    wal.close()
+
+    # A crash in the middle of a write leaves part of a frame at the end of the segment
+    segment = tmp_path / _segments(tmp_path)[-1]
+    intact_size = segment.stat().st_size
+    with open(segment, "ab") as f:
+        f.write(b"\x40\x00\x00\x00\x12\x34\x56\x78{\"op\":\"top")
+
+    wal = WriteAheadLog(str(tmp_path))
+    assert wal.applies_to(metadata)
+    assert _sequences(wal) == [1, 2, 3]
+
+    wal.start(metadata)
+    assert segment.stat().st_size == intact_size
+    assert wal.append({"op": "topic", "i": 3}) == 4
+    wal.close()
+    assert _sequences(WriteAheadLog(str(tmp_path))) == [1, 2, 3, 4]
+
+
+def test_corrupted_record_ends_the_log(tmp_path):
+    wal = WriteAheadLog(str(tmp_path))
+    wal.start({})
+    for i in range(3):
+        wal.append({"op": "topic", "i": i})
+    wal.close()
+
+    segment = tmp_path / _segments(tmp_path)[-1]
+    data = bytearray(segment.read_bytes())
+    data[-2] ^= 0xFF
+    segment.write_bytes(bytes(data))
+    assert _sequences(WriteAheadLog(str(tmp_path))) == [1, 2]
+
+
+def test_release_deletes_only_checkpointed_segments(tmp_path):
+    wal = WriteAheadLog(str(tmp_path))
+    wal.start({})
+    wal.append({"op": "topic", "i": 0})
+    wal.append({"op": "topic", "i": 1})
+    position = wal.checkpoint()
+    assert position == {"wal_id": wal.wal_id, "wal_sequence": 2}
+    wal.append({"op": "topic", "i": 2})
+    wal.flush()
+    assert len(_segments(tmp_path)) == 2
+
+    wal.release(position["wal_sequence"])
+    assert len(_segments(tmp_path)) == 1
+    assert _sequences(wal) == [3]
+    assert list(wal.records(after_sequence=2)) == list(wal.records())
+
+    # Releasing an older position again, or one past the checkpoint, keeps the current segment
+    wal.release(0)
+    wal.release(10)
+    assert _sequences(wal) == [3]
+    wal.close()
+
+    # A snapshot naming the log continues it, numbering on from the last record
+    wal = WriteAheadLog(str(tmp_path))
+    assert wal.applies_to({"generated_at": "later", **position})
+    wal.start({"generated_at": "later", **position})
+    assert wal.append({"op": "topic", "i": 3}) == 4
+    wal.close()
+
+
+def test_log_of_another_database_is_discarded(tmp_path):
+    wal = WriteAheadLog(str(tmp_path))
+    wal.start({"generated_at": "2025-01-01T00:00:00"})
+    wal.append({"op": "topic", "i": 0})
+    wal.close()
+
+    regenerated = {"generated_at": "2025-02-01T00:00:00", "wal_id": "0" * 32, "wal_sequence": 5}
+    wal = WriteAheadLog(str(tmp_path))
+    assert not wal.applies_to(regenerated)
+    wal.start(regenerated)
+    assert _sequences(wal) == []
+    assert wal.base == regenerated["generated_at"]
+    assert wal.append({"op": "topic", "i": 1}) == 1
+    wal.close()
+
+
+def test_log_started_on_a_file_naming_an_older_log_applies_to_it(tmp_path):
+    # The file was written by a compaction of a log that has been deleted since
+    metadata = {"generated_at": "2025-01-01T00:00:00", "wal_id": "0" * 32, "wal_sequence": 5}
+    wal = WriteAheadLog(str(tmp_path))
+    wal.start(metadata)
+    wal.append({"op": "topic", "i": 0})
+    wal.close()
+
+    assert WriteAheadLog(str(tmp_path)).applies_to(metadata)
+
+
+def _state(db) -> str:
+    exported = db.export()
+    exported.pop("wal")
+    live = {event.event_id for event in db.events}
+    for event in exported["events"]:
+        # A deleted event stays in the similar events of others until they are saved and loaded
+        event["similar_events"] = [event_id for event_id in event["similar_events"] if event_id in live]
+        for keyword in event.get("keywords") or []:
+            keyword["emb"] = [float(value) for value in keyword["emb"]]
+    filed = sorted((event.event_id, db.get_topic_for_event(event.event_id).topic_id)
+                   for event in db.events if db.get_topic_for_event(event.event_id) is not None)
+    timelines = {name: list(timeline) for name, timeline in db._topic_timelines.items() if timeline}
+    return json.dumps([exported, filed, timelines, db._next_event_id], default=str, sort_keys=True)
+
+
+def _open(db, metadata: dict) -> int:
+    """Start up as the API does: replay the log onto the loaded database, then keep logging"""
+    wal = WriteAheadLog(main_generate.WAL_DIRECTORY)
+    replayed = EventProcessingService(LlmClient()).replay_write_ahead_log(wal, metadata)
+    wal.start(metadata)
+    db.attach_wal(wal)
+    return replayed
+
+
+def _restart(db) -> int:
+    """Drop the in-memory state without saving, as a crash would, and load it back"""
+    db.wal.flush()
+    db.wal.close()
+    embedding_service = db._embedding_service
+    db.__init__()
+    db._embedding_service = embedding_service
+    loaded = EventProcessingService(LlmClient()).load_database_from_json(main_generate.DATABASE_FILE)
+    return _open(db, loaded["metadata"])
+
+
+def test_replay_after_compaction_restores_the_database(db, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _open(db, {})
+    traffic = db.get_topic_by_name("Traffic and Safety")
+    other = db.get_topic_by_name("Other")
+
+    posts = [make_post(i) for i in range(8)]
+    for post in posts:
+        db.add_post(post)
+    first = db.add_event(make_event(posts[:2], "Road works"), topic=traffic)
+    second = db.add_event(make_event(posts[2:4], "Bus detour"), topic=traffic)
+    third = db.add_event(make_event(posts[4:5], "Street party"))
+    main_generate.save_database_to_json(main_generate.DATABASE_FILE)
+    assert len(_segments(main_generate.WAL_DIRECTORY)) == 1
+
+    # Everything below is only in the log: attached posts, field and keyword changes,
+    # a move to another topic, a replaced and a deleted event, a new topic, engagement
+    db.update_post_engagement(posts[0].link, START + timedelta(days=1), 40)
+    first.attach_post(posts[5])
+    db.update_event_date(first)
+    db.record_event_change(first)
+    first.small_summary = "Road works extended."
+    first.keywords = [Keyword("detour", [1.0, 0.0] * 8)]
+    first.similar_events = [second]
+    db.record_event_change(first)
+    db.add_event_to_topic(second, other)
+    db.record_event_change(second)
+    replacement = make_event(third.posts, "Street festival")
+    db.update_event(third.event_id, replacement)
+    db.delete_event(second.event_id)
+    db.add_event(make_event(posts[6:8], "Market"), topic=other)
+    db.add_topic(Topic(topic_id=None, name="Search: works", events=[first], icon="🔍"))
+
+    expected = _state(db)
+    assert _restart(db) > 0
+    assert _state(db) == expected
+
+    # Logged records are not replayed twice once a compaction included them
+    db.add_post(make_post(8))
+    main_generate.save_database_to_json(main_generate.DATABASE_FILE)
+    assert len(list(db.wal.records())) == 0
+    restored = db.get_event_by_id(first.event_id)
+    restored.attach_post(db.get_post_by_id(make_post(8).link))
+    db.update_event_date(restored)
+    db.record_event_change(restored)
+
+    expected = _state(db)
+    assert _restart(db) == 1
+    assert _state(db) == expected
+
+
+def test_in_place_changes_are_logged_as_deltas(db, tmp_path):
+    wal = WriteAheadLog(str(tmp_path))
+    wal.start({})
+    db.attach_wal(wal)
+    posts = [make_post(i) for i in range(3)]
+    for post in posts:
+        db.add_post(post)
+    event = db.add_event(make_event(posts[:1]))
+
+    event.attach_post(posts[1])
+    db.update_event_date(event)
+    db.record_event_change(event)
+    event.name = "Road works, phase two"
+    db.record_event_change(event)
+    db.record_event_change(event)
+    wal.flush()
+
+    records = list(wal.records())
+    assert [record["op"] for record in records[-2:]] == ["attach", "event_change"]
+    assert records[-2]["links"] == [posts[1].link]
+    assert records[-1]["changes"] == {"name": "Road works, phase two"}
+    assert np.allclose(db.get_event_by_id(event.event_id).keywords[0].emb, event.keywords[0].emb)
+
+
+async def _topic(topic):
+    return topic
+
+
+class _Upload:
+    def __init__(self, filename: str, content: bytes):
+        self.filename = filename
+        self.content = content
+
+    async def read(self) -> bytes:
+        return self.content
+
+
+def test_post_uploaded_onto_an_event_survives_a_restart(db, tmp_path, monkeypatch):
+    from api.routes import posts as posts_route
+    from llm.SemanticSimilarityService import SemanticSimilarityService
+    from models.Event import Event
+
+    monkeypatch.chdir(tmp_path)
+    text = "Road works near the station block the crossing"
+    traffic = db.get_topic_by_name("Traffic and Safety")
+    monkeypatch.setattr(posts_route, "find_topic_for_post_async", lambda post, topics: _topic(traffic))
+    monkeypatch.setattr(SemanticSimilarityService, "embed", lambda self, text: db._embedding_service.embed(text))
+    monkeypatch.setattr(Event, "refresh_enrichment", lambda self, *args, **kwargs: None)
+
+    _open(db, {})
+    post = make_post(0)
+    post.date = datetime.now() - timedelta(hours=1)
+    db.add_post(post)
+    event = make_event([post])
+    event.case_description = text
+    db.add_event(event, topic=traffic)
+    main_generate.save_database_to_json(main_generate.DATABASE_FILE)
+
+    asyncio.run(posts_route.upload_file_as_post(_Upload("note.txt", text.encode())))
+    assert len(db.get_event_by_id(event.event_id).posts) == 2
+
+    expected = _state(db)
+    _restart(db)
+    assert len(db.get_event_by_id(event.event_id).posts) == 2
+    assert _state(db) == expected